@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for `dipdup.decoder.decode` with and without the decode pool.
+
+Decodes synthetic Subsquid `evm.events` responses of different sizes in place and in spawned worker processes.
+Reports total time and the longest stretch the event loop was blocked, which is what the pool is meant to reduce.
+"""
+import asyncio
+import time
+from typing import Any
+
+import click
+import orjson
+
+import dipdup.config  # noqa: F401
+from dipdup import decoder
+from dipdup.datasources.evm_subsquid import _decode_events
+
+
+def _make_response(size: int) -> bytes:
+    blocks: list[dict[str, Any]] = []
+    level = 0
+    while len(orjson.dumps(blocks)) < size:
+        blocks.append(
+            {
+                'header': {'number': level, 'hash': f'0x{level:064x}', 'timestamp': level * 12},
+                'logs': [
+                    {
+                        'address': '0x' + 'aa' * 20,
+                        'data': '0x' + '00' * 96,
+                        'logIndex': i,
+                        'topics': ['0x' + 'ff' * 32, '0x' + '11' * 32, '0x' + '22' * 32],
+                        'transactionHash': f'0x{level:032x}{i:032x}',
+                        'transactionIndex': i,
+                    }
+                    for i in range(10)
+                ],
+            }
+        )
+        level += 1
+    return orjson.dumps(blocks)
+
+
+async def _run(response: bytes, pages: int, concurrency: int) -> tuple[float, float]:
+    max_blocked = 0.0
+    done = False
+
+    async def _watch() -> None:
+        nonlocal max_blocked
+        while not done:
+            started_at = time.perf_counter()
+            await asyncio.sleep(0)
+            max_blocked = max(max_blocked, time.perf_counter() - started_at)
+
+    async def _decode(count: int) -> None:
+        for _ in range(count):
+            await decoder.decode(_decode_events, response)
+            # NOTE: Let other tasks run between pages like the index loop does
+            await asyncio.sleep(0)
+
+    watcher = asyncio.create_task(_watch())
+    started_at = time.perf_counter()
+    await asyncio.gather(*(_decode(pages // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    done = True
+    await watcher
+    return elapsed, max_blocked
+
+
+async def _bench(sizes: tuple[int, ...], megabytes: int, workers: int) -> None:
+    click.echo(f'{"size":>10} {"pages":>6} {"mode":>8} {"seconds":>8} {"max block, ms":>14}')
+    # NOTE: Threshold is bypassed to measure both modes on every size
+    decoder.DECODE_THRESHOLD = 0
+    for size in sizes:
+        response = _make_response(size)
+        pages = max(megabytes * 2**20 // len(response), workers)
+        for mode in ('in-place', 'pool'):
+            async with decoder.decode_pool(workers if mode == 'pool' else None):
+                if mode == 'pool':
+                    # NOTE: Warm up workers; spawning them is a one-time cost
+                    await _run(response, workers, workers)
+                elapsed, max_blocked = await _run(response, pages, workers)
+            click.echo(f'{len(response):>10} {pages:>6} {mode:>8} {elapsed:>8.2f} {max_blocked * 1000:>14.1f}')
+
+
+@click.command()
+@click.option('--sizes', default='4096,16384,65536,262144,1048576', help='Comma-separated response sizes in bytes')
+@click.option('--megabytes', default=64, help='Total size of responses to decode per run')
+@click.option('--workers', default=4, help='Decode pool size')
+def main(sizes: str, megabytes: int, workers: int) -> None:
+    asyncio.run(_bench(tuple(int(s) for s in sizes.split(',')), megabytes, workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for `dipdup.indexes.evm_events.matcher.decode_event_data`.
+
+Decodes synthetic Uniswap V3 `Swap` and ERC-20 `Transfer` logs with precompiled static decoders and with generic
+eth_abi pipeline the matcher falls back to for dynamic layouts.
+"""
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+import click
+from eth_abi.abi import decode as decode_abi
+from eth_abi.abi import encode as encode_abi
+from eth_utils.hexadecimal import decode_hex
+
+from dipdup.indexes.evm_events.matcher import decode_event_data
+from dipdup.indexes.evm_events.matcher import decode_indexed_topics
+
+EVENTS: dict[str, tuple[tuple[str, bool], ...]] = {
+    'Transfer': (
+        ('address', True),
+        ('address', True),
+        ('uint256', False),
+    ),
+    'Swap': (
+        ('address', True),
+        ('address', True),
+        ('int256', False),
+        ('int256', False),
+        ('uint160', False),
+        ('uint128', False),
+        ('int24', False),
+    ),
+}
+
+
+def _random_value(type_: str) -> Any:
+    if type_ == 'address':
+        return '0x' + random.randbytes(20).hex()
+    if type_ == 'int24':
+        return random.randint(-887272, 887272)
+    if type_.startswith('int'):
+        return random.randint(-(2**127), 2**127)
+    return random.randint(0, 2 ** int(type_[4:]) - 1)
+
+
+def _make_logs(inputs: tuple[tuple[str, bool], ...], count: int) -> list[tuple[str, tuple[str, ...]]]:
+    logs = []
+    for _ in range(count):
+        topics = ['0x' + random.randbytes(32).hex()]
+        data_types, data_values = [], []
+        for type_, indexed in inputs:
+            value = _random_value(type_)
+            if indexed:
+                topics.append('0x' + encode_abi((type_,), (value,)).hex())
+            else:
+                data_types.append(type_)
+                data_values.append(value)
+        logs.append(('0x' + encode_abi(data_types, data_values).hex(), tuple(topics)))
+    return logs
+
+
+def _decode_eth_abi(data: str, topics: tuple[str, ...], inputs: tuple[tuple[str, bool], ...]) -> tuple[Any, ...]:
+    indexed_values = iter(decode_indexed_topics(tuple(n for n, i in inputs if i), topics))
+    non_indexed_values = iter(decode_abi(tuple(n for n, i in inputs if not i), decode_hex(data)))
+    return tuple(next(indexed_values) if indexed else next(non_indexed_values) for _, indexed in inputs)
+
+
+def _run(
+    fn: Callable[[str, tuple[str, ...], tuple[tuple[str, bool], ...]], tuple[Any, ...]],
+    logs: list[tuple[str, tuple[str, ...]]],
+    inputs: tuple[tuple[str, bool], ...],
+) -> float:
+    started_at = time.perf_counter()
+    for data, topics in logs:
+        fn(data, topics, inputs)
+    return time.perf_counter() - started_at
+
+
+@click.command()
+@click.option('--count', default=100_000, help='Logs per event')
+def main(count: int) -> None:
+    click.echo(f'{"event":>10} {"decoder":>10} {"seconds":>10} {"ns/log":>10}')
+    for name, inputs in EVENTS.items():
+        logs = _make_logs(inputs, count)
+        assert all(decode_event_data(d, t, inputs) == _decode_eth_abi(d, t, inputs) for d, t in logs[:1000])
+
+        for decoder, fn in (('eth_abi', _decode_eth_abi), ('static', decode_event_data)):
+            elapsed = _run(fn, logs, inputs)
+            click.echo(f'{name:>10} {decoder:>10} {elapsed:>10.3f} {elapsed / count * 1e9:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
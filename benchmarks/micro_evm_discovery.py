@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for `evm.transactions` node fetcher with and without `trace_filter` discovery.
+
+Replays a synthetic chain where a sparse contract is called in a small fraction of blocks. Reports the number of
+JSON-RPC calls and the size of responses the fetcher has to download to get the same matching transactions.
+"""
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import click
+import orjson
+
+import dipdup.config  # noqa: F401
+from dipdup.datasources._headers import BlockHeader
+from dipdup.datasources._hedging import HedgePolicy
+from dipdup.indexes.evm_transactions.fetcher import EvmNodeTransactionFetcher
+
+CONTRACT = '0x' + 'cc' * 20
+
+
+def _make_transaction(level: int, index: int, to: str) -> dict[str, Any]:
+    return {
+        'blockHash': f'0x{level:064x}',
+        'blockNumber': hex(level),
+        'chainId': '0x1',
+        'from': f'0x{random.getrandbits(160):040x}',
+        'gas': '0x5208',
+        'gasPrice': '0x4a817c800',
+        'hash': f'0x{random.getrandbits(256):064x}',
+        # NOTE: Typical ERC-20 transfer calldata
+        'input': '0xa9059cbb' + f'{random.getrandbits(256):064x}' * 2,
+        'nonce': hex(random.getrandbits(16)),
+        'r': f'0x{random.getrandbits(256):064x}',
+        's': f'0x{random.getrandbits(256):064x}',
+        'to': to,
+        'transactionIndex': hex(index),
+        'type': '0x2',
+        'v': '0x1',
+        'value': '0x0',
+    }
+
+
+class _Node:
+    name = 'node'
+    _http_config = SimpleNamespace(ratelimit_sleep=1.0)
+    _config = SimpleNamespace(concurrency=4)
+
+    def __init__(self, levels: int, transactions: int, density: float) -> None:
+        self.fetch_semaphore = asyncio.Semaphore(4)
+        self.hedge_policy = HedgePolicy(self.name, budget=0.0)
+        self.blocks: dict[int, list[dict[str, Any]]] = {}
+        for level in range(levels):
+            block = [_make_transaction(level, i, f'0x{random.getrandbits(160):040x}') for i in range(transactions)]
+            if random.random() < density:
+                block[random.randrange(transactions)]['to'] = CONTRACT
+            self.blocks[level] = block
+        self.calls = 0
+        self.bytes = 0
+
+    def _respond(self, calls: int, result: Any) -> Any:
+        self.calls += calls
+        self.bytes += len(orjson.dumps(result))
+        return result
+
+    async def get_blocks_by_level(self, levels: list[int], full_transactions: bool) -> list[dict[str, Any]]:
+        blocks = [
+            {'number': hex(level), 'timestamp': hex(level * 12), 'transactions': self.blocks[level]} for level in levels
+        ]
+        return self._respond(len(levels), blocks)  # type: ignore[no-any-return]
+
+    async def get_traces(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        first_level, last_level = int(params['fromBlock'], 16), int(params['toBlock'], 16)
+        traces = [
+            {
+                'action': {'callType': 'call', 'from': tx['from'], 'to': tx['to'], 'input': tx['input']},
+                'blockHash': tx['blockHash'],
+                'blockNumber': level,
+                'traceAddress': [],
+                'transactionHash': tx['hash'],
+                'transactionPosition': int(tx['transactionIndex'], 16),
+                'type': 'call',
+            }
+            for level in range(first_level, last_level + 1)
+            for tx in self.blocks[level]
+            if tx['to'] in params['toAddress']
+        ]
+        return self._respond(1, traces)  # type: ignore[no-any-return]
+
+    async def get_transactions_by_hash(self, transaction_hashes: list[str]) -> list[dict[str, Any]]:
+        wanted = set(transaction_hashes)
+        by_hash = {tx['hash']: tx for block in self.blocks.values() for tx in block if tx['hash'] in wanted}
+        return self._respond(len(transaction_hashes), [by_hash[h] for h in transaction_hashes])  # type: ignore[no-any-return]
+
+    async def get_headers(self, levels: list[int]) -> dict[int, BlockHeader]:
+        # NOTE: Block without transaction bodies is ~600 bytes plus 66 bytes per transaction hash
+        for level in levels:
+            self._respond(1, {'hash': '0x' + '00' * 32 * (10 + len(self.blocks[level]))})
+        return {level: BlockHeader(level, f'0x{level:064x}', f'0x{level - 1:064x}', level * 12) for level in levels}
+
+
+async def _run(node: _Node, levels: int, discovery: bool) -> tuple[float, int]:
+    trace_filters = ({'toAddress': [CONTRACT]},) if discovery else None
+    fetcher = EvmNodeTransactionFetcher('bench', (node,), 0, levels - 1, trace_filters=trace_filters)  # type: ignore[arg-type]
+    matched = 0
+    started_at = time.perf_counter()
+    async for batch in fetcher._fetch_range(0, levels - 1):
+        matched += sum(1 for tx in batch if tx.to == CONTRACT)
+    return time.perf_counter() - started_at, matched
+
+
+@click.command()
+@click.option('--levels', default=5_000, help='Blocks in the range')
+@click.option('--transactions', default=150, help='Transactions per block')
+@click.option('--density', default=0.001, help='Fraction of blocks calling the contract')
+def main(levels: int, transactions: int, density: float) -> None:
+    click.echo(f'{"mode":>10} {"matched":>8} {"calls":>8} {"MB":>10} {"seconds":>8}')
+    for discovery in (False, True):
+        random.seed(0)
+        node = _Node(levels, transactions, density)
+        elapsed, matched = asyncio.run(_run(node, levels, discovery))
+        mode = 'traces' if discovery else 'scan'
+        click.echo(f'{mode:>10} {matched:>8} {node.calls:>8} {node.bytes / 2**20:>10.2f} {elapsed:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Memory benchmark for `dipdup.models.evm.EvmEventData` and `EvmTransactionData`.
+
+Builds items from synthetic Subsquid responses the same way fetchers do, drops the responses and reports retained
+memory per item as traced by `tracemalloc`, along with the number of items that fit in 1 GB of readahead.
+"""
+import random
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+import click
+
+import dipdup.config  # noqa: F401
+from dipdup.models.evm import EvmEventData
+from dipdup.models.evm import EvmTransactionData
+
+
+def _hex(size: int) -> str:
+    return '0x' + random.randbytes(size).hex()
+
+
+def _header(level: int) -> dict[str, Any]:
+    return {'number': level, 'hash': _hex(32), 'timestamp': 1_700_000_000 + level * 12}
+
+
+def _make_transfer(level: int) -> EvmEventData:
+    return EvmEventData.from_subsquid_json(
+        {
+            'address': _hex(20),
+            'data': _hex(32),
+            'logIndex': random.randint(0, 500),
+            'topics': [_hex(32), '0x' + '00' * 12 + _hex(20)[2:], '0x' + '00' * 12 + _hex(20)[2:]],
+            'transactionHash': _hex(32),
+            'transactionIndex': random.randint(0, 200),
+        },
+        _header(level),
+    )
+
+
+def _make_swap(level: int) -> EvmEventData:
+    return EvmEventData.from_subsquid_json(
+        {
+            'address': _hex(20),
+            'data': _hex(32 * 5),
+            'logIndex': random.randint(0, 500),
+            'topics': [_hex(32), '0x' + '00' * 12 + _hex(20)[2:], '0x' + '00' * 12 + _hex(20)[2:]],
+            'transactionHash': _hex(32),
+            'transactionIndex': random.randint(0, 200),
+        },
+        _header(level),
+    )
+
+
+def _make_transaction(level: int) -> EvmTransactionData:
+    return EvmTransactionData.from_subsquid_json(
+        {
+            'chainId': 1,
+            'contractAddress': None,
+            'cumulativeGasUsed': hex(random.randint(0, 30_000_000)),
+            'effectiveGasPrice': hex(random.randint(0, 10**11)),
+            'from': _hex(20),
+            'gas': hex(random.randint(21_000, 1_000_000)),
+            'gasPrice': hex(random.randint(0, 10**11)),
+            'gasUsed': hex(random.randint(21_000, 1_000_000)),
+            'hash': _hex(32),
+            'input': _hex(4 + 32 * 4),
+            'maxFeePerGas': hex(random.randint(0, 10**11)),
+            'maxPriorityFeePerGas': hex(random.randint(0, 10**9)),
+            'nonce': random.randint(0, 10_000),
+            'r': _hex(32),
+            's': _hex(32),
+            'status': 1,
+            'to': _hex(20),
+            'transactionIndex': random.randint(0, 200),
+            'type': 2,
+            'value': hex(random.randint(0, 10**18)),
+            'v': '0x1',
+            'yParity': '0x1',
+        },
+        _header(level),
+    )
+
+
+def _measure(make: Callable[[int], Any], count: int) -> float:
+    tracemalloc.start()
+    started_with, _ = tracemalloc.get_traced_memory()
+    items = [make(level) for level in range(count)]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return (retained - started_with) / count
+
+
+@click.command()
+@click.option('--count', default=100_000, help='Items per kind')
+def main(count: int) -> None:
+    kinds = {
+        'Transfer': _make_transfer,
+        'Swap': _make_swap,
+        'tx': _make_transaction,
+    }
+    click.echo(f'{"item":>10} {"bytes/item":>12} {"items/GB":>12}')
+    for name, make in kinds.items():
+        per_item = _measure(make, count)
+        click.echo(f'{name:>10} {per_item:>12.0f} {2**30 / per_item:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for `dipdup.fetcher.yield_by_level`.
+
+Feeds synthetic level-sorted pages (like the ones TzKT and Subsquid return) into the level splitter and reports
+time spent per item. Linear implementation keeps this number flat as the stream grows.
+"""
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+import click
+
+import dipdup.config  # noqa: F401
+from dipdup.fetcher import yield_by_level
+
+
+@dataclass(frozen=True)
+class Item:
+    level: int
+
+
+async def _iter_pages(total: int, page_size: int, per_level: int) -> AsyncIterator[tuple[Item, ...]]:
+    for offset in range(0, total, page_size):
+        yield tuple(Item(level=i // per_level) for i in range(offset, min(offset + page_size, total)))
+
+
+async def _run(total: int, page_size: int, per_level: int) -> tuple[float, int]:
+    pages = [page async for page in _iter_pages(total, page_size, per_level)]
+
+    async def _replay() -> AsyncIterator[tuple[Item, ...]]:
+        for page in pages:
+            yield page
+
+    levels = 0
+    started_at = time.perf_counter()
+    async for _ in yield_by_level(_replay()):
+        levels += 1
+    return time.perf_counter() - started_at, levels
+
+
+@click.command()
+@click.option('--page-size', default=10_000, help='Items per page')
+@click.option('--per-level', default=5, help='Items per level')
+@click.argument('sizes', nargs=-1, type=int)
+def main(page_size: int, per_level: int, sizes: tuple[int, ...]) -> None:
+    sizes = sizes or (1_000_000, 2_000_000, 4_000_000)
+    click.echo(f'{"items":>12} {"levels":>10} {"seconds":>10} {"ns/item":>10}')
+    for total in sizes:
+        elapsed, levels = asyncio.run(_run(total, page_size, per_level))
+        click.echo(f'{total:>12} {levels:>10} {elapsed:>10.3f} {elapsed / total * 1e9:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
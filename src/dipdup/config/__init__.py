@@ -359,6 +359,10 @@ class IndexConfig(ABC, NameMixin, ParentMixin['ResolvedIndexConfigU']):
         for datasource in config_dict['datasources']:
             datasource.pop('http', None)
             datasource.pop('buffer_size', None)
+            datasource.pop('concurrency', None)
+            datasource.pop('streaming', None)
+            datasource.pop('realtime_prefetch', None)
+            datasource.pop('hedge_budget', None)
 
 
 @dataclass(config=ConfigDict(extra='forbid'), kw_only=True)
@@ -545,6 +549,12 @@ class AdvancedConfig:
     :param decimal_precision: Overwrite precision if it's not guessed correctly based on project models.
     :param unsafe_sqlite: Disable journaling and data integrity checks. Use only for testing.
     :param alt_operation_matcher: Use different algorithm to match Tezos operations (dev only)
+    :param decode_workers: Number of worker processes to decode datasource responses during sync; disabled if not set.
+    :param pipeline_depth: Number of levels to match ahead while the current one is being committed during sync; levels are rematched if handlers add contracts or indexes.
+    :param sync_batch_levels: Commit levels processed during sync in batches of this size.
+    :param sync_batch_ms: Commit levels processed during sync in batches spanning this number of milliseconds.
+    :param coalesce_fetches: Merge `evm.events` sync queries of indexes sharing datasources into one.
+    :param lazy_payloads: Decode and validate `evm.events` payloads and `evm.transactions` inputs on first access in handler.
     """
 
     reindex: dict[ReindexingReason, ReindexingAction] = Field(default_factory=dict)
@@ -555,6 +565,12 @@ class AdvancedConfig:
     decimal_precision: int | None = None
     unsafe_sqlite: bool = False
     alt_operation_matcher: bool = False
+    decode_workers: int | None = None
+    pipeline_depth: int | None = None
+    sync_batch_levels: int | None = None
+    sync_batch_ms: int | None = None
+    coalesce_fetches: bool = False
+    lazy_payloads: bool = False
 
 
 @dataclass(config=ConfigDict(extra='forbid'), kw_only=True)
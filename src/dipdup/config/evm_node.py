@@ -20,6 +20,9 @@ class EvmNodeDatasourceConfig(IndexDatasourceConfig):
     :param ws_url: EVM node WebSocket URL
     :param http: HTTP client configuration
     :param rollback_depth: A number of blocks to store in database for rollback
+    :param concurrency: Number of level ranges fetched concurrently during sync by all indexes using this datasource
+    :param realtime_prefetch: Number of new blocks fetched concurrently as soon as heads arrive; 0 to disable
+    :param hedge_budget: Fraction of sync requests to this node that may be duplicated to another one when slower than p95 latency; 0 to disable
     """
 
     kind: Literal['evm.node']
@@ -27,6 +30,9 @@ class EvmNodeDatasourceConfig(IndexDatasourceConfig):
     ws_url: WsUrl | None = None
     http: HttpConfig | None = None
     rollback_depth: int = 32
+    concurrency: int = 1
+    realtime_prefetch: int = 0
+    hedge_budget: float = 0.0
 
     @property
     def merge_subscriptions(self) -> bool:
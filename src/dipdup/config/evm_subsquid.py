@@ -17,11 +17,15 @@ class EvmSubsquidDatasourceConfig(IndexDatasourceConfig):
     :param kind: always 'evm.subsquid'
     :param url: URL of Subsquid Network API
     :param http: HTTP client configuration
+    :param concurrency: Number of level windows queried concurrently from Subsquid workers during sync
+    :param streaming: Parse worker responses block by block as they arrive instead of reading them whole
     """
 
     kind: Literal['evm.subsquid']
     url: Url
     http: HttpConfig | None = None
+    concurrency: int = 1
+    streaming: bool = False
 
     @property
     def merge_subscriptions(self) -> bool:
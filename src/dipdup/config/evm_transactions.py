@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING
+from typing import Any
 from typing import Literal
 
 from pydantic import ConfigDict
@@ -14,6 +15,7 @@ from dipdup.config.evm import EvmDatasourceConfigU
 from dipdup.config.evm import EvmIndexConfig
 from dipdup.exceptions import ConfigurationError
 from dipdup.models.evm_node import EvmNodeHeadSubscription
+from dipdup.models.evm_subsquid import TRANSACTION_FIELDS
 from dipdup.subscriptions import Subscription
 from dipdup.utils import pascal_to_snake
 from dipdup.utils import snake_to_pascal
@@ -91,6 +93,8 @@ class EvmTransactionsIndexConfig(EvmIndexConfig):
     :param handlers: Transaction handlers
     :param first_level: Level to start indexing from
     :param last_level: Level to stop indexing at
+    :param fields: `EvmTransactionData` fields to request from Subsquid; inferred from handlers if not set
+    :param discovery: How to find transactions with `evm.node` datasources: `scan` all blocks or use `trace_filter` method
     """
 
     kind: Literal['evm.transactions']
@@ -100,9 +104,16 @@ class EvmTransactionsIndexConfig(EvmIndexConfig):
 
     first_level: int = 0
     last_level: int = 0
+    fields: tuple[str, ...] | None = None
+    discovery: Literal['scan', 'trace_filter'] = 'scan'
 
     def __post_init__(self) -> None:
         super().__post_init__()
+        for field in self.fields or ():
+            if field not in TRANSACTION_FIELDS:
+                msg = f'Unknown transaction field `{field}`; expected one of {", ".join(TRANSACTION_FIELDS)}'
+                raise ConfigurationError(msg)
+
         method_names = set()
         for handler in self.handlers:
             if not (handler.method or handler.signature):
@@ -116,3 +127,11 @@ class EvmTransactionsIndexConfig(EvmIndexConfig):
 
     def get_subscriptions(self) -> set[Subscription]:
         return {EvmNodeHeadSubscription(transactions=True)}
+
+    @classmethod
+    def strip(cls, config_dict: dict[str, Any]) -> None:
+        super().strip(config_dict)
+        # NOTE: Explicit fields change data passed to handlers; the default keeps hashes of existing indexes
+        if config_dict.get('fields') is None:
+            config_dict.pop('fields', None)
+        config_dict.pop('discovery', None)
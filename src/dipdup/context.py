@@ -96,6 +96,7 @@ if TYPE_CHECKING:
     from collections.abc import Iterator
     from types import ModuleType
 
+    from dipdup.indexes.evm_events.coalescer import EvmEventsCoalescer
     from dipdup.package import DipDupPackage
     from dipdup.transactions import TransactionManager
 
@@ -161,6 +162,7 @@ class DipDupContext:
         self._rolled_back_indexes: set[str] = set()
         self._handlers: dict[tuple[str, str], HandlerConfig] = {}
         self._hooks: dict[str, HookConfig] = {}
+        self._evm_events_coalescer: EvmEventsCoalescer | None = None
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}({self.package.name})'
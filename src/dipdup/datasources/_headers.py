@@ -0,0 +1,231 @@
+"""Cache of block headers fetched from EVM node.
+
+Fetchers need block timestamps for every level with events; realtime emitter gets the same headers from `newHeads`
+subscription. `HeaderCache` keeps recent headers in memory and, if the segment store is enabled, writes headers
+deeper than `rollback_depth` from the head to SQLite database, so they survive restarts.
+
+`ReorgTracker` keeps the chain of the latest headers linked by parent hashes to find the common ancestor of a new
+head and the levels orphaned by reorg.
+"""
+
+import asyncio
+import logging
+import sqlite3
+from collections import OrderedDict
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+from typing import NamedTuple
+
+from dipdup.exceptions import FrameworkException
+
+HEADER_CACHE_SIZE = 100_000
+# NOTE: SQLite limit of host parameters is 999 in older versions
+HEADER_QUERY_CHUNK = 500
+
+_logger = logging.getLogger(__name__)
+
+
+class BlockHeader(NamedTuple):
+    level: int
+    hash: str
+    parent_hash: str
+    timestamp: int
+
+    @classmethod
+    def from_json(cls, block_json: dict[str, Any]) -> 'BlockHeader':
+        return cls(
+            level=int(block_json['number'], 16),
+            hash=block_json['hash'],
+            parent_hash=block_json['parentHash'],
+            timestamp=int(block_json['timestamp'], 16),
+        )
+
+
+class HeaderCache:
+    """Block headers of a single datasource; in-memory LRU with optional on-disk tier"""
+
+    def __init__(self, rollback_depth: int, path: Path | None = None, size: int = HEADER_CACHE_SIZE) -> None:
+        self._rollback_depth = rollback_depth
+        self._size = size
+        self._headers: OrderedDict[int, BlockHeader] = OrderedDict()
+        self._head_level = 0
+        self._path = path
+        self._db: sqlite3.Connection | None = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+    def set_head_level(self, level: int) -> None:
+        self._head_level = max(self._head_level, level)
+
+    def get(self, level: int) -> BlockHeader | None:
+        header = self._headers.get(level)
+        if header:
+            self._headers.move_to_end(level)
+        return header
+
+    async def get_many(self, levels: Iterable[int]) -> dict[int, BlockHeader]:
+        """Get cached headers; levels missing in both tiers are omitted"""
+        headers: dict[int, BlockHeader] = {}
+        missing: list[int] = []
+        for level in levels:
+            if header := self.get(level):
+                headers[level] = header
+            else:
+                missing.append(level)
+
+        if missing and self._path:
+            async with self._lock:
+                stored = await asyncio.to_thread(self._read, missing)
+            for header in stored:
+                self._put(header)
+                headers[header.level] = header
+        return headers
+
+    async def put_many(self, headers: Iterable[BlockHeader]) -> None:
+        irreversible: list[BlockHeader] = []
+        for header in headers:
+            self._put(header)
+            if header.level <= self._head_level - self._rollback_depth:
+                irreversible.append(header)
+
+        if irreversible and self._path:
+            async with self._lock:
+                await asyncio.to_thread(self._write, irreversible)
+
+    def rollback(self, to_level: int) -> None:
+        """Drop headers above `to_level` from memory; disk tier holds only irreversible headers, so it's not touched"""
+        for level in [level for level in self._headers if level > to_level]:
+            del self._headers[level]
+
+    async def close(self) -> None:
+        """Close on-disk tier if it was opened"""
+        async with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _put(self, header: BlockHeader) -> None:
+        self._headers[header.level] = header
+        self._headers.move_to_end(header.level)
+        while len(self._headers) > self._size:
+            self._headers.popitem(last=False)
+
+    def _get_db(self) -> sqlite3.Connection:
+        if self._db is None:
+            if not self._path:
+                raise FrameworkException('Header cache path is not set')
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self._path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS headers '
+                '(level INTEGER PRIMARY KEY, hash TEXT, parent_hash TEXT, timestamp INTEGER)'
+            )
+        return self._db
+
+    def _read(self, levels: list[int]) -> list[BlockHeader]:
+        db = self._get_db()
+        headers: list[BlockHeader] = []
+        for i in range(0, len(levels), HEADER_QUERY_CHUNK):
+            chunk = levels[i : i + HEADER_QUERY_CHUNK]
+            rows = db.execute(
+                f'SELECT level, hash, parent_hash, timestamp FROM headers WHERE level IN ({",".join("?" * len(chunk))})',
+                chunk,
+            )
+            headers.extend(BlockHeader(*row) for row in rows)
+        return headers
+
+    def _write(self, headers: list[BlockHeader]) -> None:
+        db = self._get_db()
+        with db:
+            db.executemany('INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?)', headers)
+
+
+class Reorg(NamedTuple):
+    """Levels `to_level + 1`..`from_level` were orphaned"""
+
+    from_level: int
+    to_level: int
+
+
+class ReorgTracker:
+    """Chain of the latest block headers"""
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._chain: OrderedDict[int, BlockHeader] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._chain)
+
+    def __contains__(self, header: BlockHeader) -> bool:
+        return self._chain.get(header.level) == header
+
+    @property
+    def head(self) -> BlockHeader | None:
+        return next(reversed(self._chain.values()), None)
+
+    async def add(
+        self,
+        header: BlockHeader,
+        get_header: Callable[[str], Awaitable[BlockHeader | None]],
+    ) -> Reorg | None:
+        """Link the new head to the chain; fetch its missing ancestors with `get_header`.
+
+        If `get_header` returns `None`, the ancestor is unknown to the node, and all levels in the chain are rolled back.
+        """
+        head = self.head
+        if head is None:
+            self._put(header)
+            return None
+
+        lowest_level = next(iter(self._chain))
+        branch: list[BlockHeader] = []
+        ancestor: int | None = None
+        unknown = False
+        block = header
+        while True:
+            if block in self:
+                ancestor = block.level
+                break
+            branch.append(block)
+            parent = self._chain.get(block.level - 1)
+            if parent and parent.hash == block.parent_hash:
+                ancestor = parent.level
+                break
+            if block.level <= lowest_level or len(branch) > self._size:
+                break
+            parent_block = await get_header(block.parent_hash)
+            if parent_block is None:
+                _logger.warning('Block %s is unknown to node; rolling back all levels', block.parent_hash)
+                unknown = True
+                break
+            block = parent_block
+
+        if ancestor is None:
+            if branch[-1].level > head.level and not unknown:
+                _logger.warning('Chain gap is longer than %s levels; assuming no reorg', self._size)
+                self._chain.clear()
+                ancestor = head.level
+            else:
+                _logger.warning('Reorg is deeper than %s levels; rolling back all of them', self._size)
+                ancestor = lowest_level - 1
+
+        reorg = None
+        if ancestor < head.level:
+            for level in [level for level in self._chain if level > ancestor]:
+                del self._chain[level]
+            reorg = Reorg(head.level, ancestor)
+
+        for block in reversed(branch):
+            self._put(block)
+        return reorg
+
+    def _put(self, header: BlockHeader) -> None:
+        self._chain[header.level] = header
+        while len(self._chain) > self._size:
+            self._chain.popitem(last=False)
@@ -0,0 +1,65 @@
+"""Hedged requests to redundant EVM nodes.
+
+When an index uses several `evm.node` datasources, a single slow response stalls the sync loop. If the datasource
+has `hedge_budget` set, `HedgePolicy` tracks rolling p95 latency of its requests per method, and a fetcher sends the
+same request to another node once the primary one is slower than that. The first successful response wins; the
+other request is cancelled. The fraction of hedged requests never exceeds the budget.
+"""
+
+import logging
+from collections import defaultdict
+from collections import deque
+
+from dipdup.performance import metrics
+
+HEDGE_LATENCY_SAMPLES = 100
+# NOTE: Don't hedge until p95 is based on enough samples
+HEDGE_MIN_SAMPLES = 20
+
+_logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """Rolling request latency of a single node and the budget of requests hedged to other nodes"""
+
+    def __init__(self, name: str, budget: float) -> None:
+        self._name = name
+        self._budget = budget
+        self._latencies: defaultdict[str, deque[float]] = defaultdict(lambda: deque(maxlen=HEDGE_LATENCY_SAMPLES))
+        self._requests = 0
+        self._hedged = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._budget > 0
+
+    @property
+    def rate(self) -> float:
+        return self._hedged / self._requests if self._requests else 0.0
+
+    def get_p95_latency(self, method: str) -> float | None:
+        latencies = self._latencies[method]
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return sorted(latencies)[int(len(latencies) * 0.95)]
+
+    def on_request(self) -> None:
+        self._requests += 1
+        metrics._evm_node_hedge_rate[self._name] = self.rate
+
+    def on_response(self, method: str, elapsed: float) -> None:
+        """Record request latency; lost requests are recorded with the time they were cancelled at"""
+        self._latencies[method].append(elapsed)
+
+    def try_hedge(self) -> bool:
+        """Spend the budget on a hedged request if there's any left"""
+        if self._hedged + 1 > self._budget * self._requests:
+            return False
+        self._hedged += 1
+        metrics._evm_node_hedge_rate[self._name] = self.rate
+        return True
+
+    def on_winner(self, hedged: bool) -> None:
+        winner = 'hedge' if hedged else 'primary'
+        _logger.debug('%s: hedged request won by %s node', self._name, winner)
+        metrics._evm_node_hedged_requests[(self._name, winner)] += 1
@@ -1,14 +1,26 @@
 import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
 from copy import copy
+from dataclasses import dataclass
+from functools import partial
 from typing import Any
 from typing import Generic
 from typing import TypeVar
 from typing import cast
 
+import orjson
+
 from dipdup.config import HttpConfig
 from dipdup.datasources import Datasource
 from dipdup.datasources import IndexDatasource
 from dipdup.datasources import IndexDatasourceConfigT
+from dipdup.decoder import decode
 from dipdup.exceptions import DatasourceError
 from dipdup.exceptions import FrameworkException
 from dipdup.http import safe_exceptions
@@ -16,7 +28,21 @@ from dipdup.models import Head
 from dipdup.models._subsquid import AbstractSubsquidQuery
 from dipdup.sys import fire_and_forget
 
+# NOTE: Consecutive errors after which worker session is closed
+WORKER_MAX_ERRORS = 3
+# NOTE: Don't reuse workers slower than the fastest one by this factor; ask router for another one
+WORKER_SLOW_FACTOR = 3.0
+WORKER_LATENCY_ALPHA = 0.3
+# NOTE: Open worker sessions; least recently used ones are closed when router returns a new worker
+WORKER_MAX_SESSIONS = 16
+
+# NOTE: Complete strings and brackets; a lone quote means the string continues in the next chunk
+_JSON_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|"|[\[\]{}]', re.DOTALL)
+
 QueryT = TypeVar('QueryT', bound=AbstractSubsquidQuery)
+T = TypeVar('T')
+
+_logger = logging.getLogger(__name__)
 
 
 class AbstractSubsquidWorker(Datasource[Any], Generic[QueryT]):
@@ -32,6 +58,187 @@ class AbstractSubsquidWorker(Datasource[Any], Generic[QueryT]):
         )
         return cast(list[dict[str, Any]], response)
 
+    async def query_bytes(self, query: QueryT) -> bytes:
+        """Same as `query`, but return response body as is"""
+        self._logger.debug('Worker query: %s', query)
+        return await self.request_bytes(
+            'post',
+            url='',
+            json=query,
+        )
+
+    async def iter_query(self, query: QueryT) -> AsyncIterator[dict[str, Any]]:
+        """Same as `query`, but yield blocks as soon as they are received"""
+        self._logger.debug('Worker streaming query: %s', query)
+        splitter = JsonArraySplitter()
+        async for chunk in self.stream(
+            'post',
+            url='',
+            json=query,
+        ):
+            for item in splitter.feed(chunk):
+                yield orjson.loads(item)
+        splitter.close()
+
+
+def parse_blocks(response: bytes) -> tuple[int | None, list[dict[str, Any]]]:
+    """Parse worker response body; return the last level in it, if any, along with blocks"""
+    blocks: list[dict[str, Any]] = orjson.loads(response)
+    if not blocks:
+        return None, blocks
+    return blocks[-1]['header']['number'], blocks
+
+
+async def _parse_blocks(response: bytes) -> tuple[int | None, list[dict[str, Any]]]:
+    return parse_blocks(response)
+
+
+class JsonArraySplitter:
+    """Incremental splitter of JSON array of objects into raw items.
+
+    Only strings and brackets are tracked, so it doesn't validate the input; items are parsed separately. Buffer holds
+    the unfinished item only.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._start = 0
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        buffer = self._buffer
+        buffer.extend(chunk)
+        items: list[bytes] = []
+
+        for match in _JSON_TOKEN.finditer(buffer, self._pos):
+            start, end = match.span()
+            char = buffer[start]
+            if char == 34:  # "
+                if end - start == 1:
+                    self._pos = start
+                    break
+            elif char in b'[{':
+                self._depth += 1
+                if self._depth == 2:
+                    self._start = start
+            else:
+                self._depth -= 1
+                if self._depth == 1:
+                    items.append(bytes(buffer[self._start : end]))
+                elif self._depth < 0:
+                    raise FrameworkException('Unexpected closing bracket in JSON array')
+        else:
+            self._pos = len(buffer)
+
+        # NOTE: Drop everything before the unfinished item
+        keep = self._start if self._depth >= 2 else self._pos
+        if keep:
+            del buffer[:keep]
+            self._pos -= keep
+            self._start = 0
+        return items
+
+    def close(self) -> None:
+        if self._depth or self._buffer.strip():
+            raise FrameworkException('JSON array is incomplete')
+
+
+@dataclass
+class _WorkerState:
+    worker: AbstractSubsquidWorker[Any]
+    first_level: int | None = None
+    last_level: int | None = None
+    latency: float | None = None
+    errors: int = 0
+
+
+class SubsquidWorkerPool:
+    """Open worker sessions and level ranges they are known to serve.
+
+    Worker is reused for levels within its range and for the next level after it until it fails or returns nothing;
+    then the range is forgotten and router is asked again. Among workers covering a level the fastest one is picked.
+    At most `max_sessions` sessions are kept open; least recently used ones are closed first.
+    """
+
+    def __init__(self, max_sessions: int = WORKER_MAX_SESSIONS) -> None:
+        self._max_sessions = max_sessions
+        self._workers: OrderedDict[str, _WorkerState] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    def find(self, level: int) -> AbstractSubsquidWorker[Any] | None:
+        best: _WorkerState | None = None
+        for state in self._workers.values():
+            if state.errors or state.first_level is None or state.last_level is None:
+                continue
+            if not state.first_level <= level <= state.last_level + 1:
+                continue
+            if best is None or (state.latency or 0) < (best.latency or 0):
+                best = state
+        if best is None:
+            return None
+
+        latencies = [s.latency for s in self._workers.values() if s.latency is not None and not s.errors]
+        if best.latency and latencies and best.latency > min(latencies) * WORKER_SLOW_FACTOR:
+            return None
+        self._workers.move_to_end(best.worker.url)
+        return best.worker
+
+    async def add(self, worker: AbstractSubsquidWorker[Any]) -> AbstractSubsquidWorker[Any]:
+        """Open session of a new worker; return the existing one if router returned known URL"""
+        if state := self._workers.get(worker.url):
+            self._workers.move_to_end(worker.url)
+            return state.worker
+        while len(self._workers) >= self._max_sessions:
+            # NOTE: A request still running on the evicted worker fails and is retried like any other worker error
+            _, evicted = self._workers.popitem(last=False)
+            _logger.debug('Closing least recently used worker session %s', evicted.worker.url)
+            await evicted.worker.__aexit__(None, None, None)
+        await worker.__aenter__()
+        self._workers[worker.url] = _WorkerState(worker)
+        return worker
+
+    def on_success(
+        self, worker: AbstractSubsquidWorker[Any], first_level: int, last_level: int, elapsed: float
+    ) -> None:
+        state = self._workers.get(worker.url)
+        # NOTE: Evicted while the request was running
+        if state is None:
+            return
+        state.errors = 0
+        state.first_level = first_level if state.first_level is None else min(state.first_level, first_level)
+        state.last_level = last_level if state.last_level is None else max(state.last_level, last_level)
+        if state.latency is None:
+            state.latency = elapsed
+        else:
+            state.latency += WORKER_LATENCY_ALPHA * (elapsed - state.latency)
+
+    async def on_error(self, worker: AbstractSubsquidWorker[Any]) -> None:
+        state = self._workers.get(worker.url)
+        if state is None:
+            return
+        state.first_level = state.last_level = None
+        state.errors += 1
+        if state.errors >= WORKER_MAX_ERRORS:
+            _logger.info('Closing worker session %s after %s errors', worker.url, state.errors)
+            del self._workers[worker.url]
+            await worker.__aexit__(None, None, None)
+
+    def forget(self, worker: AbstractSubsquidWorker[Any]) -> None:
+        """Worker doesn't serve requested level; keep session but ask router next time"""
+        if state := self._workers.get(worker.url):
+            state.first_level = state.last_level = None
+
+    async def close(self) -> None:
+        while self._workers:
+            _, state = self._workers.popitem()
+            try:
+                await state.worker.__aexit__(None, None, None)
+            except Exception as e:
+                _logger.warning('Failed to close worker session %s: %s', state.worker.url, e)
+
 
 class AbstractSubsquidDatasource(
     IndexDatasource[IndexDatasourceConfigT],
@@ -44,8 +251,13 @@ class AbstractSubsquidDatasource(
     def __init__(self, config: Any) -> None:
         self._started = asyncio.Event()
         self._last_level: int = 0
+        self._workers = SubsquidWorkerPool()
         super().__init__(config, False)
 
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: Any) -> None:
+        await self._workers.close()
+        await super().__aexit__(exc_type, exc_val, exc_tb)
+
     async def run(self) -> None:
         await self._started.wait()
 
@@ -60,19 +272,107 @@ class AbstractSubsquidDatasource(
     async def subscribe(self) -> None:
         pass
 
-    # FIXME: Heavily copy-pasted from `HTTPGateway._retry_request`
     async def query_worker(self, query: QueryT, current_level: int) -> list[dict[str, Any]]:
+        _, blocks = await self._query_worker(query, current_level, _parse_blocks)
+        return blocks
+
+    async def decode_worker(
+        self,
+        query: QueryT,
+        current_level: int,
+        fn: Callable[[bytes], tuple[int | None, T]],
+    ) -> tuple[int | None, T]:
+        """Same as `query_worker`, but response body is passed to `fn` in the decode pool.
+
+        `fn` must return the last level in the response, if any, along with decoded data; both are returned.
+        """
+        return await self._query_worker(query, current_level, partial(decode, fn))
+
+    # FIXME: Heavily copy-pasted from `HTTPGateway._retry_request`
+    async def _query_worker(
+        self,
+        query: QueryT,
+        current_level: int,
+        fn: Callable[[bytes], Awaitable[tuple[int | None, T]]],
+    ) -> tuple[int | None, T]:
         retry_sleep = self._http_config.retry_sleep
         attempt = 1
         last_attempt = self._http_config.retry_count + 1
 
         while True:
+            if worker := self._workers.find(current_level):
+                started_at = time.perf_counter()
+                try:
+                    response = await worker.query_bytes(query)
+                except safe_exceptions as e:
+                    # NOTE: Worker doesn't serve this range anymore or is unhealthy; ask router without waiting
+                    self._logger.debug('Reused worker query failed: %s', e)
+                    await self._workers.on_error(worker)
+                    continue
+                elapsed = time.perf_counter() - started_at
+                last_level, result = await fn(response)
+                if last_level is not None:
+                    self._workers.on_success(worker, current_level, last_level, elapsed)
+                    return last_level, result
+                self._workers.forget(worker)
+
+            worker = None
             try:
                 # NOTE: Request a fresh worker after each failed attempt
-                worker_datasource = await self._get_worker(current_level)
-                async with worker_datasource:
-                    return await worker_datasource.query(query)
+                worker = await self._workers.add(await self._get_worker(current_level))
+                started_at = time.perf_counter()
+                response = await worker.query_bytes(query)
+            except safe_exceptions as e:
+                if worker:
+                    await self._workers.on_error(worker)
+                self._logger.warning('Worker query attempt %s/%s failed: %s', attempt, last_attempt, e)
+                if attempt == last_attempt:
+                    raise e
+
+                self._logger.info('Waiting %s seconds before retry', retry_sleep)
+                await asyncio.sleep(retry_sleep)
+
+                attempt += 1
+                retry_sleep *= self._http_config.retry_multiplier
+                continue
+
+            elapsed = time.perf_counter() - started_at
+            last_level, result = await fn(response)
+            if last_level is not None:
+                self._workers.on_success(worker, current_level, last_level, elapsed)
+            return last_level, result
+
+    async def stream_worker(self, query: QueryT, current_level: int) -> AsyncIterator[dict[str, Any]]:
+        """Same as `query_worker`, but yield blocks as soon as they are parsed.
+
+        Interrupted stream is resumed from the block after the last yielded one.
+        """
+        retry_sleep = self._http_config.retry_sleep
+        attempt = 1
+        last_attempt = self._http_config.retry_count + 1
+
+        while True:
+            first_level = current_level
+            query = copy(query)
+            query['fromBlock'] = first_level
+
+            worker = self._workers.find(first_level)
+            reused = worker is not None
+            try:
+                if worker is None:
+                    worker = await self._workers.add(await self._get_worker(first_level))
+                started_at = time.perf_counter()
+                async for block in worker.iter_query(query):
+                    current_level = block['header']['number'] + 1
+                    yield block
             except safe_exceptions as e:
+                if worker:
+                    await self._workers.on_error(worker)
+                # NOTE: Worker doesn't serve this range anymore or is unhealthy; ask router without waiting
+                if reused and current_level == first_level:
+                    self._logger.debug('Reused worker query failed: %s', e)
+                    continue
+
                 self._logger.warning('Worker query attempt %s/%s failed: %s', attempt, last_attempt, e)
                 if attempt == last_attempt:
                     raise e
@@ -82,6 +382,14 @@ class AbstractSubsquidDatasource(
 
                 attempt += 1
                 retry_sleep *= self._http_config.retry_multiplier
+                continue
+
+            if current_level > first_level:
+                self._workers.on_success(worker, first_level, current_level - 1, time.perf_counter() - started_at)
+            elif reused:
+                self._workers.forget(worker)
+                continue
+            return
 
     async def initialize(self) -> None:
         curr_level = self._last_level
@@ -5,12 +5,15 @@ from collections import defaultdict
 from collections import deque
 from collections.abc import Awaitable
 from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Sequence
 from dataclasses import dataclass
 from dataclasses import field
 from typing import TYPE_CHECKING
 from typing import Any
 from uuid import uuid4
 
+import aiohttp
 import pysignalr
 import pysignalr.exceptions
 from pysignalr.messages import CompletionMessage
@@ -20,6 +23,10 @@ from dipdup.config.evm_node import EvmNodeDatasourceConfig
 from dipdup.datasources import EvmHistoryProvider
 from dipdup.datasources import EvmRealtimeProvider
 from dipdup.datasources import IndexDatasource
+from dipdup.datasources._headers import BlockHeader
+from dipdup.datasources._headers import HeaderCache
+from dipdup.datasources._headers import ReorgTracker
+from dipdup.datasources._hedging import HedgePolicy
 from dipdup.datasources._web3 import create_web3_client
 from dipdup.exceptions import DatasourceError
 from dipdup.exceptions import FrameworkException
@@ -37,6 +44,7 @@ from dipdup.pysignalr import Message
 from dipdup.pysignalr import WebsocketMessage
 from dipdup.pysignalr import WebsocketProtocol
 from dipdup.pysignalr import WebsocketTransport
+from dipdup.segments import get_segment_store
 from dipdup.utils import Watchdog
 
 if TYPE_CHECKING:
@@ -45,6 +53,10 @@ if TYPE_CHECKING:
 
 NODE_LEVEL_TIMEOUT = 0.1
 NODE_LAST_MILE = 128
+# NOTE: Error code of JSON-RPC server for malformed request; batches are not supported if returned for the whole batch
+JSONRPC_INVALID_REQUEST = -32600
+# NOTE: Error code of JSON-RPC server for unknown or disabled method
+JSONRPC_METHOD_NOT_FOUND = -32601
 
 
 HeadCallback = Callable[['EvmNodeDatasource', EvmNodeHeadData], Awaitable[None]]
@@ -58,8 +70,12 @@ class LevelData:
     head: dict[str, Any] | None = None
     events: deque[dict[str, Any]] = field(default_factory=deque)
     fetch_transactions: bool = False
+    block: dict[str, Any] | None = None
+    # NOTE: Set in prefetch mode; level is complete when the task is done
+    prefetch: asyncio.Task[None] | None = None
 
     created_at: float = field(default_factory=time.time)
+    head_at: float | None = None
 
     async def get_head(self) -> dict[str, Any]:
         await self.wait_level()
@@ -68,11 +84,20 @@ class LevelData:
         return self.head
 
     async def wait_level(self) -> None:
+        if self.prefetch:
+            await self.prefetch
+            return
         to_wait = NODE_LEVEL_TIMEOUT - (time.time() - self.created_at)
         if to_wait > 0:
             await asyncio.sleep(to_wait)
 
 
+def _is_batch_rejected(response: dict[str, Any] | None) -> bool:
+    if response is None or response.get('id') is None:
+        return True
+    return bool(response.get('error', {}).get('code') == JSONRPC_INVALID_REQUEST)
+
+
 class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProvider, EvmRealtimeProvider):
     _default_http_config = HttpConfig(
         batch_size=10,
@@ -85,10 +110,25 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
         self._web3_client: AsyncWeb3 | None = None
         self._ws_client: WebsocketTransport | None = None
         self._requests: dict[str, tuple[asyncio.Event, Any]] = {}
+        # NOTE: None until the first batch request succeeds or gets rejected
+        self._batch_support: bool | None = None
+        self._ws_batch_ids: set[str] = set()
         self._subscription_ids: dict[str, EvmNodeSubscription] = {}
         self._emitter_queue: Queue[LevelData] = Queue()
         self._level_data: defaultdict[str, LevelData] = defaultdict(LevelData)
         self._watchdog: Watchdog = Watchdog(self._http_config.connection_timeout)
+        # NOTE: Shared by fetchers of all indexes using this datasource
+        self._fetch_semaphore = asyncio.Semaphore(config.concurrency)
+        self._prefetch_semaphore = asyncio.Semaphore(max(config.realtime_prefetch, 1))
+        self._hedge_policy = HedgePolicy(config.name, config.hedge_budget)
+        # NOTE: In prefetch mode logs are requested by block hash instead of subscribing to them
+        self._logs_filters: dict[EvmNodeLogsSubscription, dict[str, Any]] = {}
+        segment_store = get_segment_store()
+        self._chain = ReorgTracker(NODE_LAST_MILE)
+        self._headers = HeaderCache(
+            rollback_depth=config.rollback_depth,
+            path=segment_store.path / config.name / 'headers.sqlite' if segment_store else None,
+        )
 
         self._on_head_callbacks: set[HeadCallback] = set()
         self._on_events_callbacks: set[LogsCallback] = set()
@@ -101,10 +141,27 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
             raise FrameworkException('web3 client is not initialized; is datasource running?')
         return self._web3_client
 
+    @property
+    def fetch_semaphore(self) -> asyncio.Semaphore:
+        return self._fetch_semaphore
+
+    @property
+    def hedge_policy(self) -> HedgePolicy:
+        return self._hedge_policy
+
+    @property
+    def headers(self) -> HeaderCache:
+        return self._headers
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: Any) -> None:
+        await self._headers.close()
+        await super().__aexit__(exc_type, exc_val, exc_tb)
+
     async def initialize(self) -> None:
         self._web3_client = await create_web3_client(self)
         level = await self.get_head_level()
         self.set_sync_level(None, level)
+        self._headers.set_head_level(level)
 
     async def run(self) -> None:
         if self.realtime:
@@ -117,35 +174,39 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
             while True:
                 level = await self.get_head_level()
                 self.set_sync_level(None, level)
+                self._headers.set_head_level(level)
                 await asyncio.sleep(self._http_config.polling_interval)
 
     async def _emitter_loop(self) -> None:
-        known_level = 0
-
         while True:
             level_data = await self._emitter_queue.get()
             head = EvmNodeHeadData.from_json(
                 await level_data.get_head(),
             )
+            header = BlockHeader(head.level, head.hash, head.parent_hash, head.timestamp)
+            known_head = self._chain.head
 
-            self._logger.info('New head: %s -> %s', known_level, head.level)
+            self._logger.info('New head: %s -> %s', known_head.level if known_head else 0, head.level)
             await self.emit_head(head)
 
-            # NOTE: Push rollback to all EVM indexes, but continue processing.
-            if head.level <= known_level:
-                for type_ in (
-                    SubsquidMessageType.blocks,
-                    SubsquidMessageType.logs,
-                    SubsquidMessageType.traces,
-                    SubsquidMessageType.transactions,
-                ):
+            # NOTE: Level is already processed, e.g. node switched back to the previous branch
+            known = header in self._chain
+            # NOTE: Push rollback of all types to all EVM indexes, but continue processing. Indexes could have got
+            # data for orphaned levels from fetchers, not only from this emitter.
+            if reorg := await self._chain.add(header, self._get_header):
+                self._headers.rollback(reorg.to_level)
+                for type_ in SubsquidMessageType:
                     await self.emit_rollback(
                         type_,
-                        from_level=known_level,
-                        to_level=head.level - 1,
+                        from_level=reorg.from_level,
+                        to_level=reorg.to_level,
                     )
+            if known:
+                del self._level_data[head.hash]
+                continue
 
-            known_level = head.level
+            self._headers.set_head_level(head.level)
+            await self._headers.put_many((header,))
 
             if raw_events := level_data.events:
                 events = tuple(
@@ -155,10 +216,7 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
                     self._logger.debug('Emitting %s events', len(events))
                     await self.emit_events(events)
             if level_data.fetch_transactions:
-                full_block = await self.get_block_by_level(
-                    block_number=head.level,
-                    full_transactions=True,
-                )
+                full_block = level_data.block or await self.get_block_by_hash(head.hash)
                 transactions = tuple(
                     EvmTransactionData.from_node_json(transaction, head.timestamp)
                     for transaction in full_block['transactions']
@@ -167,8 +225,43 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
                     self._logger.debug('Emitting %s transactions', len(transactions))
                     await self.emit_transactions(transactions)
 
+            if level_data.head_at:
+                metrics._evm_node_head_latency[self.name] += time.time() - level_data.head_at
             del self._level_data[head.hash]
 
+    async def _get_header(self, block_hash: str) -> BlockHeader | None:
+        block = await self._jsonrpc_request('eth_getBlockByHash', [block_hash, False])
+        # NOTE: Pruned or unknown block
+        if block is None:
+            return None
+        return BlockHeader.from_json(block)
+
+    async def _prefetch_level(self, level_data: LevelData) -> None:
+        """Fetch logs and transactions of a new block by its hash"""
+        head = level_data.head
+        if not head:
+            raise FrameworkException('Prefetching level without head')
+
+        calls: list[tuple[str, Any]] = [
+            ('eth_getLogs', [{'blockHash': head['hash'], **logs_filter}]) for logs_filter in self._logs_filters.values()
+        ]
+        if level_data.fetch_transactions:
+            calls.append(('eth_getBlockByHash', [head['hash'], True]))
+        if not calls:
+            return
+
+        async with self._prefetch_semaphore:
+            results = await self._jsonrpc_batch_request(calls)
+
+        if level_data.fetch_transactions:
+            level_data.block = results.pop()
+        # NOTE: Filters of different subscriptions may overlap
+        events: dict[tuple[str, str], dict[str, Any]] = {}
+        for logs in results:
+            for event in logs:
+                events[event['transactionHash'], event['logIndex']] = event
+        level_data.events.extend(sorted(events.values(), key=lambda event: int(event['logIndex'], 16)))
+
     async def _ws_loop(self) -> None:
         self._logger.info('Establishing realtime connection')
         client = self._get_ws_client()
@@ -236,20 +329,58 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
     async def get_block_by_level(self, block_number: int, full_transactions: bool = False) -> dict[str, Any]:
         return await self._jsonrpc_request('eth_getBlockByNumber', [hex(block_number), full_transactions])  # type: ignore[no-any-return]
 
+    async def get_blocks_by_level(
+        self,
+        block_numbers: Iterable[int],
+        full_transactions: bool = False,
+    ) -> list[dict[str, Any]]:
+        blocks: list[dict[str, Any]] = await self._jsonrpc_batch_request(
+            [('eth_getBlockByNumber', [hex(block_number), full_transactions]) for block_number in block_numbers],
+        )
+        await self._headers.put_many(BlockHeader.from_json(block) for block in blocks if block)
+        return blocks
+
+    async def get_headers(self, block_numbers: Sequence[int]) -> dict[int, BlockHeader]:
+        """Get block headers from cache; fetch missing ones"""
+        headers = await self._headers.get_many(block_numbers)
+        missing = [block_number for block_number in block_numbers if block_number not in headers]
+        if missing:
+            for block in await self.get_blocks_by_level(missing):
+                header = BlockHeader.from_json(block)
+                headers[header.level] = header
+        return headers
+
     async def get_events(self, params: dict[str, Any]) -> list[dict[str, Any]]:
         return await self._jsonrpc_request('eth_getLogs', [params])  # type: ignore[no-any-return]
 
+    async def get_traces(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        return await self._jsonrpc_request('trace_filter', [params])  # type: ignore[no-any-return]
+
+    async def get_transactions_by_hash(self, transaction_hashes: Iterable[str]) -> list[dict[str, Any]]:
+        return await self._jsonrpc_batch_request(
+            [('eth_getTransactionByHash', [transaction_hash]) for transaction_hash in transaction_hashes],
+        )
+
+    async def get_transaction_receipts(self, transaction_hashes: Iterable[str]) -> list[dict[str, Any]]:
+        return await self._jsonrpc_batch_request(
+            [('eth_getTransactionReceipt', [transaction_hash]) for transaction_hash in transaction_hashes],
+        )
+
     async def get_head_level(self) -> int:
         return int((await self._jsonrpc_request('eth_blockNumber', [])), 16)
 
     async def _subscribe(self, subscription: EvmNodeSubscription) -> None:
         self._logger.debug('Subscribing to %s', subscription)
-        response = await self._jsonrpc_request(
-            method='eth_subscribe',
-            params=subscription.get_params(),
-            ws=True,
-        )
-        self._subscription_ids[response] = subscription
+        if self._config.realtime_prefetch and isinstance(subscription, EvmNodeLogsSubscription):
+            logs_filter = subscription.get_params()[1]
+            self._logs_filters[subscription] = {k: v for k, v in logs_filter.items() if v is not None}
+        else:
+            response = await self._jsonrpc_request(
+                method='eth_subscribe',
+                params=subscription.get_params(),
+                ws=True,
+            )
+            self._subscription_ids[response] = subscription
         # NOTE: Is's likely unnecessary and/or unreliable, but node doesn't return sync level.
         level = await self.get_head_level()
         self._subscriptions.set_sync_level(subscription, level)
@@ -270,26 +401,7 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
         }
 
         if ws:
-            started_at = time.time()
-            event = asyncio.Event()
-            self._requests[request_id] = (event, None)
-
-            message = WebsocketMessage(request)
-            client = self._get_ws_client()
-
-            async def _request() -> None:
-                await client.send(message)
-                await event.wait()
-
-            await asyncio.wait_for(
-                _request(),
-                timeout=self._http_config.request_timeout,
-            )
-            data = self._requests[request_id][1]
-            del self._requests[request_id]
-
-            metrics.time_in_requests[self.name] += time.time() - started_at
-            metrics.requests_total[self.name] += 1
+            data = (await self._ws_request([request]))[0]
         else:
             data = await self.request(
                 method='post',
@@ -301,9 +413,129 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
             return data
 
         if 'error' in data:
-            raise DatasourceError(data['error']['message'], self.name)
+            error = data['error']
+            raise DatasourceError(error['message'], self.name, error.get('code'))
         return data['result']
 
+    async def _jsonrpc_batch_request(
+        self,
+        calls: Sequence[tuple[str, Any]],
+        ws: bool = False,
+    ) -> list[Any]:
+        """Send multiple calls in JSON-RPC batches of `http.batch_size`; results are returned in the same order.
+
+        Elements that failed are retried with single requests. If the node rejects batches, all further calls are
+        sent one by one.
+        """
+        batch_size = self._http_config.batch_size
+        chunks = [calls[i : i + batch_size] for i in range(0, len(calls), batch_size)]
+        results = await asyncio.gather(*(self._jsonrpc_batch_chunk(chunk, ws) for chunk in chunks))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def _jsonrpc_batch_chunk(
+        self,
+        calls: Sequence[tuple[str, Any]],
+        ws: bool,
+    ) -> list[Any]:
+        async def _single(method: str, params: Any) -> Any:
+            return await self._jsonrpc_request(method, params, ws=ws)
+
+        if len(calls) == 1 or self._batch_support is False:
+            return await asyncio.gather(*(_single(method, params) for method, params in calls))
+
+        requests = [
+            {
+                'jsonrpc': '2.0',
+                'id': uuid4().hex,
+                'method': method,
+                'params': params,
+            }
+            for method, params in calls
+        ]
+
+        items: list[dict[str, Any] | None]
+        if ws:
+            items = await self._ws_request(requests)
+        else:
+            data: Any = None
+            if self._batch_support is None and not self._http_config.replay_path:
+                # NOTE: Don't retry the first batch; node may reject arrays with 4xx status
+                try:
+                    data = await self._http._request(
+                        method='post',
+                        url='',
+                        weight=len(requests),
+                        raw=False,
+                        json=requests,
+                    )
+                except aiohttp.ClientResponseError as e:
+                    if e.status >= 500 or e.status == 429:
+                        raise
+            else:
+                data = await self.request(
+                    method='post',
+                    url='',
+                    weight=len(requests),
+                    json=requests,
+                )
+
+            responses = {item.get('id'): item for item in data} if isinstance(data, list) else {}
+            items = [responses.get(request['id']) for request in requests]
+
+        if all(_is_batch_rejected(item) for item in items):
+            self._logger.warning("Node doesn't support JSON-RPC batches, falling back to single requests")
+            self._batch_support = False
+            return await asyncio.gather(*(_single(method, params) for method, params in calls))
+        self._batch_support = True
+
+        results: list[Any] = [None] * len(requests)
+        retries: dict[int, Any] = {}
+        for i, (request, response) in enumerate(zip(requests, items, strict=True)):
+            if response is None or 'error' in response:
+                self._logger.debug('Batch element `%s` failed, retrying: %s', request['method'], response)
+                retries[i] = _single(request['method'], request['params'])
+            else:
+                results[i] = response['result']
+
+        for i, result in zip(retries, await asyncio.gather(*retries.values()), strict=True):
+            results[i] = result
+        return results
+
+    async def _ws_request(self, requests: list[dict[str, Any]]) -> list[Any]:
+        """Send JSON-RPC request or batch via websocket and wait for responses to every element"""
+        started_at = time.time()
+        events = []
+        for request in requests:
+            event = asyncio.Event()
+            self._requests[request['id']] = (event, None)
+            events.append(event)
+
+        if len(requests) == 1:
+            message = WebsocketMessage(requests[0])
+        else:
+            message = WebsocketMessage(requests)
+            self._ws_batch_ids.update(request['id'] for request in requests)
+        client = self._get_ws_client()
+
+        async def _request() -> None:
+            await client.send(message)
+            for event in events:
+                await event.wait()
+
+        try:
+            await asyncio.wait_for(
+                _request(),
+                timeout=self._http_config.request_timeout,
+            )
+            return [self._requests[request['id']][1] for request in requests]
+        finally:
+            for request in requests:
+                self._requests.pop(request['id'], None)
+                self._ws_batch_ids.discard(request['id'])
+
+            metrics.time_in_requests[self.name] += time.time() - started_at
+            metrics.requests_total[self.name] += 1
+
     async def _on_message(self, message: Message) -> None:
         # NOTE: pysignalr will eventually get a raw client
         if not isinstance(message, WebsocketMessage):
@@ -312,7 +544,14 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
         data = message.data
         self._watchdog.reset()
 
-        if 'id' in data:
+        if 'id' in data and data['id'] is None and 'error' in data:
+            # NOTE: Request couldn't be parsed; it's likely a batch rejected by node. Fail all pending batches.
+            self._logger.warning('Node returned an error without request ID: %s', data['error'])
+            for request_id in self._ws_batch_ids:
+                event = self._requests[request_id][0]
+                self._requests[request_id] = (event, data)
+                event.set()
+        elif 'id' in data:
             request_id = data['id']
             self._logger.debug('Received response for request %s', request_id)
             if request_id not in self._requests:
@@ -338,8 +577,14 @@ class EvmNodeDatasource(IndexDatasource[EvmNodeDatasourceConfig], EvmHistoryProv
         if isinstance(subscription, EvmNodeHeadSubscription):
             level_data = self._level_data[data['hash']]
             level_data.head = data
+            level_data.head_at = time.time()
             if subscription.transactions:
                 level_data.fetch_transactions = True
+            if self._config.realtime_prefetch:
+                level_data.prefetch = asyncio.create_task(
+                    self._prefetch_level(level_data),
+                    name=f'prefetch:{self.name}:{int(data["number"], 16)}',
+                )
             self._emitter_queue.put_nowait(level_data)
         elif isinstance(subscription, EvmNodeLogsSubscription):
             level_data = self._level_data[data['blockHash']]
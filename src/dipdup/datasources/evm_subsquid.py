@@ -7,6 +7,7 @@ from dipdup.config.evm_subsquid import EvmSubsquidDatasourceConfig
 from dipdup.datasources import EvmHistoryProvider
 from dipdup.datasources._subsquid import AbstractSubsquidDatasource
 from dipdup.datasources._subsquid import AbstractSubsquidWorker
+from dipdup.datasources._subsquid import parse_blocks
 from dipdup.models.evm import EvmEventData
 from dipdup.models.evm import EvmTransactionData
 from dipdup.models.evm_subsquid import FieldSelection
@@ -60,6 +61,44 @@ _TRANSACTION_FIELDS: FieldSelection = {
 }
 
 
+def _decode_block_events(level_item: dict[str, Any]) -> tuple[EvmEventData, ...]:
+    header = level_item['header']
+    logs: deque[EvmEventData] = deque()
+    for raw_log in level_item['logs']:
+        logs.append(
+            EvmEventData.from_subsquid_json(
+                event_json=raw_log,
+                header=header,
+            ),
+        )
+    return tuple(logs)
+
+
+def _decode_block_transactions(level_item: dict[str, Any]) -> tuple[EvmTransactionData, ...]:
+    header = level_item['header']
+    transactions: deque[EvmTransactionData] = deque()
+    for raw_transaction in level_item['transactions']:
+        transaction = EvmTransactionData.from_subsquid_json(
+            transaction_json=raw_transaction,
+            header=header,
+        )
+        # NOTE: `None` falue is for chains and block ranges not compliant with the post-Byzantinum
+        # hard fork EVM specification (e.g. before 4.370,000 on Ethereum).
+        if transaction.status != 0:
+            transactions.append(transaction)
+    return tuple(transactions)
+
+
+def _decode_events(response: bytes) -> tuple[int | None, list[tuple[EvmEventData, ...]]]:
+    last_level, blocks = parse_blocks(response)
+    return last_level, [_decode_block_events(level_item) for level_item in blocks]
+
+
+def _decode_transactions(response: bytes) -> tuple[int | None, list[tuple[EvmTransactionData, ...]]]:
+    last_level, blocks = parse_blocks(response)
+    return last_level, [_decode_block_transactions(level_item) for level_item in blocks]
+
+
 class _EvmSubsquidWorker(AbstractSubsquidWorker[Query]):
     pass
 
@@ -75,6 +114,11 @@ class EvmSubsquidDatasource(AbstractSubsquidDatasource[EvmSubsquidDatasourceConf
     async def query_worker(self, query: Query, current_level: int) -> list[dict[str, Any]]:
         return await super().query_worker(query, current_level)
 
+    @property
+    def streaming(self) -> bool:
+        # NOTE: Replayed responses are stored whole
+        return self._config.streaming and not self._http_config.replay_path
+
     async def iter_events(
         self,
         topics: tuple[tuple[str | None, str], ...],
@@ -102,47 +146,52 @@ class EvmSubsquidDatasource(AbstractSubsquidDatasource[EvmSubsquidDatasourceConf
                 'fromBlock': current_level,
                 'toBlock': last_level,
             }
-            response = await self.query_worker(query, current_level)
-
-            for level_item in response:
-                current_level = level_item['header']['number'] + 1
-                logs: deque[EvmEventData] = deque()
-                for raw_log in level_item['logs']:
-                    logs.append(
-                        EvmEventData.from_subsquid_json(
-                            event_json=raw_log,
-                            header=level_item['header'],
-                        ),
-                    )
-                yield tuple(logs)
+            if self.streaming:
+                async for block in self.stream_worker(query, current_level):
+                    current_level = block['header']['number'] + 1
+                    yield _decode_block_events(block)
+                continue
+
+            response_level, response = await self.decode_worker(query, current_level, _decode_events)
+            if response_level is not None:
+                current_level = response_level + 1
+            for logs in response:
+                yield logs
 
     async def iter_transactions(
         self,
         first_level: int,
         last_level: int,
         filters: tuple[TransactionRequest, ...],
+        fields: tuple[str, ...] | None = None,
     ) -> AsyncIterator[tuple[EvmTransactionData, ...]]:
+        """Iterate over transactions matching filters.
+
+        `fields` are Subsquid transaction fields to request; all of them if not set.
+        """
         current_level = first_level
+        field_selection = _TRANSACTION_FIELDS
+        if fields is not None:
+            field_selection = {
+                'block': _TRANSACTION_FIELDS['block'],
+                'transaction': dict.fromkeys(fields, True),  # type: ignore[typeddict-item]
+            }
 
         while current_level <= last_level:
             query: Query = {
-                'fields': _TRANSACTION_FIELDS,
+                'fields': field_selection,
                 'fromBlock': current_level,
                 'toBlock': last_level,
                 'transactions': list(filters),
             }
-            response = await self.query_worker(query, current_level)
-
-            for level_item in response:
-                current_level = level_item['header']['number'] + 1
-                transactions: deque[EvmTransactionData] = deque()
-                for raw_transaction in level_item['transactions']:
-                    transaction = EvmTransactionData.from_subsquid_json(
-                        transaction_json=raw_transaction,
-                        header=level_item['header'],
-                    )
-                    # NOTE: `None` falue is for chains and block ranges not compliant with the post-Byzantinum
-                    # hard fork EVM specification (e.g. before 4.370,000 on Ethereum).
-                    if transaction.status != 0:
-                        transactions.append(transaction)
-                yield tuple(transactions)
+            if self.streaming:
+                async for block in self.stream_worker(query, current_level):
+                    current_level = block['header']['number'] + 1
+                    yield _decode_block_transactions(block)
+                continue
+
+            response_level, response = await self.decode_worker(query, current_level, _decode_transactions)
+            if response_level is not None:
+                current_level = response_level + 1
+            for transactions in response:
+                yield transactions
@@ -16,6 +16,7 @@ from typing import NamedTuple
 from typing import NoReturn
 from typing import cast
 
+import orjson
 import pysignalr.exceptions
 from pysignalr.client import SignalRClient
 from pysignalr.messages import CompletionMessage
@@ -32,6 +33,7 @@ from dipdup.datasources import IndexDatasource
 from dipdup.datasources import TezosAbiProvider
 from dipdup.datasources import TezosHistoryProvider
 from dipdup.datasources import TezosRealtimeProvider
+from dipdup.decoder import decode
 from dipdup.exceptions import DatasourceError
 from dipdup.exceptions import FrameworkException
 from dipdup.models import Head
@@ -154,6 +156,13 @@ BigMapsCallback = Callable[['TezosTzktDatasource', tuple[TezosBigMapData, ...]],
 EventsCallback = Callable[['TezosTzktDatasource', tuple[TezosEventData, ...]], Awaitable[None]]
 
 
+def _decode_operations(response: bytes, fields: tuple[str, ...], type_: str) -> tuple[TezosOperationData, ...]:
+    return tuple(
+        TezosOperationData.from_json(dict(zip(fields, values, strict=True)), type_=type_)
+        for values in orjson.loads(response)
+    )
+
+
 class TezosTzktMessageAction(Enum):
     STATE = 0
     DATA = 1
@@ -652,7 +661,7 @@ class TezosTzktDatasource(
         limit: int | None = None,
     ) -> tuple[TezosOperationData, ...]:
         offset, limit = offset or 0, limit or self.request_limit
-        raw_originations: list[dict[str, Any]] = []
+        originations: tuple[TezosOperationData, ...] = ()
         params = self._get_request_params(
             first_level=first_level,
             last_level=last_level,
@@ -670,41 +679,37 @@ class TezosTzktDatasource(
         if addresses and not code_hashes:
             # FIXME: No pagination because of URL length limit workaround
             for addresses_chunk in split_by_chunks(list(addresses), ORIGINATION_REQUEST_LIMIT):
-                raw_originations += list(
-                    await self._request_values_dict(
-                        'get',
-                        url='v1/operations/originations',
-                        params={
-                            **params,
-                            'originatedContract.in': ','.join(addresses_chunk),
-                        },
-                    )
-                )
-        elif code_hashes and not addresses:
-            raw_originations += list(
-                await self._request_values_dict(
+                originations += await self._request_operations(
+                    'origination',
                     'get',
                     url='v1/operations/originations',
                     params={
                         **params,
-                        # FIXME: Need a helper for this join
-                        'codeHash.in': ','.join(str(h) for h in code_hashes),
+                        'originatedContract.in': ','.join(addresses_chunk),
                     },
                 )
+        elif code_hashes and not addresses:
+            originations += await self._request_operations(
+                'origination',
+                'get',
+                url='v1/operations/originations',
+                params={
+                    **params,
+                    # FIXME: Need a helper for this join
+                    'codeHash.in': ','.join(str(h) for h in code_hashes),
+                },
             )
         elif not addresses and not code_hashes:
-            raw_originations += list(
-                await self._request_values_dict(
-                    'get',
-                    url='v1/operations/originations',
-                    params=params,
-                )
+            originations += await self._request_operations(
+                'origination',
+                'get',
+                url='v1/operations/originations',
+                params=params,
             )
         elif addresses and code_hashes:
             raise FrameworkException('Either `addresses` or `code_hashes` should be specified')
 
-        # NOTE: `type` field needs to be set manually when requesting operations by specific type
-        return tuple(TezosOperationData.from_json(op, type_='origination') for op in raw_originations)
+        return originations
 
     async def get_transactions(
         self,
@@ -738,15 +743,13 @@ class TezosTzktDatasource(
         else:
             pass
 
-        raw_transactions = await self._request_values_dict(
+        return await self._request_operations(
+            'transaction',
             'get',
             url='v1/operations/transactions',
             params=params,
         )
 
-        # NOTE: `type` field needs to be set manually when requesting operations by specific type
-        return tuple(TezosOperationData.from_json(op, type_='transaction') for op in raw_transactions)
-
     async def iter_transactions(
         self,
         field: str,
@@ -789,15 +792,13 @@ class TezosTzktDatasource(
         if addresses:
             params[f'{field}.in'] = ','.join(addresses)
 
-        raw_transactions = await self._request_values_dict(
+        return await self._request_operations(
+            'sr_execute',
             'get',
             url='v1/operations/sr_execute',
             params=params,
         )
 
-        # NOTE: `type` field needs to be set manually when requesting operations by specific type
-        return tuple(TezosOperationData.from_json(op, type_='sr_execute') for op in raw_transactions)
-
     async def iter_sr_execute(
         self,
         field: str,
@@ -840,15 +841,13 @@ class TezosTzktDatasource(
         if addresses:
             params[f'{field}.in'] = ','.join(addresses)
 
-        raw_transactions = await self._request_values_dict(
+        return await self._request_operations(
+            'sr_cement',
             'get',
             url='v1/operations/sr_cement',
             params=params,
         )
 
-        # NOTE: `type` field needs to be set manually when requesting operations by specific type
-        return tuple(TezosOperationData.from_json(op, type_='sr_cement') for op in raw_transactions)
-
     async def iter_sr_cement(
         self,
         field: str,
@@ -1126,18 +1125,29 @@ class TezosTzktDatasource(
     async def _request_values_dict(self, *args: Any, **kwargs: Any) -> tuple[dict[str, Any], ...]:
         # NOTE: basically this function create dict from list of tuples request
         # NOTE: this is necessary because for TZKT API cursor iteration is more efficient and asking only values is more efficient too """
+        fields = self._get_values_fields(kwargs)
+
+        # NOTE: select.values supported for methods with multiple objects in response only
+        response: list[list[str]] = await self.request(*args, **kwargs)
+        return tuple([dict(zip(fields, values, strict=True)) for values in response])
+
+    async def _request_operations(self, type_: str, *args: Any, **kwargs: Any) -> tuple[TezosOperationData, ...]:
+        """Same as `_request_values_dict`, but response body is decoded to operations in the decode pool"""
+        fields = self._get_values_fields(kwargs)
+        response = await self.request_bytes(*args, **kwargs)
+        # NOTE: `type` field needs to be set manually when requesting operations by specific type
+        return await decode(_decode_operations, response, fields, type_)
+
+    def _get_values_fields(self, kwargs: dict[str, Any]) -> tuple[str, ...]:
         try:
-            fields = kwargs.get('params', {})['select.values'].split(',')
+            fields = tuple(kwargs.get('params', {})['select.values'].split(','))
         except KeyError as e:
             raise DatasourceError('No fields selected, no select.values param in request', self.name) from e
         if len(fields) == 1:
             raise DatasourceError(
                 '_request_values_dict does not support one field request because tzkt will return plain list', self.name
             )
-
-        # NOTE: select.values supported for methods with multiple objects in response only
-        response: list[list[str]] = await self.request(*args, **kwargs)
-        return tuple([dict(zip(fields, values, strict=True)) for values in response])
+        return fields
 
     def _get_request_params(
         self,
@@ -0,0 +1,69 @@
+"""Optional process pool to turn raw datasource responses into data models off the event loop.
+
+Parsing and decoding large responses (`EvmEventData.from_subsquid_json`, `TezosOperationData.from_json` etc.) is
+CPU-bound. When `advanced.decode_workers` is set, datasources submit response bodies as is to worker processes and
+get back tuples of frozen dataclasses; the main loop only matches and commits. Without a pool `decode` calls the
+function in place.
+
+Decode functions must be importable module-level callables with picklable arguments and results. Workers are
+spawned, not forked, so they don't inherit the event loop, open sockets and database connections of the main process.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import TypeVar
+
+from dipdup.exceptions import FrameworkException
+
+_logger = logging.getLogger(__name__)
+
+# NOTE: Small responses are cheaper to decode in place than to pickle the result
+DECODE_THRESHOLD = 2**16
+
+T = TypeVar('T')
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _initialize_worker() -> None:
+    # NOTE: Decode functions are imported by module path on unpickling; `dipdup.datasources` can't be imported first
+    import dipdup.config  # noqa: F401
+
+
+@asynccontextmanager
+async def decode_pool(workers: int | None) -> AsyncIterator[None]:
+    """Start a process pool for decoding; no-op if `workers` is not set"""
+    global _pool
+
+    if not workers:
+        yield
+        return
+
+    if _pool is not None:
+        raise FrameworkException('Decode pool is already running')
+
+    _logger.info('Starting decode pool with %s workers', workers)
+    _pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_initialize_worker,
+    )
+    try:
+        yield
+    finally:
+        pool, _pool = _pool, None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def decode(fn: Callable[..., T], payload: bytes, *args: Any) -> T:
+    """Call `fn(payload, *args)` in the decode pool if it's running and the response body is large enough"""
+    if _pool is None or len(payload) < DECODE_THRESHOLD:
+        return fn(payload, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, fn, payload, *args)
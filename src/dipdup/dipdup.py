@@ -47,6 +47,7 @@ from dipdup.datasources import create_datasource
 from dipdup.datasources.evm_node import EvmNodeDatasource
 from dipdup.datasources.tezos_tzkt import TezosTzktDatasource
 from dipdup.datasources.tezos_tzkt import late_tzkt_initialization
+from dipdup.decoder import decode_pool
 from dipdup.exceptions import ConfigInitializationException
 from dipdup.exceptions import FrameworkException
 from dipdup.hasura import HasuraGateway
@@ -682,6 +683,7 @@ class DipDup:
             await self._set_up_database(stack)
             await self._set_up_transactions(stack)
             await self._set_up_datasources(stack)
+            await self._set_up_decode_pool(stack)
             await self._set_up_hooks()
             await self._set_up_prometheus()
             await self._set_up_api(stack)
@@ -796,6 +798,9 @@ class DipDup:
             )
         )
 
+    async def _set_up_decode_pool(self, stack: AsyncExitStack) -> None:
+        await stack.enter_async_context(decode_pool(self._config.advanced.decode_workers))
+
     async def _set_up_hooks(self) -> None:
         for system_hook_config in SYSTEM_HOOKS.values():
             self._ctx.register_hook(system_hook_config)
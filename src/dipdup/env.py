@@ -80,7 +80,7 @@ def get_path(key: str) -> Path | None:
 
 
 def reload_env() -> None:
-    global CI, DEBUG, DOCKER, JSON_LOG, LOW_MEMORY, NEXT, NO_SYMLINK, NO_VERSION_CHECK, PACKAGE_PATH, REPLAY_PATH, TEST
+    global CI, DEBUG, DOCKER, JSON_LOG, LOW_MEMORY, NEXT, NO_SYMLINK, NO_VERSION_CHECK, PACKAGE_PATH, READAHEAD_MB, REPLAY_PATH, SEGMENTS_PATH, TEST
 
     CI = get_bool('DIPDUP_CI')
     DEBUG = get_bool('DIPDUP_DEBUG')
@@ -91,7 +91,9 @@ def reload_env() -> None:
     NO_SYMLINK = get_bool('DIPDUP_NO_SYMLINK')
     NO_VERSION_CHECK = get_bool('DIPDUP_NO_VERSION_CHECK')
     PACKAGE_PATH = get_path('DIPDUP_PACKAGE_PATH')
+    READAHEAD_MB = get_int('DIPDUP_READAHEAD_MB', 0)
     REPLAY_PATH = get_path('DIPDUP_REPLAY_PATH')
+    SEGMENTS_PATH = get_path('DIPDUP_SEGMENTS_PATH')
     TEST = get_bool('DIPDUP_TEST')
 
 
@@ -110,7 +112,9 @@ NEXT: bool = get_bool('DIPDUP_NEXT')
 NO_SYMLINK: bool = get_bool('DIPDUP_NO_SYMLINK')
 NO_VERSION_CHECK: bool = get_bool('DIPDUP_NO_VERSION_CHECK')
 PACKAGE_PATH: Path | None = get_path('DIPDUP_PACKAGE_PATH')
+READAHEAD_MB: int = get_int('DIPDUP_READAHEAD_MB', 0)
 REPLAY_PATH: Path | None = get_path('DIPDUP_REPLAY_PATH')
+SEGMENTS_PATH: Path | None = get_path('DIPDUP_SEGMENTS_PATH')
 TEST: bool = get_bool('DIPDUP_TEST')
 
 if getenv('CI') == 'true':
@@ -72,6 +72,8 @@ class DatasourceError(Error):
 
     msg: str
     datasource: str
+    # NOTE: JSON-RPC error code, if any
+    code: int | None = None
 
     def _help(self) -> str:
         return f"""
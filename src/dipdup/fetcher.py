@@ -2,32 +2,49 @@ from __future__ import annotations
 
 import asyncio
 import random
+import time
 from abc import ABC
 from abc import abstractmethod
+from bisect import bisect_right
 from collections import defaultdict
 from collections import deque
 from contextlib import suppress
+from heapq import heapify
+from heapq import heappop
+from heapq import heappush
+from itertools import chain
+from operator import attrgetter
 from typing import TYPE_CHECKING
 from typing import Any
 from typing import Generic
 from typing import Protocol
 from typing import TypeVar
+from typing import cast
 
 from dipdup import env
 from dipdup.exceptions import FrameworkException
+from dipdup.performance import estimate_size
 from dipdup.performance import queues
+from dipdup.segments import SEGMENT_SIZE
+from dipdup.segments import get_filter_hash
+from dipdup.segments import get_segment_store
+from dipdup.segments import iter_segments
 from dipdup.utils import FormattedLogger
 
 if TYPE_CHECKING:
     from collections.abc import AsyncGenerator
     from collections.abc import AsyncIterator
+    from collections.abc import Awaitable
     from collections.abc import Callable
     from collections.abc import Iterable
+    from collections.abc import Iterator
 
 from dipdup.datasources import IndexDatasource
 
 
 class HasLevel(Protocol):
+    __slots__ = ()
+
     level: int
 
     @property
@@ -41,29 +58,54 @@ FilterT = TypeVar('FilterT')
 DatasourceT = TypeVar('DatasourceT', bound=IndexDatasource[Any])
 
 
+_get_level = attrgetter('level')
+
+# NOTE: Smoothing factor for per-level latency of striped fetches; higher values favor recent windows
+LATENCY_EWMA_ALPHA = 0.3
+# NOTE: Number of windows in flight per datasource when striping
+STRIPE_WINDOWS_PER_DATASOURCE = 2
+
+
+def _join_chunks(chunks: deque[tuple[BufferT, ...]]) -> tuple[BufferT, ...]:
+    if len(chunks) == 1:
+        return chunks[0]
+    return tuple(chain.from_iterable(chunks))
+
+
 async def yield_by_level(
     iterable: AsyncIterator[tuple[BufferT, ...]]
 ) -> AsyncGenerator[tuple[Level, tuple[BufferT, ...]], None]:
-    items: tuple[BufferT, ...] = ()
+    """Regroup a stream of level-sorted batches into per-level tuples.
 
-    async for item_batch in iterable:
-        items = items + item_batch
+    Every batch is split once using binary search on the level key; only the unfinished trailing level is
+    carried forward to the next batch as a deque of chunks, so the total cost is linear in the number of items.
+    """
+    pending: deque[tuple[BufferT, ...]] = deque()
+    pending_level: Level | None = None
 
-        # NOTE: Yield slices by level except the last one
-        while True:
-            for i in range(len(items) - 1):
-                curr_level, next_level = items[i].level, items[i + 1].level
-
-                # NOTE: Level boundaries found. Exit for loop, stay in while.
-                if curr_level != next_level:
-                    yield curr_level, items[: i + 1]
-                    items = items[i + 1 :]
-                    break
+    async for item_batch in iterable:
+        batch_size = len(item_batch)
+        start = 0
+
+        while start < batch_size:
+            level = item_batch[start].level
+            # NOTE: Most batches from node and Subsquid fetchers contain a single level
+            if item_batch[-1].level == level:
+                end = batch_size
             else:
-                break
+                end = bisect_right(item_batch, level, lo=start, key=_get_level)
+
+            chunk = item_batch[start:end] if start or end != batch_size else item_batch
+            if level != pending_level:
+                if pending:
+                    yield cast(Level, pending_level), _join_chunks(pending)
+                    pending = deque()
+                pending_level = level
+            pending.append(chunk)
+            start = end
 
-    if items:
-        yield items[0].level, items
+    if pending:
+        yield cast(Level, pending_level), _join_chunks(pending)
 
 
 async def _readahead_by_level(
@@ -73,22 +115,35 @@ async def _readahead_by_level(
 ) -> AsyncIterator[tuple[int, tuple[BufferT, ...]]]:
     if env.LOW_MEMORY:
         limit = min(limit, 1000)
+    # NOTE: Byte budget is applied on top of the level limit; whichever is reached first pauses the fetcher
+    size_limit = env.READAHEAD_MB * 2**20
     name = f'{name}:readahead'
     queue: deque[tuple[int, tuple[BufferT, ...]]] = deque()
     queues.add_queue(
         queue,
         name=name,
         limit=limit,
+        size_limit=size_limit,
     )
+    batch_sizes: deque[int] = deque()
+    buffered_size = 0
     has_more = asyncio.Event()
     need_more = asyncio.Event()
 
     async def _readahead() -> None:
+        nonlocal buffered_size
+
         async for level, batch in yield_by_level(fetcher_iter):
+            if size_limit:
+                batch_size = estimate_size(batch)
+                batch_sizes.append(batch_size)
+                buffered_size += batch_size
+                queues.set_size(name, buffered_size)
+
             queue.append((level, batch))
             has_more.set()
 
-            if len(queue) >= limit:
+            if len(queue) >= limit or (size_limit and buffered_size >= size_limit):
                 need_more.clear()
                 await need_more.wait()
 
@@ -100,6 +155,9 @@ async def _readahead_by_level(
     while True:
         while queue:
             level, batch = queue.popleft()
+            if size_limit:
+                buffered_size -= batch_sizes.popleft()
+                queues.set_size(name, buffered_size)
             need_more.set()
             yield level, batch
         has_more.clear()
@@ -112,6 +170,240 @@ async def _readahead_by_level(
     queues.remove_queue(name)
 
 
+class DatasourceWeights(Generic[DatasourceT]):
+    """Picks datasources at random, weighted by the inverse of their measured per-level latency."""
+
+    def __init__(self, datasources: tuple[DatasourceT, ...]) -> None:
+        self._datasources = datasources
+        self._latency: dict[DatasourceT, float] = {}
+
+    def get_latency(self, datasource: DatasourceT) -> float | None:
+        return self._latency.get(datasource)
+
+    def choose(self, exclude: set[DatasourceT] | None = None) -> DatasourceT:
+        candidates = [ds for ds in self._datasources if not exclude or ds not in exclude]
+        if not candidates:
+            raise FrameworkException('No datasources left to choose from')
+        if not self._latency:
+            return random.choice(candidates)
+
+        # NOTE: Datasources not measured yet get the best known latency, so they are tried early
+        best = min(self._latency.values())
+        weights = [1 / max(self._latency.get(ds, best), 1e-9) for ds in candidates]
+        return random.choices(candidates, weights=weights)[0]
+
+    def update(self, datasource: DatasourceT, elapsed: float, levels: int) -> None:
+        latency = elapsed / max(levels, 1)
+        previous = self._latency.get(datasource)
+        if previous is not None:
+            latency = LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * previous
+        self._latency[datasource] = latency
+
+
+class _PipelineWindow(Generic[BufferT]):
+    def __init__(self) -> None:
+        self.batches: deque[tuple[BufferT, ...]] = deque()
+        self.ready = asyncio.Event()
+        self.done = False
+        self.error: BaseException | None = None
+        self.head = False
+
+
+class _PipelineBuffer(Generic[BufferT]):
+    """Batches buffered by all windows in flight.
+
+    Windows other than the head one pause when `limit` batches are buffered in total, so readahead stays bounded no
+    matter how many windows are in flight.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._size = 0
+        self._resume = asyncio.Condition()
+
+    async def put(self, window: _PipelineWindow[BufferT], batch: tuple[BufferT, ...]) -> None:
+        def _can_buffer() -> bool:
+            return window.head or self._size < self._limit
+
+        if not _can_buffer():
+            async with self._resume:
+                await self._resume.wait_for(_can_buffer)
+        window.batches.append(batch)
+        self._size += 1
+        window.ready.set()
+
+    async def release(self) -> None:
+        self._size -= 1
+        if self._size == self._limit - 1:
+            await self.notify()
+
+    async def notify(self) -> None:
+        async with self._resume:
+            self._resume.notify_all()
+
+
+async def _iter_windows(
+    fetch: Callable[[_PipelineWindow[BufferT], int, int], Awaitable[None]],
+    buffer: _PipelineBuffer[BufferT],
+    first_level: int,
+    last_level: int,
+    window_size: int,
+    concurrency: int,
+) -> AsyncIterator[tuple[BufferT, ...]]:
+    """Keep `concurrency` windows in flight and yield their batches in level order.
+
+    `fetch` is called with a window and its inclusive level range and puts batches to `buffer`.
+    """
+    windows = deque(
+        (window_first, min(window_first + window_size - 1, last_level))
+        for window_first in range(first_level, last_level + 1, window_size)
+    )
+    in_flight: deque[tuple[_PipelineWindow[BufferT], asyncio.Task[None]]] = deque()
+
+    async def _fetch(window: _PipelineWindow[BufferT], window_first: int, window_last: int) -> None:
+        try:
+            await fetch(window, window_first, window_last)
+        except Exception as e:
+            window.error = e
+        finally:
+            window.done = True
+            window.ready.set()
+
+    try:
+        while windows or in_flight:
+            while windows and len(in_flight) < concurrency:
+                window = _PipelineWindow[BufferT]()
+                window.head = not in_flight
+                in_flight.append((window, asyncio.create_task(_fetch(window, *windows.popleft()))))
+
+            window, _ = in_flight[0]
+            while True:
+                while window.batches:
+                    batch = window.batches.popleft()
+                    await buffer.release()
+                    yield batch
+                if window.done:
+                    break
+                window.ready.clear()
+                await window.ready.wait()
+
+            if window.error:
+                raise window.error
+            in_flight.popleft()
+            if in_flight:
+                in_flight[0][0].head = True
+                await buffer.notify()
+    finally:
+        tasks = [task for _, task in in_flight]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _striped_iter(
+    fetch_window: Callable[[DatasourceT, int, int], AsyncIterator[tuple[BufferT, ...]]],
+    weights: DatasourceWeights[DatasourceT],
+    datasources: tuple[DatasourceT, ...],
+    first_level: int,
+    last_level: int,
+    window_size: int,
+    limit: int,
+    logger: FormattedLogger,
+) -> AsyncIterator[tuple[BufferT, ...]]:
+    """Fetch level windows concurrently from all datasources and yield their batches in level order.
+
+    A window that failed is resumed on another datasource from the level after the last buffered batch; the error is
+    raised once every datasource has failed it. Batches buffered ahead of the current window are limited by `limit`.
+    """
+    buffer = _PipelineBuffer[BufferT](limit)
+
+    async def _fetch(window: _PipelineWindow[BufferT], window_first: int, window_last: int) -> None:
+        failed: set[DatasourceT] = set()
+        next_level = window_first
+        while True:
+            datasource = weights.choose(exclude=failed)
+            started, waited = time.perf_counter(), 0.0
+            try:
+                async for batch in fetch_window(datasource, next_level, window_last):
+                    put_at = time.perf_counter()
+                    await buffer.put(window, batch)
+                    waited += time.perf_counter() - put_at
+                    if batch:
+                        next_level = batch[-1].level + 1
+            except Exception as e:
+                failed.add(datasource)
+                if len(failed) == len(datasources):
+                    raise
+                logger.warning(
+                    'Failed to fetch levels %s-%s from `%s`, retrying on another datasource: %s',
+                    next_level,
+                    window_last,
+                    datasource.name,
+                    e,
+                )
+                continue
+
+            # NOTE: Time spent waiting for the consumer says nothing about the datasource
+            weights.update(datasource, time.perf_counter() - started - waited, window_last - window_first + 1)
+            return
+
+    return _iter_windows(
+        fetch=_fetch,
+        buffer=buffer,
+        first_level=first_level,
+        last_level=last_level,
+        window_size=window_size,
+        concurrency=len(datasources) * STRIPE_WINDOWS_PER_DATASOURCE,
+    )
+
+
+def _pipelined_iter(
+    iter_range: Callable[[int, int], AsyncIterator[tuple[BufferT, ...]]],
+    first_level: int,
+    last_level: int,
+    window_size: int,
+    concurrency: int,
+    limit: int,
+) -> AsyncIterator[tuple[BufferT, ...]]:
+    """Iterate over level windows of a single datasource concurrently and yield their batches in level order.
+
+    Batches buffered ahead of the current window are limited by `limit`.
+    """
+    buffer = _PipelineBuffer[BufferT](limit)
+
+    async def _fetch(window: _PipelineWindow[BufferT], window_first: int, window_last: int) -> None:
+        async for batch in iter_range(window_first, window_last):
+            await buffer.put(window, batch)
+
+    return _iter_windows(
+        fetch=_fetch,
+        buffer=buffer,
+        first_level=first_level,
+        last_level=last_level,
+        window_size=window_size,
+        concurrency=concurrency,
+    )
+
+
+class LevelBuffer(defaultdict[Level, deque[BufferT]]):
+    """Mapping of levels to fetched items; keeps a heap of buffered levels to pop them in order."""
+
+    def __init__(self) -> None:
+        super().__init__(deque)
+        self._levels: list[Level] = []
+
+    def __missing__(self, level: Level) -> deque[BufferT]:
+        heappush(self._levels, level)
+        return super().__missing__(level)
+
+    def pop_until(self, level: Level) -> Iterator[tuple[Level, deque[BufferT]]]:
+        """Pop buffered levels lower or equal to `level` in ascending order"""
+        levels = self._levels
+        while levels and levels[0] <= level:
+            next_level = heappop(levels)
+            yield next_level, self.pop(next_level)
+
+
 class FetcherChannel(ABC, Generic[BufferT, DatasourceT, FilterT]):
     def __init__(
         self,
@@ -169,7 +461,8 @@ class DataFetcher(ABC, Generic[BufferT, DatasourceT]):
         self._last_level = last_level
         self._readahead_limit = readahead_limit
         self._logger = FormattedLogger(__name__, fmt=f'{self._name}: ' + '{}')
-        self._buffer: defaultdict[Level, deque[BufferT]] = defaultdict(deque)
+        self._buffer: LevelBuffer[BufferT] = LevelBuffer()
+        self._weights: DatasourceWeights[DatasourceT] = DatasourceWeights(datasources)
         self._head = 0
 
     def __repr__(self) -> str:
@@ -199,33 +492,120 @@ class DataFetcher(ABC, Generic[BufferT, DatasourceT]):
         ):
             yield level, batch
 
+    def striped_iter(
+        self,
+        fetch_window: Callable[[DatasourceT, int, int], AsyncIterator[tuple[BufferT, ...]]],
+        window_size: int,
+        first_level: int,
+        last_level: int,
+    ) -> AsyncIterator[tuple[BufferT, ...]]:
+        """Split the level range into windows of `window_size` levels and fetch them from all datasources at once.
+
+        `fetch_window` is called with a datasource and an inclusive level range and yields batches sorted by level;
+        a level must not be split between batches. Batches buffered ahead of the current window are limited by the
+        readahead limit of the fetcher.
+        """
+        return _striped_iter(
+            fetch_window=fetch_window,
+            weights=self._weights,
+            datasources=self._datasources,
+            first_level=first_level,
+            last_level=last_level,
+            window_size=window_size,
+            limit=self._readahead_limit,
+            logger=self._logger,
+        )
+
+    def pipelined_iter(
+        self,
+        iter_range: Callable[[int, int], AsyncIterator[tuple[BufferT, ...]]],
+        window_size: int,
+        concurrency: int,
+        first_level: int,
+        last_level: int,
+    ) -> AsyncIterator[tuple[BufferT, ...]]:
+        """Split the level range into windows of `window_size` levels and keep `concurrency` of them in flight.
+
+        `iter_range` is called with an inclusive level range and yields batches sorted by level. Batches buffered
+        ahead of the current window are limited by the readahead limit of the fetcher.
+        """
+        if concurrency <= 1 or last_level - first_level < window_size:
+            return iter_range(first_level, last_level)
+        return _pipelined_iter(
+            iter_range=iter_range,
+            first_level=first_level,
+            last_level=last_level,
+            window_size=window_size,
+            concurrency=concurrency,
+            limit=self._readahead_limit,
+        )
+
+    def segmented_iter(
+        self,
+        iter_range: Callable[[int, int], AsyncIterator[tuple[BufferT, ...]]],
+        filter: Any,
+    ) -> AsyncIterator[tuple[BufferT, ...]]:
+        """Iterate over the sync range reading from the segment store when it's enabled.
+
+        `iter_range` fetches an inclusive level range from datasources; `filter` must identify the data it returns.
+        """
+        store = get_segment_store()
+        if store is None:
+            return iter_range(self._first_level, self._last_level)
+
+        index = store.open(
+            datasource='+'.join(sorted(ds.name for ds in self._datasources)),
+            filter_hash=get_filter_hash(self.__class__.__name__, filter),
+        )
+        return iter_segments(
+            index=index,
+            iter_range=iter_range,
+            first_level=self._first_level,
+            last_level=self._last_level,
+            # NOTE: Levels close to the sync target could be rolled back later
+            persist_until=self._last_level - SEGMENT_SIZE,
+        )
+
     async def _merged_iter(
         self,
         channels: set[FetcherChannel[Any, Any, Any]],
         sort_fn: Callable[[Iterable[BufferT]], tuple[BufferT, ...]],
     ) -> AsyncIterator[tuple[Any, ...]]:
-        while True:
-            min_channel = sorted(channels, key=lambda x: x.head)[0]
-            await min_channel.fetch()
+        buffer = self._buffer
+        if not isinstance(buffer, LevelBuffer):
+            raise FrameworkException('Merged iteration requires `LevelBuffer`')
 
-            # NOTE: It's a different channel now, but with greater head level
-            next_min_channel = sorted(channels, key=lambda x: x.head)[0]
-            next_min_head = next_min_channel.head
+        # NOTE: Channel heads only grow; index breaks ties so channels are never compared
+        heads = [(channel.head, i, channel) for i, channel in enumerate(channels)]
+        heapify(heads)
+        target_head = max(head for head, _, _ in heads)
 
-            if self._head <= next_min_head:
-                buffer_keys = sorted(self._buffer.keys())
-                for key in buffer_keys:
-                    if key < self._head:
+        while True:
+            # NOTE: Channels that are behind the most advanced one are on top of the heap; fetch them concurrently to
+            # catch up. If there are none, fetch every unfinished channel.
+            lagging: list[tuple[int, int, FetcherChannel[Any, Any, Any]]] = []
+            while heads and heads[0][0] < target_head:
+                lagging.append(heappop(heads))
+            if all(channel.fetched for _, _, channel in lagging):
+                lagging += heads
+                heads = []
+            await asyncio.gather(*(channel.fetch() for _, _, channel in lagging if not channel.fetched))
+
+            for _, i, channel in lagging:
+                heappush(heads, (channel.head, i, channel))
+                target_head = max(target_head, channel.head)
+            min_head = heads[0][0]
+
+            if self._head <= min_head:
+                for level, level_items in buffer.pop_until(min_head):
+                    if level < self._head:
                         raise FrameworkException('Invalid buffer state')
-                    if key > next_min_head:
-                        break
 
-                    self._head = key
-                    level_items = self._buffer.pop(self._head)
+                    self._head = level
                     yield sort_fn(level_items)
 
             if all(c.fetched for c in channels):
                 break
 
-        if self._buffer:
+        if buffer:
             raise FrameworkException('Items left in queue')
@@ -3,6 +3,7 @@ import hashlib
 import logging
 import platform
 import time
+from collections.abc import AsyncIterator
 from contextlib import AbstractAsyncContextManager
 from contextlib import suppress
 from http import HTTPStatus
@@ -33,6 +34,9 @@ safe_exceptions = (
     aiohttp.ClientPayloadError,
 )
 
+# NOTE: Size of chunks yielded by streaming requests
+STREAM_CHUNK_SIZE = 2**16
+
 
 class HTTPGateway(AbstractAsyncContextManager[None]):
     """Base class for datasources which connect to remote HTTP endpoints"""
@@ -64,6 +68,27 @@ class HTTPGateway(AbstractAsyncContextManager[None]):
         """Send arbitrary HTTP request"""
         return await self._http.request(method, url, weight, **kwargs)
 
+    async def request_bytes(
+        self,
+        method: str,
+        url: str,
+        weight: int = 1,
+        **kwargs: Any,
+    ) -> bytes:
+        """Send arbitrary HTTP request and return response body as is"""
+        return await self._http.request_bytes(method, url, weight, **kwargs)
+
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        weight: int = 1,
+        **kwargs: Any,
+    ) -> AsyncIterator[bytes]:
+        """Send arbitrary HTTP request and yield response body in chunks"""
+        async for chunk in self._http.stream(method, url, weight, **kwargs):
+            yield chunk
+
     def set_user_agent(self, *args: str) -> None:
         """Add list of arguments to User-Agent header"""
         self._http.set_user_agent(*args)
@@ -213,12 +238,7 @@ class _HTTPGateway(AbstractAsyncContextManager[None]):
     ) -> Any:
         """Wrapped aiohttp call with preconfigured headers and ratelimiting"""
         metrics.requests_total[self._alias] += 1
-        if not url:
-            url = self._path or '/'
-        elif url.startswith('http'):
-            url = url.replace(self._url, '').rstrip('/')
-        else:
-            url = f"{self._path.rstrip('/')}/{url}"
+        url = self._resolve_url(url)
 
         headers = kwargs.pop('headers', {})
         headers['User-Agent'] = self.user_agent
@@ -254,6 +274,49 @@ class _HTTPGateway(AbstractAsyncContextManager[None]):
                 return orjson.loads(response._body)
             return response._body
 
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        weight: int = 1,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        **kwargs: Any,
+    ) -> AsyncIterator[bytes]:
+        """Wrapped aiohttp call yielding response body in chunks as they arrive.
+
+        Not retried and not cached; caller is responsible for resuming interrupted streams.
+        """
+        metrics.requests_total[self._alias] += 1
+        url = self._resolve_url(url)
+
+        headers = kwargs.pop('headers', {})
+        headers['User-Agent'] = self.user_agent
+        self._logger.debug('Streaming `%s%s`', self._url, url)
+
+        if self._ratelimiter:
+            await self._ratelimiter.acquire(weight)
+
+        started_at = time.time()
+        try:
+            async with self._session.request(
+                method=method,
+                url=url,
+                headers=headers,
+                raise_for_status=True,
+                **kwargs,
+            ) as response:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    yield chunk
+        finally:
+            metrics.time_in_requests[self._alias] += time.time() - started_at
+
+    def _resolve_url(self, url: str) -> str:
+        if not url:
+            return self._path or '/'
+        if url.startswith('http'):
+            return url.replace(self._url, '').rstrip('/')
+        return f"{self._path.rstrip('/')}/{url}"
+
     async def _replay_request(
         self,
         method: str,
@@ -302,6 +365,31 @@ class _HTTPGateway(AbstractAsyncContextManager[None]):
             return await self._replay_request(method, url, weight, **kwargs)
         return await self._retry_request(method, url, weight, **kwargs)
 
+    async def request_bytes(
+        self,
+        method: str,
+        url: str,
+        weight: int = 1,
+        **kwargs: Any,
+    ) -> bytes:
+        """Performs an HTTP request and returns response body without parsing it."""
+        if self._config.replay_path:
+            # NOTE: Replayed JSON responses are parsed on read; empty ones are `None`
+            response = await self._replay_request(method, url, weight, **kwargs)
+            if response is None:
+                raise InvalidRequestError('Empty response', f'{self._url}{url}')
+            return response if isinstance(response, bytes) else orjson.dumps(response)
+
+        raw_response = await self._retry_request(method, url, weight, raw=True, **kwargs)
+        # NOTE: Same checks as in `_request`; body is parsed by the caller
+        if raw_response.status == HTTPStatus.NO_CONTENT:
+            raise InvalidRequestError('204 No Content', str(raw_response.url))
+        # NOTE: Body is read before the response is released; `read()` would fail now
+        body: bytes | None = raw_response._body
+        if not body:
+            raise InvalidRequestError('Empty response', str(raw_response.url))
+        return body
+
     def set_user_agent(self, *args: str) -> None:
         """Add list of arguments to User-Agent header"""
         self._user_agent_args = args
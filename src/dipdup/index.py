@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import time
 from abc import ABC
 from abc import abstractmethod
 from collections import deque
+from collections.abc import AsyncIterator
 from collections.abc import Iterable
+from contextlib import AsyncExitStack
+from contextlib import suppress
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 from typing import Any
@@ -40,6 +44,67 @@ class MatchedHandler:
     args: Iterable[Any]
 
 
+class SyncBatch:
+    """Commits levels processed during sync in a single transaction every N levels or T milliseconds.
+
+    Batching stops within `advanced.rollback_depth` levels of the sync level, so that these levels are committed
+    one by one in versioned transactions.
+    """
+
+    def __init__(self, index: Index[Any, Any, Any], sync_level: int) -> None:
+        advanced = index._ctx.config.advanced
+        self._index = index
+        self._sync_level = sync_level
+        self._max_levels = advanced.sync_batch_levels
+        self._max_seconds = advanced.sync_batch_ms / 1000 if advanced.sync_batch_ms else None
+        self._last_level = sync_level - (advanced.rollback_depth or 0) - 1
+        self._enabled = bool(self._max_levels or self._max_seconds)
+
+        self._stack: AsyncExitStack | None = None
+        self._levels = 0
+        self._started_at = 0.0
+
+    async def __aenter__(self) -> SyncBatch:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._stack is None:
+            return
+        if exc_info[0] is None:
+            await self.flush()
+        else:
+            stack, self._stack = self._stack, None
+            await stack.__aexit__(*exc_info)
+
+    async def commit(self, level_data: Any, matched_handlers: deque[Any]) -> None:
+        level = level_data[0].level
+        if not self._enabled or level > self._last_level:
+            await self.flush()
+            await self._index._commit_level(level_data, matched_handlers, self._sync_level)
+            return
+
+        if self._stack is None:
+            self._stack = AsyncExitStack()
+            await self._stack.enter_async_context(self._index._ctx.transactions.batch())
+            self._levels = 0
+            self._started_at = time.time()
+
+        await self._index._commit_level(level_data, matched_handlers, self._sync_level)
+        self._levels += 1
+
+        if self._max_levels and self._levels >= self._max_levels:
+            await self.flush()
+        elif self._max_seconds and time.time() - self._started_at >= self._max_seconds:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._stack is None:
+            return
+        stack, self._stack = self._stack, None
+        async with stack:
+            await self._index._update_state()
+
+
 class Index(ABC, Generic[IndexConfigT, IndexQueueItemT, IndexDatasourceT]):
     """Base class for index implementations
 
@@ -119,11 +184,89 @@ class Index(ABC, Generic[IndexConfigT, IndexQueueItemT, IndexDatasourceT]):
         level_data: Any,
         sync_level: int,
     ) -> None:
-        from dipdup.index import MatchedHandler
-
         if not level_data:
             return
 
+        matched_handlers = self._match_level(level_data)
+        await self._commit_level(level_data, matched_handlers, sync_level)
+
+    async def _process_levels(
+        self,
+        level_iter: AsyncIterator[tuple[int, Any]],
+        sync_level: int,
+    ) -> None:
+        """Process levels yielded by fetcher during sync.
+
+        When `advanced.pipeline_depth` is set, up to that many levels are matched ahead while the current one commits.
+        When `advanced.sync_batch_levels` or `advanced.sync_batch_ms` is set, levels are committed in batches.
+        """
+        async with SyncBatch(self, sync_level) as batch:
+            depth = self._ctx.config.advanced.pipeline_depth
+            if not depth:
+                async for level, level_data in level_iter:
+                    if level_data:
+                        await batch.commit(level_data, self._match_level(level_data))
+                    self._on_level_synced(level)
+                return
+
+            queue: asyncio.Queue[tuple[int, Any, deque[Any], tuple[int, int]] | BaseException | None]
+            queue = asyncio.Queue(maxsize=depth)
+
+            async def _match() -> None:
+                try:
+                    async for level, level_data in level_iter:
+                        # NOTE: Levels without data are passed through to keep `_on_level_synced` calls in order
+                        version = self._get_match_version()
+                        matched_handlers = self._match_level(level_data) if level_data else deque()
+                        if queue.full():
+                            started_at = time.time()
+                            await queue.put((level, level_data, matched_handlers, version))
+                            metrics._pipeline_stall_seconds[self.name, 'match'] += time.time() - started_at
+                        else:
+                            queue.put_nowait((level, level_data, matched_handlers, version))
+                        metrics._pipeline_occupancy[self.name] = queue.qsize()
+                except Exception as e:
+                    await queue.put(e)
+                else:
+                    await queue.put(None)
+
+            match_task = asyncio.create_task(_match(), name=f'{self.name}:match')
+            try:
+                while True:
+                    if queue.empty():
+                        started_at = time.time()
+                        item = await queue.get()
+                        metrics._pipeline_stall_seconds[self.name, 'commit'] += time.time() - started_at
+                    else:
+                        item = queue.get_nowait()
+                    metrics._pipeline_occupancy[self.name] = queue.qsize()
+
+                    if item is None:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+                    level, level_data, matched_handlers, version = item
+                    if level_data:
+                        # NOTE: Handlers of previous levels have added contracts or indexes; match ahead results are stale
+                        if version != self._get_match_version():
+                            self._logger.debug('Matching inputs changed, rematching level %s', level)
+                            matched_handlers = self._match_level(level_data)
+                        await batch.commit(level_data, matched_handlers)
+                    self._on_level_synced(level)
+            finally:
+                match_task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await match_task
+
+    def _get_match_version(self) -> tuple[int, int]:
+        """Changes when handlers add contracts or indexes that could affect matching"""
+        config = self._ctx.config
+        return len(config.contracts), len(config.indexes)
+
+    def _on_level_synced(self, level: int) -> None:
+        """Called after every level yielded by fetcher during sync is processed, including levels without data"""
+
+    def _match_level(self, level_data: Any) -> deque[Any]:
         batch_level = level_data[0].level
         index_level = self.state.level
         if batch_level <= index_level:
@@ -138,10 +281,25 @@ class Index(ABC, Generic[IndexConfigT, IndexQueueItemT, IndexDatasourceT]):
         # metrics.set_index_handlers_matched(total_matched)
         metrics.handlers_matched[self.name] += total_matched
         metrics.time_in_matcher[self.name] += time.time() - started_at
+        return matched_handlers
+
+    async def _commit_level(
+        self,
+        level_data: Any,
+        matched_handlers: deque[Any],
+        sync_level: int,
+    ) -> None:
+        from dipdup.index import MatchedHandler
+
+        batch_level = level_data[0].level
 
         # NOTE: We still need to bump index level but don't care if it will be done in existing transaction
         if not matched_handlers:
-            await self._update_state(level=batch_level)
+            # NOTE: Batch saves index state once on commit
+            if self._ctx.transactions.batched:
+                self.state.level = batch_level
+            else:
+                await self._update_state(level=batch_level)
             return
 
         started_at = time.time()
@@ -164,7 +322,10 @@ class Index(ABC, Generic[IndexConfigT, IndexQueueItemT, IndexDatasourceT]):
                 index=self._config.name,
                 args=(batch_handlers,),
             )
-            await self._update_state(level=batch_level)
+            if self._ctx.transactions.batched:
+                self.state.level = batch_level
+            else:
+                await self._update_state(level=batch_level)
 
         metrics.objects_indexed += len(level_data)
         metrics.levels_nonempty += 1
@@ -69,6 +69,9 @@ class EvmIndex(
         self._subsquid_started: bool = False
         self._abis = ctx.package._evm_abis
 
+    def _on_level_synced(self, level: int) -> None:
+        metrics._sqd_processor_last_block = level
+
     @abstractmethod
     async def _synchronize_subsquid(self, sync_level: int) -> None: ...
 
@@ -0,0 +1,199 @@
+"""Coalescing of `evm.events` sync queries of indexes sharing the same datasources.
+
+When `advanced.coalesce_fetches` is set, indexes that start syncing close level ranges at the same time join a group.
+The group runs a single fetcher with merged address and topic filters over the union of ranges and fans out each
+level to members, keeping only events that match their own filters.
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from dataclasses import dataclass
+from dataclasses import field
+
+from dipdup.exceptions import FrameworkException
+from dipdup.indexes.evm_events.fetcher import EvmNodeEventFetcher
+from dipdup.indexes.evm_events.fetcher import EvmSubsquidEventFetcher
+from dipdup.models.evm import EvmEventData
+
+# NOTE: Time to wait for other indexes to join the group
+COALESCE_WINDOW = 0.5
+# NOTE: Don't coalesce short ranges, e.g. last mile; it's not worth the delay
+COALESCE_MIN_LEVELS = 10_000
+# NOTE: Indexes too far behind each other would wait for the rest to catch up
+COALESCE_MAX_LAG = 100_000
+COALESCE_QUEUE_SIZE = 1000
+
+_logger = logging.getLogger(__name__)
+
+EvmEventFetcher = EvmSubsquidEventFetcher | EvmNodeEventFetcher
+LevelItem = tuple[int, tuple[EvmEventData, ...]] | BaseException | None
+
+
+def merge_fetchers(name: str, fetchers: list[EvmEventFetcher]) -> EvmEventFetcher:
+    """Create a fetcher covering ranges and filters of all given ones"""
+    first_level = min(fetcher._first_level for fetcher in fetchers)
+    last_level = max(fetcher._last_level for fetcher in fetchers)
+    datasources = fetchers[0]._datasources
+
+    if all(isinstance(fetcher, EvmSubsquidEventFetcher) for fetcher in fetchers):
+        topics: dict[tuple[str | None, str], None] = {}
+        for fetcher in fetchers:
+            topics.update(dict.fromkeys(fetcher._topics))  # type: ignore[union-attr]
+        return EvmSubsquidEventFetcher(
+            name=name,
+            datasources=datasources,  # type: ignore[arg-type]
+            first_level=first_level,
+            last_level=last_level,
+            topics=tuple(topics),
+        )
+
+    if all(isinstance(fetcher, EvmNodeEventFetcher) for fetcher in fetchers):
+        addresses: set[str] = set()
+        for fetcher in fetchers:
+            # NOTE: Empty set means all addresses
+            if not fetcher._addresses:  # type: ignore[union-attr]
+                addresses.clear()
+                break
+            addresses.update(fetcher._addresses)  # type: ignore[union-attr]
+        return EvmNodeEventFetcher(
+            name=name,
+            datasources=datasources,  # type: ignore[arg-type]
+            first_level=first_level,
+            last_level=last_level,
+            addresses=addresses,
+        )
+
+    raise FrameworkException('Only fetchers of the same type can be merged')
+
+
+def get_event_filter(fetcher: EvmEventFetcher) -> Callable[[EvmEventData], bool]:
+    """Predicate matching events requested by the fetcher"""
+    if isinstance(fetcher, EvmSubsquidEventFetcher):
+        topics = {(address.lower() if address else None, topic0) for address, topic0 in fetcher._topics}
+
+        def _match_topics(event: EvmEventData) -> bool:
+            if not event.topics:
+                return False
+            topic0 = event.topics[0]
+            return (event.address.lower(), topic0) in topics or (None, topic0) in topics
+
+        return _match_topics
+
+    addresses = {address.lower() for address in fetcher._addresses}
+
+    def _match_addresses(event: EvmEventData) -> bool:
+        return not addresses or event.address.lower() in addresses
+
+    return _match_addresses
+
+
+@dataclass
+class CoalescedFetcher:
+    """Index side of the group; yields levels of the merged fetcher matching the index filters"""
+
+    fetcher: EvmEventFetcher
+    queue: asyncio.Queue[LevelItem] = field(default_factory=lambda: asyncio.Queue(COALESCE_QUEUE_SIZE))
+    closed: bool = False
+
+    @property
+    def first_level(self) -> int:
+        return self.fetcher._first_level
+
+    @property
+    def last_level(self) -> int:
+        return self.fetcher._last_level
+
+    async def fetch_by_level(self) -> AsyncIterator[tuple[int, tuple[EvmEventData, ...]]]:
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self) -> None:
+        """Stop receiving levels; must be called when the index stops consuming"""
+        self.closed = True
+        # NOTE: Unblock the group if it's waiting for the queue
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+@dataclass
+class _Group:
+    members: list[CoalescedFetcher] = field(default_factory=list)
+    task: asyncio.Task[None] | None = None
+
+    def accepts(self, fetcher: EvmEventFetcher) -> bool:
+        head = self.members[0].fetcher
+        return (
+            type(head) is type(fetcher)
+            and head._datasources == fetcher._datasources
+            and abs(head._first_level - fetcher._first_level) <= COALESCE_MAX_LAG
+        )
+
+
+class EvmEventsCoalescer:
+    def __init__(self) -> None:
+        self._pending: list[_Group] = []
+
+    def join(self, fetcher: EvmEventFetcher) -> CoalescedFetcher:
+        """Add fetcher to a pending group or create a new one"""
+        member = CoalescedFetcher(fetcher)
+        for group in self._pending:
+            if group.accepts(fetcher):
+                group.members.append(member)
+                return member
+
+        group = _Group([member])
+        self._pending.append(group)
+        group.task = asyncio.create_task(self._run(group), name=f'coalesce:{fetcher._name}')
+        return member
+
+    async def _run(self, group: _Group) -> None:
+        await asyncio.sleep(COALESCE_WINDOW)
+        self._pending.remove(group)
+
+        members = group.members
+        if len(members) == 1:
+            upstream = members[0].fetcher
+            filters = None
+        else:
+            names = [member.fetcher._name for member in members]
+            _logger.info('Coalescing fetchers of %s indexes: %s', len(members), ', '.join(names))
+            upstream = merge_fetchers('+'.join(names), [member.fetcher for member in members])
+            filters = [get_event_filter(member.fetcher) for member in members]
+
+        active = list(range(len(members)))
+        try:
+            async for level, batch in upstream.fetch_by_level():
+                for i in tuple(active):
+                    member = members[i]
+                    if member.closed:
+                        active.remove(i)
+                        continue
+                    if level < member.first_level:
+                        continue
+                    if level > member.last_level:
+                        active.remove(i)
+                        await member.queue.put(None)
+                        continue
+
+                    events = batch if filters is None else tuple(e for e in batch if filters[i](e))
+                    if events:
+                        await member.queue.put((level, events))
+
+                if not active:
+                    return
+        except Exception as e:
+            for i in active:
+                if not members[i].closed:
+                    await members[i].queue.put(e)
+            return
+
+        for i in active:
+            if not members[i].closed:
+                await members[i].queue.put(None)
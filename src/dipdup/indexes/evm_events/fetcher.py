@@ -1,10 +1,11 @@
-import time
+import asyncio
+from collections import deque
 from collections.abc import AsyncIterator
 
 from dipdup.datasources.evm_node import EvmNodeDatasource
 from dipdup.datasources.evm_subsquid import EvmSubsquidDatasource
-from dipdup.indexes.evm_node import MIN_BATCH_SIZE
 from dipdup.indexes.evm_node import EvmNodeFetcher
+from dipdup.indexes.evm_subsquid import EVM_SUBSQUID_STRIPE_WINDOW
 from dipdup.indexes.evm_subsquid import EvmSubsquidFetcher
 from dipdup.models.evm import EvmEventData
 
@@ -27,14 +28,30 @@ class EvmSubsquidEventFetcher(EvmSubsquidFetcher[EvmEventData]):
         self._topics = topics
 
     async def fetch_by_level(self) -> AsyncIterator[tuple[int, tuple[EvmEventData, ...]]]:
-        event_iter = self.random_datasource.iter_events(
-            self._topics,
-            self._first_level,
-            self._last_level,
-        )
+        event_iter = self.segmented_iter(self._iter_range, self._topics)
         async for level, batch in self.readahead_by_level(event_iter):
             yield level, batch
 
+    def _iter_range(self, first_level: int, last_level: int) -> AsyncIterator[tuple[EvmEventData, ...]]:
+        if len(self._datasources) > 1:
+            return self.striped_iter(self._fetch_window, EVM_SUBSQUID_STRIPE_WINDOW, first_level, last_level)
+        datasource = self.random_datasource
+        return self.pipelined_iter(
+            lambda first, last: datasource.iter_events(self._topics, first, last),
+            EVM_SUBSQUID_STRIPE_WINDOW,
+            datasource._config.concurrency,
+            first_level,
+            last_level,
+        )
+
+    def _fetch_window(
+        self,
+        datasource: EvmSubsquidDatasource,
+        first_level: int,
+        last_level: int,
+    ) -> AsyncIterator[tuple[EvmEventData, ...]]:
+        return datasource.iter_events(self._topics, first_level, last_level)
+
 
 class EvmNodeEventFetcher(EvmNodeFetcher[EvmEventData]):
     _datasource: EvmNodeDatasource
@@ -56,65 +73,68 @@ class EvmNodeEventFetcher(EvmNodeFetcher[EvmEventData]):
         self._addresses = addresses
 
     async def fetch_by_level(self) -> AsyncIterator[tuple[int, tuple[EvmEventData, ...]]]:
-        event_iter = self._fetch_by_level()
+        event_iter = self._fetch_by_level(self._addresses)
         async for level, batch in self.readahead_by_level(event_iter):
             yield level, batch
 
-    async def _fetch_by_level(self) -> AsyncIterator[tuple[EvmEventData, ...]]:
-        batch_size = MIN_BATCH_SIZE
-        batch_first_level = self._first_level
-        ratelimited: bool = False
-
-        while batch_first_level <= self._last_level:
-            node = self.random_datasource
-            batch_size = self.get_next_batch_size(batch_size, ratelimited)
-            ratelimited = False
-
-            started = time.time()
-
-            batch_last_level = min(
-                batch_first_level + batch_size,
-                self._last_level,
-            )
-            event_batch = await self.get_events_batch(
-                first_level=batch_first_level,
-                last_level=batch_last_level,
+    async def _fetch_range(
+        self,
+        first_level: int,
+        last_level: int,
+        node: EvmNodeDatasource | None = None,
+    ) -> AsyncIterator[tuple[EvmEventData, ...]]:
+        """Fetch windows concurrently and yield their batches in level order.
+
+        Number of windows in flight is limited by `concurrency` of the datasource; the same budget is shared with
+        other indexes.
+        """
+        pinned_node = node
+        if pinned_node:
+            limit = pinned_node._config.concurrency
+        else:
+            limit = sum(datasource._config.concurrency for datasource in self._datasources)
+
+        in_flight: deque[asyncio.Task[list[tuple[EvmEventData, ...]]]] = deque()
+        window_first_level = first_level
+        try:
+            while window_first_level <= last_level or in_flight:
+                while window_first_level <= last_level and len(in_flight) < limit:
+                    node = pinned_node or self.random_datasource
+                    window = self.get_range_controller(node).get_window(window_first_level)
+                    window_last_level = min(window_first_level + window - 1, last_level)
+                    in_flight.append(
+                        asyncio.create_task(
+                            self._fetch_events_window(node, window_first_level, window_last_level),
+                            name=f'fetch_events:{self._name}:{window_first_level}',
+                        )
+                    )
+                    window_first_level = window_last_level + 1
+
+                for batch in await in_flight.popleft():
+                    yield batch
+        finally:
+            for task in in_flight:
+                task.cancel()
+            # NOTE: Retrieve results of cancelled windows; failed ones would be logged as never retrieved otherwise
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _fetch_events_window(
+        self,
+        node: EvmNodeDatasource,
+        first_level: int,
+        last_level: int,
+    ) -> list[tuple[EvmEventData, ...]]:
+        async with node.fetch_semaphore:
+            event_batch = await self.get_events_range(
+                first_level=first_level,
+                last_level=last_level,
                 addresses=self._addresses,
                 node=node,
             )
+            headers = await node.get_headers(list(event_batch))
 
-            finished = time.time()
-            if finished - started >= node._http_config.ratelimit_sleep:
-                ratelimited = True
-
-            timestamps: dict[int, int] = {}
-            event_levels = list(event_batch.keys())
-
-            # NOTE: Split event_levels to chunks of batch_size
-            event_level_batches = [
-                set(event_levels[i : i + batch_size]) for i in range(0, len(event_levels), batch_size)
-            ]
-
-            for event_level_batch in event_level_batches:
-
-                started = time.time()
-
-                block_batch = await self.get_blocks_batch(event_level_batch)
-                for level, block in block_batch.items():
-                    timestamps[level] = int(block['timestamp'], 16)
-
-                finished = time.time()
-                if finished - started >= node._http_config.ratelimit_sleep:
-                    ratelimited = True
-
-            for level, level_events in event_batch.items():
-                if not level_events:
-                    continue
-
-                parsed_level_events = tuple(
-                    EvmEventData.from_node_json(event, timestamps[level]) for event in level_events
-                )
-
-                yield parsed_level_events
-
-            batch_first_level = batch_last_level + 1
+        return [
+            tuple(EvmEventData.from_node_json(event, headers[level].timestamp) for event in event_batch[level])
+            for level in sorted(event_batch)
+            if event_batch[level]
+        ]
@@ -1,5 +1,6 @@
 from collections import deque
 from collections.abc import Iterable
+from typing import TYPE_CHECKING
 from typing import Any
 
 from dipdup.config.evm_events import EvmEventsHandlerConfig
@@ -8,13 +9,20 @@ from dipdup.datasources.evm_node import EvmNodeDatasource
 from dipdup.datasources.evm_subsquid import EvmSubsquidDatasource
 from dipdup.exceptions import FrameworkException
 from dipdup.indexes.evm import EvmIndex
+from dipdup.indexes.evm_events.coalescer import COALESCE_MIN_LEVELS
+from dipdup.indexes.evm_events.coalescer import EvmEventFetcher
+from dipdup.indexes.evm_events.coalescer import EvmEventsCoalescer
 from dipdup.indexes.evm_events.fetcher import EvmNodeEventFetcher
 from dipdup.indexes.evm_events.fetcher import EvmSubsquidEventFetcher
+from dipdup.indexes.evm_events.matcher import EventDispatchTable
+from dipdup.indexes.evm_events.matcher import build_dispatch_table
 from dipdup.indexes.evm_events.matcher import match_events
 from dipdup.models import RollbackMessage
 from dipdup.models._subsquid import SubsquidMessageType
 from dipdup.models.evm import EvmEventData
-from dipdup.performance import metrics
+
+if TYPE_CHECKING:
+    from dipdup.context import DipDupContext
 
 QueueItem = tuple[EvmEventData, ...] | RollbackMessage
 EvmDatasource = EvmSubsquidDatasource | EvmNodeDatasource
@@ -24,22 +32,39 @@ class EvmEventsIndex(
     EvmIndex[EvmEventsIndexConfig, QueueItem, EvmDatasource],
     message_type=SubsquidMessageType.logs,
 ):
+    def __init__(
+        self,
+        ctx: 'DipDupContext',
+        config: EvmEventsIndexConfig,
+        datasources: tuple[EvmDatasource, ...],
+    ) -> None:
+        super().__init__(ctx, config, datasources)
+        self._dispatch_table: EventDispatchTable | None = None
 
     async def _synchronize_subsquid(self, sync_level: int) -> None:
         first_level = self.state.level + 1
         fetcher = self._create_subsquid_fetcher(first_level, sync_level)
 
-        async for _level, logs in fetcher.fetch_by_level():
-            await self._process_level_data(logs, sync_level)
-            metrics._sqd_processor_last_block = _level
+        await self._process_fetcher(fetcher, sync_level)
 
     async def _synchronize_node(self, sync_level: int) -> None:
         first_level = self.state.level + 1
         fetcher = self._create_node_fetcher(first_level, sync_level)
 
-        async for _level, logs in fetcher.fetch_by_level():
-            await self._process_level_data(logs, sync_level)
-            metrics._sqd_processor_last_block = _level
+        await self._process_fetcher(fetcher, sync_level)
+
+    async def _process_fetcher(self, fetcher: EvmEventFetcher, sync_level: int) -> None:
+        if not self._ctx.config.advanced.coalesce_fetches or sync_level - fetcher._first_level < COALESCE_MIN_LEVELS:
+            await self._process_levels(fetcher.fetch_by_level(), sync_level)
+            return
+
+        if self._ctx._evm_events_coalescer is None:
+            self._ctx._evm_events_coalescer = EvmEventsCoalescer()
+        coalesced_fetcher = self._ctx._evm_events_coalescer.join(fetcher)
+        try:
+            await self._process_levels(coalesced_fetcher.fetch_by_level(), sync_level)
+        finally:
+            coalesced_fetcher.close()
 
     def _create_subsquid_fetcher(self, first_level: int, last_level: int) -> EvmSubsquidEventFetcher:
         addresses = set()
@@ -94,8 +119,14 @@ class EvmEventsIndex(
         handlers: tuple[EvmEventsHandlerConfig, ...],
         level_data: Iterable[EvmEventData],
     ) -> deque[Any]:
+        # NOTE: Handlers of the index never change; templates spawn new indexes
+        if self._dispatch_table is None:
+            self._dispatch_table = build_dispatch_table(self._ctx.package, handlers)
+
         return match_events(
             package=self._ctx.package,
             handlers=handlers,
             events=level_data,
+            dispatch_table=self._dispatch_table,
+            lazy=self._ctx.config.advanced.lazy_payloads,
         )
@@ -1,15 +1,23 @@
 import logging
+import time
+from collections import defaultdict
 from collections import deque
+from collections.abc import Callable
 from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import cache
 from itertools import cycle
 from typing import Any
 
 from eth_abi.abi import decode as decode_abi
+from pydantic import BaseModel
 
 from dipdup.config.evm_events import EvmEventsHandlerConfig
 from dipdup.models.evm import EvmEvent
 from dipdup.models.evm import EvmEventData
+from dipdup.models.evm import LazyEvmEvent
 from dipdup.package import DipDupPackage
+from dipdup.performance import metrics
 from dipdup.utils import parse_object
 from dipdup.utils import pascal_to_snake
 from dipdup.utils import snake_to_pascal
@@ -17,6 +25,26 @@ from dipdup.utils import snake_to_pascal
 _logger = logging.getLogger(__name__)
 
 MatchedEventsT = tuple[EvmEventsHandlerConfig, EvmEvent[Any]]
+EventDecoderT = Callable[[str, tuple[str, ...]], tuple[Any, ...] | None]
+
+_WORD = 64
+_SIGN_BIT = 1 << 255
+_WORD_MODULUS = 1 << 256
+
+
+@dataclass(frozen=True, slots=True)
+class EventDispatchEntry:
+    """Handler matching events with a specific topic0"""
+
+    handler_config: EvmEventsHandlerConfig
+    address: str | None
+    topic_count: int
+    inputs: tuple[tuple[str, bool], ...]
+    type_: type[BaseModel]
+    decoder: EventDecoderT | None
+
+
+EventDispatchTable = dict[str, tuple[EventDispatchEntry, ...]]
 
 
 def decode_indexed_topics(indexed_inputs: tuple[str, ...], topics: tuple[str, ...]) -> tuple[Any, ...]:
@@ -26,12 +54,92 @@ def decode_indexed_topics(indexed_inputs: tuple[str, ...], topics: tuple[str, ..
     return decode_abi(indexed_inputs, indexed_bytes)
 
 
+def _decode_uint(word: str) -> int:
+    return int(word, 16)
+
+
+def _decode_int(word: str) -> int:
+    value = int(word, 16)
+    return value - _WORD_MODULUS if value & _SIGN_BIT else value
+
+
+def _decode_bool(word: str) -> bool:
+    return int(word, 16) != 0
+
+
+def _decode_address(word: str) -> str:
+    return '0x' + word[24:].lower()
+
+
+def _get_word_decoder(type_: str) -> Callable[[str], Any] | None:
+    """Decoder of a single 32-byte hex word of static type; `None` if type needs eth_abi"""
+    if type_ == 'address':
+        return _decode_address
+    if type_ == 'bool':
+        return _decode_bool
+    if type_.startswith('uint') and type_[4:].isdigit():
+        return _decode_uint
+    if type_.startswith('int') and type_[3:].isdigit():
+        return _decode_int
+    if type_.startswith('bytes') and type_[5:].isdigit():
+        size = int(type_[5:])
+        return lambda word: bytes.fromhex(word[: size * 2])
+    return None
+
+
+@cache
+def get_static_decoder(inputs: tuple[tuple[str, bool], ...]) -> EventDecoderT | None:
+    """Compile decoder of events with static inputs only; `None` if layout needs eth_abi.
+
+    Values are sliced from hex strings of data and topics at fixed offsets. Decoder returns `None` if data is shorter
+    than the layout; caller must fall back to eth_abi then.
+    """
+    plan: list[tuple[bool, int, Callable[[str], Any]]] = []
+    topic_idx, data_offset = 1, 0
+    for type_, indexed in inputs:
+        word_decoder = _get_word_decoder(type_)
+        if word_decoder is None:
+            return None
+        if indexed:
+            plan.append((True, topic_idx, word_decoder))
+            topic_idx += 1
+        else:
+            plan.append((False, data_offset, word_decoder))
+            data_offset += _WORD
+    data_size = data_offset
+
+    def _decode(data: str, topics: tuple[str, ...]) -> tuple[Any, ...] | None:
+        if data.startswith('0x'):
+            data = data[2:]
+        # NOTE: Node truncates trailing zeros in event data
+        empty = not data
+        if not empty and len(data) < data_size:
+            return None
+
+        values: list[Any] = []
+        for indexed, offset, word_decoder in plan:
+            if indexed:
+                values.append(word_decoder(topics[offset][-_WORD:]))
+            elif empty:
+                values.append(0)
+            else:
+                values.append(word_decoder(data[offset : offset + _WORD]))
+        return tuple(values)
+
+    return _decode
+
+
 def decode_event_data(
     data: str,
     topics: tuple[str, ...],
     inputs: tuple[tuple[str, bool], ...],
+    decoder: EventDecoderT | None = None,
 ) -> tuple[Any, ...]:
     """Decode event data from hex string"""
+    decoder = decoder or get_static_decoder(inputs)
+    if decoder and (fast_values := decoder(data, topics)) is not None:
+        return fast_values
+
     from eth_utils.hexadecimal import decode_hex
 
     # NOTE: Indexed and non-indexed inputs can go in arbitrary order. We need
@@ -54,69 +162,116 @@ def decode_event_data(
     return tuple(values)
 
 
-def prepare_event_handler_args(
+def _get_dispatch_entry(
     package: DipDupPackage,
     handler_config: EvmEventsHandlerConfig,
-    matched_event: EvmEventData,
-) -> EvmEvent[Any]:
+) -> tuple[str, EventDispatchEntry]:
     typename = handler_config.contract.module_name
-    inputs = package._evm_abis.get_event_abi(
+    abi = package._evm_abis.get_event_abi(
         typename=typename,
         name=handler_config.name,
-    )['inputs']
-
+    )
     type_ = package.get_type(
         typename=typename,
         module=f'evm_events.{pascal_to_snake(handler_config.name)}',
         name=snake_to_pascal(handler_config.name) + 'Payload',
     )
+    entry = EventDispatchEntry(
+        handler_config=handler_config,
+        address=handler_config.contract.address,
+        topic_count=abi['topic_count'],
+        inputs=abi['inputs'],
+        type_=type_,
+        decoder=get_static_decoder(abi['inputs']),
+    )
+    return abi['topic0'], entry
+
 
+def build_dispatch_table(
+    package: DipDupPackage,
+    handlers: Iterable[EvmEventsHandlerConfig],
+) -> EventDispatchTable:
+    """Group index handlers by topic0 of their events preserving the order; build once per index."""
+    table: defaultdict[str, list[EventDispatchEntry]] = defaultdict(list)
+    for handler_config in handlers:
+        topic0, entry = _get_dispatch_entry(package, handler_config)
+        table[topic0].append(entry)
+    return {topic0: tuple(entries) for topic0, entries in table.items()}
+
+
+def _decode_payload(entry: EventDispatchEntry, matched_event: EvmEventData) -> Any:
+    started_at = time.perf_counter()
     data = decode_event_data(
         data=matched_event.data,
         topics=tuple(matched_event.topics),
-        inputs=inputs,
+        inputs=entry.inputs,
+        decoder=entry.decoder,
     )
 
     typed_payload = parse_object(
-        type_=type_,
+        type_=entry.type_,
         data=data,
         plain=True,
     )
+    metrics._payload_decode_seconds[entry.handler_config.callback] += time.perf_counter() - started_at
+    return typed_payload
+
+
+def _prepare_args(entry: EventDispatchEntry, matched_event: EvmEventData, lazy: bool = False) -> EvmEvent[Any]:
+    if lazy:
+        return LazyEvmEvent(
+            data=matched_event,
+            decode=lambda: _decode_payload(entry, matched_event),
+        )
     return EvmEvent(
         data=matched_event,
-        payload=typed_payload,
+        payload=_decode_payload(entry, matched_event),
     )
 
 
+def prepare_event_handler_args(
+    package: DipDupPackage,
+    handler_config: EvmEventsHandlerConfig,
+    matched_event: EvmEventData,
+) -> EvmEvent[Any]:
+    _, entry = _get_dispatch_entry(package, handler_config)
+    return _prepare_args(entry, matched_event)
+
+
 def match_events(
     package: DipDupPackage,
     handlers: Iterable[EvmEventsHandlerConfig],
     events: Iterable[EvmEventData],
+    dispatch_table: EventDispatchTable | None = None,
+    lazy: bool = False,
 ) -> deque[MatchedEventsT]:
-    """Try to match event events with all index handlers."""
+    """Try to match event events with all index handlers.
+
+    If `lazy` is set, payloads are decoded on first access in handler.
+    """
     matched_handlers: deque[MatchedEventsT] = deque()
+    if dispatch_table is None:
+        dispatch_table = build_dispatch_table(package, handlers)
 
     for event in events:
-        if not event.topics:
+        # NOTE: Hex fields are computed on every access
+        topics = event.topics
+        if not topics:
             continue
 
-        for handler_config in handlers:
-            typename = handler_config.contract.module_name
-            abi = package._evm_abis.get_event_abi(
-                typename=typename,
-                name=handler_config.name,
-            )
-            if event.topics[0] != abi['topic0']:
-                continue
-            if len(event.topics) != abi['topic_count'] + 1:
-                continue
+        entries = dispatch_table.get(topics[0])
+        if not entries:
+            continue
 
-            address = handler_config.contract.address
-            if address and address != event.address:
+        address = event.address
+        for entry in entries:
+            if len(topics) != entry.topic_count + 1:
+                continue
+            if entry.address and entry.address != address:
                 continue
 
-            arg = prepare_event_handler_args(package, handler_config, event)
-            matched_handlers.append((handler_config, arg))
+            arg = _prepare_args(entry, event, lazy)
+            matched_handlers.append((entry.handler_config, arg))
             break
 
     _logger.debug('%d handlers matched', len(matched_handlers))
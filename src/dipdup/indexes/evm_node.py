@@ -1,26 +1,173 @@
 import asyncio
 import logging
 import random
+import time
 from abc import ABC
+from abc import abstractmethod
 from collections import defaultdict
 from collections import deque
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Coroutine
 from typing import Any
 from typing import Generic
+from typing import TypeVar
 
 from dipdup.datasources.evm_node import EvmNodeDatasource
+from dipdup.exceptions import DatasourceError
 from dipdup.exceptions import FrameworkException
 from dipdup.fetcher import BufferT
 from dipdup.fetcher import DataFetcher
+from dipdup.performance import metrics
 
 EVM_NODE_READAHEAD_LIMIT = 2500
 MIN_BATCH_SIZE = 10
 MAX_BATCH_SIZE = 10000
 BATCH_SIZE_UP = 1.1
 BATCH_SIZE_DOWN = 0.65
+# NOTE: Level window fetched from a single node when several `evm.node` datasources are striped
+EVM_NODE_STRIPE_WINDOW = 10000
+
+# NOTE: `eth_getLogs` range controller; safe windows are remembered per region of this many levels
+RANGE_REGION_SIZE = 100_000
+RANGE_STEP_UP = 100
+RANGE_MAX_BYTES = 8 * 2**20
+RANGE_LATENCY_SAMPLES = 20
+# NOTE: Rough size of a log without `data` in JSON-RPC response
+RANGE_LOG_OVERHEAD = 600
+# NOTE: Successful requests at the ceiling of a region after which it's raised to probe wider windows again
+RANGE_CEILING_SUCCESSES = 20
+# NOTE: Messages nodes and providers return when `eth_getLogs` range or response is too large; lowercase.
+# NOTE: JSON-RPC codes are not used: -32005 also means rate limit, -32602 any invalid params.
+RANGE_ERRORS = (
+    # NOTE: Geth, Erigon, Infura
+    'query returned more than',
+    'query timeout exceeded',
+    # NOTE: Alchemy
+    'log response size exceeded',
+    # NOTE: Ankr
+    'block range is too wide',
+    # NOTE: Nethermind, Cloudflare and others
+    'range too large',
+    # NOTE: Bor, BSC
+    'exceed maximum block range',
+    # NOTE: Besu
+    'requested range exceeds maximum',
+    # NOTE: Chainstack
+    'block range limit exceeded',
+    # NOTE: QuickNode
+    'eth_getlogs is limited to',
+)
 
 
 _logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+
+def is_range_error(error: DatasourceError) -> bool:
+    """Whether node rejected `eth_getLogs` request because of the block range or the response size"""
+    msg = error.msg.lower()
+    return any(pattern in msg for pattern in RANGE_ERRORS)
+
+
+def get_logs_size(logs: list[dict[str, Any]]) -> int:
+    """Estimated size of `eth_getLogs` response in bytes"""
+    return sum(len(log['data']) + RANGE_LOG_OVERHEAD for log in logs)
+
+
+class RangeController:
+    """AIMD controller of `eth_getLogs` block range for a single node.
+
+    Window grows by `RANGE_STEP_UP` levels after every fast and small response, and shrinks multiplicatively when
+    p95 latency exceeds `target_latency` or response is larger than `RANGE_MAX_BYTES`. Ranges rejected by the node
+    are split in half by the caller, and the window doesn't grow beyond the half of the rejected one in the same
+    region; after `RANGE_CEILING_SUCCESSES` successful requests at this ceiling it's raised by `RANGE_STEP_UP`.
+    Windows are stored per region of `RANGE_REGION_SIZE` levels, so dense regions don't slow down sparse ones and
+    vice versa.
+    """
+
+    def __init__(self, name: str, target_latency: float) -> None:
+        self._name = name
+        self._target_latency = target_latency
+        self._windows: dict[int, int] = {}
+        self._ceilings: dict[int, int] = {}
+        self._ceiling_successes: defaultdict[int, int] = defaultdict(int)
+        self._window = MIN_BATCH_SIZE
+        self._latencies: deque[float] = deque(maxlen=RANGE_LATENCY_SAMPLES)
+
+    def get_window(self, level: int) -> int:
+        """Number of levels to request starting from `level`"""
+        # NOTE: Unknown region starts from the last window used
+        return self._windows.get(level // RANGE_REGION_SIZE, self._window)
+
+    def get_p95_latency(self) -> float:
+        if not self._latencies:
+            return 0.0
+        latencies = sorted(self._latencies)
+        return latencies[int(len(latencies) * 0.95)]
+
+    def on_success(self, first_level: int, last_level: int, elapsed: float, size: int) -> None:
+        self._latencies.append(elapsed)
+        window = last_level - first_level + 1
+
+        if size > RANGE_MAX_BYTES:
+            self._set_window(first_level, int(window * RANGE_MAX_BYTES / size), 'shrink_size')
+        elif self.get_p95_latency() > self._target_latency:
+            self._set_window(first_level, int(window * BATCH_SIZE_DOWN), 'shrink_latency')
+        # NOTE: Don't grow if the last window was truncated by range end or split
+        elif window >= self.get_window(first_level) and size < RANGE_MAX_BYTES // 2:
+            ceiling = self._get_ceiling(first_level, window)
+            self._set_window(first_level, min(window + RANGE_STEP_UP, ceiling), 'grow')
+        else:
+            self._record('hold')
+
+    def on_error(self, first_level: int, last_level: int) -> None:
+        window = last_level - first_level + 1
+        region = first_level // RANGE_REGION_SIZE
+        self._ceilings[region] = min(self._ceilings.get(region, MAX_BATCH_SIZE), window // 2)
+        self._ceiling_successes.pop(region, None)
+        self._set_window(first_level, window // 2, 'split')
+
+    def _get_ceiling(self, level: int, window: int) -> int:
+        """Ceiling of the region; raised after enough successful requests at it"""
+        region = level // RANGE_REGION_SIZE
+        ceiling = self._ceilings.get(region)
+        if ceiling is None:
+            return MAX_BATCH_SIZE
+        if window < ceiling:
+            return ceiling
+
+        self._ceiling_successes[region] += 1
+        if self._ceiling_successes[region] < RANGE_CEILING_SUCCESSES:
+            return ceiling
+
+        del self._ceiling_successes[region]
+        ceiling += RANGE_STEP_UP
+        if ceiling >= MAX_BATCH_SIZE:
+            del self._ceilings[region]
+            return MAX_BATCH_SIZE
+        self._ceilings[region] = ceiling
+        return ceiling
+
+    def _set_window(self, level: int, window: int, decision: str) -> None:
+        window = max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, window))
+        region = level // RANGE_REGION_SIZE
+        old_window = self._windows.get(region, self._window)
+        if window < old_window:
+            # NOTE: Latency samples taken with a wider window are no longer relevant
+            self._latencies.clear()
+        if window != old_window:
+            _logger.debug('%s: `eth_getLogs` window updated: %s -> %s (%s)', self._name, old_window, window, decision)
+
+        self._windows[region] = window
+        self._window = window
+        self._record(decision)
+
+    def _record(self, decision: str) -> None:
+        metrics._evm_node_range_decisions[(self._name, decision)] += 1
+        metrics._evm_node_range_window[self._name] = self._window
+
 
 class EvmNodeFetcher(Generic[BufferT], DataFetcher[BufferT, EvmNodeDatasource], ABC):
     def __init__(
@@ -37,6 +184,37 @@ class EvmNodeFetcher(Generic[BufferT], DataFetcher[BufferT, EvmNodeDatasource],
             last_level=last_level,
             readahead_limit=EVM_NODE_READAHEAD_LIMIT,
         )
+        self._batch_sizes: dict[str, int] = {}
+        self._range_controllers: dict[str, RangeController] = {}
+
+    def _fetch_by_level(self, filter: Any = None) -> AsyncIterator[tuple[BufferT, ...]]:
+        return self.segmented_iter(self._iter_range, filter)
+
+    def _iter_range(self, first_level: int, last_level: int) -> AsyncIterator[tuple[BufferT, ...]]:
+        if len(self._datasources) > 1:
+            return self.striped_iter(self._fetch_window, EVM_NODE_STRIPE_WINDOW, first_level, last_level)
+        return self._fetch_range(first_level, last_level)
+
+    def _fetch_window(
+        self,
+        node: EvmNodeDatasource,
+        first_level: int,
+        last_level: int,
+    ) -> AsyncIterator[tuple[BufferT, ...]]:
+        return self._fetch_range(first_level, last_level, node)
+
+    @abstractmethod
+    def _fetch_range(
+        self,
+        first_level: int,
+        last_level: int,
+        node: EvmNodeDatasource | None = None,
+    ) -> AsyncIterator[tuple[BufferT, ...]]:
+        """Fetch levels from `first_level` to `last_level` inclusive in adaptive batches.
+
+        If `node` is not set, a random node is used for every batch.
+        """
+        ...
 
     def get_next_batch_size(self, batch_size: int, ratelimited: bool) -> int:
         old_batch_size = batch_size
@@ -51,37 +229,84 @@ class EvmNodeFetcher(Generic[BufferT], DataFetcher[BufferT, EvmNodeDatasource],
             _logger.debug('Batch size updated: %s -> %s', old_batch_size, batch_size)
         return int(batch_size)
 
+    def get_range_controller(self, node: EvmNodeDatasource) -> RangeController:
+        if node.name not in self._range_controllers:
+            self._range_controllers[node.name] = RangeController(
+                name=f'{self._name}:{node.name}',
+                target_latency=node._http_config.ratelimit_sleep,
+            )
+        return self._range_controllers[node.name]
+
     def get_random_node(self) -> EvmNodeDatasource:
         if not self._datasources:
             raise FrameworkException('A node datasource requested, but none attached to this index')
         return random.choice(self._datasources)
 
+    async def hedged(
+        self,
+        node: EvmNodeDatasource,
+        method: str,
+        request: Callable[[EvmNodeDatasource], Coroutine[Any, Any, T]],
+    ) -> T:
+        """Send request to the node; if it outlives node's p95 latency for the method, send it to another one too.
+
+        The first successful response is returned and the other request is cancelled. If both fail, the error of the
+        primary node is raised.
+        """
+        others = [datasource for datasource in self._datasources if datasource is not node]
+        policy = node.hedge_policy
+        if not others or not policy.enabled:
+            return await request(node)
+
+        policy.on_request()
+        started = time.time()
+        primary = asyncio.create_task(request(node), name=f'request:{self._name}:{node.name}')
+        hedge: asyncio.Task[T] | None = None
+        try:
+            delay = policy.get_p95_latency(method)
+            if delay is not None:
+                await asyncio.wait((primary,), timeout=delay)
+            if primary.done() or delay is None or not policy.try_hedge():
+                result = await primary
+                policy.on_response(method, time.time() - started)
+                return result
+
+            hedge_node = random.choice(others)
+            _logger.debug('%s: `%s` is slower than %.2fs; hedging to %s', node.name, method, delay, hedge_node.name)
+
+            # NOTE: Duplicate request counts against the concurrency budget of the node it's sent to
+            async def _hedge_request() -> T:
+                async with hedge_node.fetch_semaphore:
+                    return await request(hedge_node)
+
+            hedge = asyncio.create_task(_hedge_request(), name=f'request:{self._name}:{hedge_node.name}')
+            pending: set[asyncio.Task[T]] = {primary, hedge}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in (primary, hedge) if task in done and task.exception() is None]
+                if succeeded:
+                    winner = succeeded[0]
+                    # NOTE: Lost request is recorded with the time it was cancelled at; it's slower anyway
+                    policy.on_response(method, time.time() - started)
+                    policy.on_winner(winner is hedge)
+                    return winner.result()
+                if not pending:
+                    return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if task and not task.done():
+                    task.cancel()
+
     async def get_blocks_batch(
         self,
         levels: set[int],
         full_transactions: bool = False,
         node: EvmNodeDatasource | None = None,
     ) -> dict[int, dict[str, Any]]:
-        tasks: deque[asyncio.Task[Any]] = deque()
-        blocks: dict[int, Any] = {}
         node = node or self.get_random_node()
-
-        async def _fetch(level: int) -> None:
-            blocks[level] = await node.get_block_by_level(
-                block_number=level,
-                full_transactions=full_transactions,
-            )
-
-        for level in levels:
-            tasks.append(
-                asyncio.create_task(
-                    _fetch(level),
-                    name=f'get_block_range:{level}',
-                ),
-            )
-
-        await asyncio.gather(*tasks)
-        return blocks
+        ordered_levels = sorted(levels)
+        blocks = await node.get_blocks_by_level(ordered_levels, full_transactions)
+        return dict(zip(ordered_levels, blocks, strict=True))
 
     async def get_events_batch(
         self,
@@ -102,3 +327,35 @@ class EvmNodeFetcher(Generic[BufferT], DataFetcher[BufferT, EvmNodeDatasource],
         for log in logs:
             grouped_events[int(log['blockNumber'], 16)].append(log)
         return grouped_events
+
+    async def get_events_range(
+        self,
+        first_level: int,
+        last_level: int,
+        addresses: set[str] | None,
+        node: EvmNodeDatasource,
+    ) -> dict[int, list[dict[str, Any]]]:
+        """Same as `get_events_batch`, but split the range in half if node rejects it and report to controller"""
+        controller = self.get_range_controller(node)
+        started = time.time()
+        try:
+            grouped_events = await self.hedged(
+                node,
+                'eth_getLogs',
+                lambda datasource: self.get_events_batch(first_level, last_level, addresses, datasource),
+            )
+        except DatasourceError as e:
+            if first_level == last_level or not is_range_error(e):
+                raise
+            _logger.info(
+                '%s: `eth_getLogs` range %s-%s rejected, splitting: %s', node.name, first_level, last_level, e.msg
+            )
+            controller.on_error(first_level, last_level)
+            middle_level = (first_level + last_level) // 2
+            grouped_events = await self.get_events_range(first_level, middle_level, addresses, node)
+            grouped_events.update(await self.get_events_range(middle_level + 1, last_level, addresses, node))
+            return grouped_events
+
+        size = sum(get_logs_size(logs) for logs in grouped_events.values())
+        controller.on_success(first_level, last_level, time.time() - started, size)
+        return grouped_events
@@ -6,6 +6,8 @@ from dipdup.fetcher import BufferT
 from dipdup.fetcher import DataFetcher
 
 EVM_SUBSQUID_READAHEAD_LIMIT = 10000
+# NOTE: Level window fetched at once when several `evm.subsquid` datasources are striped or `concurrency` is set
+EVM_SUBSQUID_STRIPE_WINDOW = 100000
 
 
 class EvmSubsquidFetcher(Generic[BufferT], DataFetcher[BufferT, EvmSubsquidDatasource], ABC):
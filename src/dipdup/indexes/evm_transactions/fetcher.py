@@ -1,14 +1,45 @@
+import logging
 import random
 import time
+from collections import defaultdict
 from collections.abc import AsyncIterator
+from functools import partial
+from typing import Any
 
+from dipdup.datasources.evm_node import JSONRPC_METHOD_NOT_FOUND
+from dipdup.datasources.evm_node import EvmNodeDatasource
 from dipdup.datasources.evm_subsquid import EvmSubsquidDatasource
+from dipdup.exceptions import DatasourceError
 from dipdup.indexes.evm_node import MIN_BATCH_SIZE
 from dipdup.indexes.evm_node import EvmNodeFetcher
+from dipdup.indexes.evm_node import is_range_error
+from dipdup.indexes.evm_subsquid import EVM_SUBSQUID_STRIPE_WINDOW
 from dipdup.indexes.evm_subsquid import EvmSubsquidFetcher
 from dipdup.models.evm import EvmTransactionData
+from dipdup.models.evm_node import TraceFilter
 from dipdup.models.evm_subsquid import TransactionRequest
 
+# NOTE: Levels covered by a single `trace_filter` request; split in half if node rejects the range
+TRACE_FILTER_WINDOW = 10_000
+# NOTE: Messages nodes return when `trace_filter` method is not available; lowercase. Only checked if the message
+# names the method, so errors of the request itself like "header not found" are not mistaken for them.
+TRACE_UNSUPPORTED_ERRORS = (
+    'does not exist',
+    'not available',
+    'not supported',
+    'unsupported',
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def is_trace_unsupported_error(error: DatasourceError) -> bool:
+    """Whether node rejected `trace_filter` request because the method is not available"""
+    if error.code == JSONRPC_METHOD_NOT_FOUND:
+        return True
+    msg = error.msg.lower()
+    return 'trace_filter' in msg and any(pattern in msg for pattern in TRACE_UNSUPPORTED_ERRORS)
+
 
 class EvmSubsquidTransactionFetcher(EvmSubsquidFetcher[EvmTransactionData]):
     """Fetches transactions from REST API, merges them and yields by level."""
@@ -20,6 +51,7 @@ class EvmSubsquidTransactionFetcher(EvmSubsquidFetcher[EvmTransactionData]):
         first_level: int,
         last_level: int,
         filters: tuple[TransactionRequest, ...],
+        fields: tuple[str, ...] | None = None,
     ) -> None:
         super().__init__(
             name=name,
@@ -28,45 +60,196 @@ class EvmSubsquidTransactionFetcher(EvmSubsquidFetcher[EvmTransactionData]):
             last_level=last_level,
         )
         self._filters = filters
+        self._fields = fields
 
     async def fetch_by_level(self) -> AsyncIterator[tuple[int, tuple[EvmTransactionData, ...]]]:
-        transaction_iter = self.random_datasource.iter_transactions(
-            self._first_level,
-            self._last_level,
-            self._filters,
-        )
+        transaction_iter = self.segmented_iter(self._iter_range, (self._filters, self._fields))
         async for level, batch in self.readahead_by_level(transaction_iter):
             yield level, batch
 
+    def _iter_range(self, first_level: int, last_level: int) -> AsyncIterator[tuple[EvmTransactionData, ...]]:
+        if len(self._datasources) > 1:
+            return self.striped_iter(self._fetch_window, EVM_SUBSQUID_STRIPE_WINDOW, first_level, last_level)
+        datasource = self.random_datasource
+        return self.pipelined_iter(
+            lambda first, last: datasource.iter_transactions(first, last, self._filters, self._fields),
+            EVM_SUBSQUID_STRIPE_WINDOW,
+            datasource._config.concurrency,
+            first_level,
+            last_level,
+        )
+
+    def _fetch_window(
+        self,
+        datasource: EvmSubsquidDatasource,
+        first_level: int,
+        last_level: int,
+    ) -> AsyncIterator[tuple[EvmTransactionData, ...]]:
+        return datasource.iter_transactions(first_level, last_level, self._filters, self._fields)
+
 
 class EvmNodeTransactionFetcher(EvmNodeFetcher[EvmTransactionData]):
+    """Fetches blocks with full transaction bodies from nodes, or, if `trace_filters` are set, only transactions
+    found with `trace_filter` requests.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        datasources: tuple[EvmNodeDatasource, ...],
+        first_level: int,
+        last_level: int,
+        trace_filters: tuple[TraceFilter, ...] | None = None,
+    ) -> None:
+        super().__init__(
+            name=name,
+            datasources=datasources,
+            first_level=first_level,
+            last_level=last_level,
+        )
+        self._trace_filters = trace_filters
 
     async def fetch_by_level(self) -> AsyncIterator[tuple[int, tuple[EvmTransactionData, ...]]]:
-        transaction_iter = self._fetch_by_level()
+        transaction_iter = self._fetch_by_level(self._trace_filters)
         async for level, batch in self.readahead_by_level(transaction_iter):
             yield level, batch
 
-    async def _fetch_by_level(self) -> AsyncIterator[tuple[EvmTransactionData, ...]]:
-        batch_size = MIN_BATCH_SIZE
-        batch_first_level = self._first_level
+    async def _fetch_range(
+        self,
+        first_level: int,
+        last_level: int,
+        node: EvmNodeDatasource | None = None,
+    ) -> AsyncIterator[tuple[EvmTransactionData, ...]]:
+        if self._trace_filters:
+            try:
+                async for batch in self._discover_range(first_level, last_level, node):
+                    first_level = batch[0].level + 1
+                    yield batch
+                return
+            except DatasourceError as e:
+                if not is_trace_unsupported_error(e):
+                    raise
+                _logger.warning('%s: `trace_filter` is not supported, scanning all blocks: %s', e.datasource, e.msg)
+                self._trace_filters = None
+
+        async for batch in self._scan_range(first_level, last_level, node):
+            yield batch
+
+    async def _discover_range(
+        self,
+        first_level: int,
+        last_level: int,
+        node: EvmNodeDatasource | None = None,
+    ) -> AsyncIterator[tuple[EvmTransactionData, ...]]:
+        """Find transactions with `trace_filter` and fetch only them instead of full blocks"""
+        window_first_level = first_level
+        while window_first_level <= last_level:
+            window_node = node or self.get_random_node()
+            window_last_level = min(window_first_level + TRACE_FILTER_WINDOW - 1, last_level)
+            async with window_node.fetch_semaphore:
+                transaction_hashes = await self.get_transaction_hashes(
+                    window_first_level,
+                    window_last_level,
+                    window_node,
+                )
+                levels = sorted(transaction_hashes)
+                hashes = [transaction_hash for level in levels for transaction_hash in transaction_hashes[level]]
+                transactions = await window_node.get_transactions_by_hash(hashes) if hashes else []
+                headers = await window_node.get_headers(levels)
+
+            grouped_transactions: defaultdict[int, list[EvmTransactionData]] = defaultdict(list)
+            for transaction_hash, transaction_json in zip(hashes, transactions, strict=True):
+                if not transaction_json:
+                    raise DatasourceError(f'Transaction {transaction_hash} is missing', window_node.name)
+                level = int(transaction_json['blockNumber'], 16)
+                grouped_transactions[level].append(
+                    EvmTransactionData.from_node_json(transaction_json, headers[level].timestamp)
+                )
+            for level in levels:
+                yield tuple(sorted(grouped_transactions[level], key=lambda t: t.transaction_index or 0))
+
+            window_first_level = window_last_level + 1
+
+    async def get_transaction_hashes(
+        self,
+        first_level: int,
+        last_level: int,
+        node: EvmNodeDatasource,
+    ) -> dict[int, list[str]]:
+        """Hashes of transactions matching trace filters grouped by level; split the range if node rejects it"""
+        try:
+            traces = await self.hedged(
+                node,
+                'trace_filter',
+                partial(self.get_traces_batch, first_level, last_level),
+            )
+        except DatasourceError as e:
+            if first_level == last_level or not is_range_error(e):
+                raise
+            _logger.info(
+                '%s: `trace_filter` range %s-%s rejected, splitting: %s', node.name, first_level, last_level, e.msg
+            )
+            middle_level = (first_level + last_level) // 2
+            transaction_hashes = await self.get_transaction_hashes(first_level, middle_level, node)
+            transaction_hashes.update(await self.get_transaction_hashes(middle_level + 1, last_level, node))
+            return transaction_hashes
+
+        grouped_hashes: defaultdict[int, dict[str, None]] = defaultdict(dict)
+        for trace in traces:
+            # NOTE: Internal calls match filters too; only top-level ones are transactions
+            if trace.get('traceAddress') or not trace.get('transactionHash'):
+                continue
+            level = trace['blockNumber']
+            if isinstance(level, str):
+                level = int(level, 16)
+            grouped_hashes[level][trace['transactionHash']] = None
+        return {level: list(hashes) for level, hashes in grouped_hashes.items()}
+
+    async def get_traces_batch(
+        self,
+        first_level: int,
+        last_level: int,
+        node: EvmNodeDatasource,
+    ) -> list[dict[str, Any]]:
+        traces: list[dict[str, Any]] = []
+        for trace_filter in self._trace_filters or ():
+            params: dict[str, Any] = {
+                'fromBlock': hex(first_level),
+                'toBlock': hex(last_level),
+                **trace_filter,
+            }
+            traces.extend(await node.get_traces(params))
+        return traces
+
+    async def _scan_range(
+        self,
+        first_level: int,
+        last_level: int,
+        node: EvmNodeDatasource | None = None,
+    ) -> AsyncIterator[tuple[EvmTransactionData, ...]]:
+        pinned_node = node
+        batch_size = self._batch_sizes.get(node.name, MIN_BATCH_SIZE) if node else MIN_BATCH_SIZE
+        batch_first_level = first_level
         ratelimited: bool = False
 
-        while batch_first_level <= self._last_level:
-            node = random.choice(self._datasources)
+        while batch_first_level <= last_level:
+            node = pinned_node or random.choice(self._datasources)
             batch_size = self.get_next_batch_size(batch_size, ratelimited)
             ratelimited = False
+            if pinned_node:
+                self._batch_sizes[pinned_node.name] = batch_size
 
             started = time.time()
 
             batch_last_level = min(
                 batch_first_level + batch_size,
-                self._last_level,
+                last_level,
             )
 
-            block_batch = await self.get_blocks_batch(
-                levels=set(range(batch_first_level, batch_last_level + 1)),
-                full_transactions=True,
-                node=node,
+            block_batch = await self.hedged(
+                node,
+                'eth_getBlockByNumber',
+                partial(self.get_blocks_batch, set(range(batch_first_level, batch_last_level + 1)), True),
             )
             blocks = sorted(block_batch.values(), key=lambda block: int(block['number'], 16))
 
@@ -79,6 +262,9 @@ class EvmNodeTransactionFetcher(EvmNodeFetcher[EvmTransactionData]):
                 if not block['transactions']:
                     continue
 
+                # NOTE: Not sent to the decode pool. Blocks are already parsed by the JSON-RPC layer, which needs them to
+                # retry failed batch elements and to fill the header cache. Unpickling models returned by a worker
+                # costs about as much as building them here.
                 parsed_level_transactions = tuple(
                     EvmTransactionData.from_node_json(transaction, timestamp) for transaction in block['transactions']
                 )
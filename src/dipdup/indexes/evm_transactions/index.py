@@ -4,16 +4,18 @@ from typing import Any
 from dipdup.config.evm_transactions import EvmTransactionsIndexConfig
 from dipdup.datasources.evm_node import EvmNodeDatasource
 from dipdup.datasources.evm_subsquid import EvmSubsquidDatasource
+from dipdup.exceptions import ConfigurationError
 from dipdup.indexes.evm import EvmIndex
 from dipdup.indexes.evm import get_sighash
 from dipdup.indexes.evm_transactions.fetcher import EvmNodeTransactionFetcher
 from dipdup.indexes.evm_transactions.fetcher import EvmSubsquidTransactionFetcher
 from dipdup.indexes.evm_transactions.matcher import match_transactions
+from dipdup.indexes.evm_transactions.projection import get_transaction_fields
 from dipdup.models import RollbackMessage
 from dipdup.models._subsquid import SubsquidMessageType
 from dipdup.models.evm import EvmTransactionData
+from dipdup.models.evm_node import TraceFilter
 from dipdup.models.evm_subsquid import TransactionRequest
-from dipdup.performance import metrics
 
 QueueItem = tuple[EvmTransactionData, ...] | RollbackMessage
 EvmDatasource = EvmSubsquidDatasource | EvmNodeDatasource
@@ -28,23 +30,20 @@ class EvmTransactionsIndex(
             package=self._ctx.package,
             handlers=handlers,
             transactions=level_data,
+            lazy=self._ctx.config.advanced.lazy_payloads,
         )
 
     async def _synchronize_subsquid(self, sync_level: int) -> None:
         first_level = self.state.level + 1
         fetcher = self._create_subsquid_fetcher(first_level, sync_level)
 
-        async for _level, transactions in fetcher.fetch_by_level():
-            await self._process_level_data(transactions, sync_level)
-            metrics._sqd_processor_last_block = _level
+        await self._process_levels(fetcher.fetch_by_level(), sync_level)
 
     async def _synchronize_node(self, sync_level: int) -> None:
         first_level = self.state.level + 1
         fetcher = self._create_node_fetcher(first_level, sync_level)
 
-        async for _level, transactions in fetcher.fetch_by_level():
-            await self._process_level_data(transactions, sync_level)
-            metrics._sqd_processor_last_block = _level
+        await self._process_levels(fetcher.fetch_by_level(), sync_level)
 
     def _create_subsquid_fetcher(self, first_level: int, last_level: int) -> EvmSubsquidTransactionFetcher:
 
@@ -73,12 +72,40 @@ class EvmTransactionsIndex(
             first_level=first_level,
             last_level=last_level,
             filters=tuple(filters),
+            fields=get_transaction_fields(self._ctx.package, self._config.handlers, self._config.fields),
         )
 
     def _create_node_fetcher(self, first_level: int, last_level: int) -> EvmNodeTransactionFetcher:
+        trace_filters: tuple[TraceFilter, ...] | None = None
+        if self._config.discovery == 'trace_filter':
+            trace_filters = self._get_trace_filters()
+
         return EvmNodeTransactionFetcher(
             name=self.name,
             datasources=self.node_datasources,
             first_level=first_level,
             last_level=last_level,
+            trace_filters=trace_filters,
         )
+
+    def _get_trace_filters(self) -> tuple[TraceFilter, ...]:
+        """`trace_filter` criteria matching transactions of all handlers; method filters are applied by matcher"""
+        to_addresses: set[str] = set()
+        from_addresses: set[str] = set()
+        for handler_config in self._config.handlers:
+            # NOTE: Criteria are joined with OR by some nodes and with AND by others; use one per handler
+            # NOTE: Handlers with both addresses are discovered by `to` only; matcher checks `from` afterwards
+            if (to_ := handler_config.to) and to_.address:
+                to_addresses.add(to_.address)
+            elif (from_ := handler_config.from_) and from_.address:
+                from_addresses.add(from_.address)
+            else:
+                msg = f'Handler `{handler_config.callback}` needs `to` or `from` address for `trace_filter` discovery'
+                raise ConfigurationError(msg)
+
+        trace_filters: list[TraceFilter] = []
+        if to_addresses:
+            trace_filters.append({'toAddress': sorted(to_addresses)})
+        if from_addresses:
+            trace_filters.append({'fromAddress': sorted(from_addresses)})
+        return tuple(trace_filters)
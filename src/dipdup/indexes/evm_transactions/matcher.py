@@ -1,4 +1,5 @@
 import logging
+import time
 from collections import deque
 from collections.abc import Iterable
 from typing import Any
@@ -11,7 +12,9 @@ from dipdup.exceptions import FrameworkException
 from dipdup.indexes.evm import get_sighash
 from dipdup.models.evm import EvmTransaction
 from dipdup.models.evm import EvmTransactionData
+from dipdup.models.evm import LazyEvmTransaction
 from dipdup.package import DipDupPackage
+from dipdup.performance import metrics
 from dipdup.utils import parse_object
 from dipdup.utils import pascal_to_snake
 from dipdup.utils import snake_to_pascal
@@ -32,13 +35,15 @@ eth_abi.decoding.SignedIntegerDecoder.validate_padding_bytes = lambda *a, **kw:
 eth_abi.decoding.SingleDecoder.validate_padding_bytes = lambda *a, **kw: None  # type: ignore[method-assign]
 
 
-def prepare_transaction_handler_args(
+def _decode_input(
     package: DipDupPackage,
     handler_config: EvmTransactionsHandlerConfig,
     matched_transaction: EvmTransactionData,
-) -> EvmTransaction[Any]:
+) -> Any:
     from eth_utils.hexadecimal import decode_hex
 
+    started_at = time.perf_counter()
+
     method, contract = handler_config.method, handler_config.to
     if not method or not contract:
         raise FrameworkException('`method` and `to` are required for typed transaction handler')
@@ -65,9 +70,24 @@ def prepare_transaction_handler_args(
         data=data,
         plain=True,
     )
+    metrics._payload_decode_seconds[handler_config.callback] += time.perf_counter() - started_at
+    return typed_input
+
+
+def prepare_transaction_handler_args(
+    package: DipDupPackage,
+    handler_config: EvmTransactionsHandlerConfig,
+    matched_transaction: EvmTransactionData,
+    lazy: bool = False,
+) -> EvmTransaction[Any]:
+    if lazy:
+        return LazyEvmTransaction(
+            data=matched_transaction,
+            decode=lambda: _decode_input(package, handler_config, matched_transaction),
+        )
     return EvmTransaction(
         data=matched_transaction,
-        input=typed_input,
+        input=_decode_input(package, handler_config, matched_transaction),
     )
 
 
@@ -75,8 +95,12 @@ def match_transactions(
     package: DipDupPackage,
     handlers: Iterable[EvmTransactionsHandlerConfig],
     transactions: Iterable[EvmTransactionData],
+    lazy: bool = False,
 ) -> deque[MatchedTransactionsT]:
-    """Try to match contract transactions with all index handlers."""
+    """Try to match contract transactions with all index handlers.
+
+    If `lazy` is set, inputs are decoded on first access in handler.
+    """
     matched_handlers: deque[MatchedTransactionsT] = deque()
 
     for transaction in transactions:
@@ -100,7 +124,7 @@ def match_transactions(
                 (
                     handler_config,
                     (
-                        prepare_transaction_handler_args(package, handler_config, transaction)
+                        prepare_transaction_handler_args(package, handler_config, transaction, lazy)
                         if handler_config.typed_contract
                         else transaction
                     ),
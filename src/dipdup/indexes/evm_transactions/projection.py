@@ -0,0 +1,92 @@
+"""Minimal Subsquid field selection for `evm.transactions` indexes.
+
+Handler sources are parsed to find `EvmTransactionData` attributes they read. Only direct attribute access on the
+handler argument is recognized, e.g. `transaction.value` or `transaction.data.gas_used` for typed handlers; if the
+argument is used in any other way, or the source is not available, all fields are requested.
+"""
+
+import ast
+import inspect
+import logging
+import textwrap
+from collections.abc import Callable
+from collections.abc import Iterable
+from typing import Any
+
+from dipdup.config.evm_transactions import EvmTransactionsHandlerConfig
+from dipdup.models.evm_subsquid import REQUIRED_TRANSACTION_FIELDS
+from dipdup.models.evm_subsquid import TRANSACTION_FIELDS
+from dipdup.package import DipDupPackage
+
+_logger = logging.getLogger(__name__)
+
+
+def get_accessed_attributes(fn: Callable[..., Any], typed: bool) -> set[str] | None:
+    """Attributes of transaction data read by handler; `None` if they can't be determined"""
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(fn)))
+    except (OSError, TypeError, SyntaxError):
+        return None
+
+    fn_node = tree.body[0] if tree.body else None
+    if not isinstance(fn_node, ast.FunctionDef | ast.AsyncFunctionDef) or len(fn_node.args.args) != 2:
+        return None
+    argument = fn_node.args.args[1].arg
+
+    parents: dict[ast.AST, ast.AST] = {}
+    for node in ast.walk(fn_node):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+
+    attributes: set[str] = set()
+    for node in ast.walk(fn_node):
+        if not isinstance(node, ast.Name) or node.id != argument:
+            continue
+
+        parent = parents.get(node)
+        if not isinstance(parent, ast.Attribute) or not isinstance(node.ctx, ast.Load):
+            return None
+        # NOTE: `EvmTransaction` wraps transaction data; typed `input` is decoded from calldata
+        if typed:
+            if parent.attr == 'input':
+                attributes.add('input')
+                continue
+            if parent.attr != 'data':
+                return None
+            parent = parents.get(parent)
+            if not isinstance(parent, ast.Attribute):
+                return None
+        attributes.add(parent.attr)
+
+    return attributes
+
+
+def get_transaction_fields(
+    package: DipDupPackage,
+    handlers: Iterable[EvmTransactionsHandlerConfig],
+    fields: tuple[str, ...] | None = None,
+) -> tuple[str, ...] | None:
+    """Subsquid transaction fields to request for given handlers; `None` means all of them.
+
+    `fields` are `EvmTransactionData` attribute names set explicitly in the index config.
+    """
+    attributes: set[str] = set(fields or ())
+    for handler_config in handlers:
+        typed = handler_config.typed_contract is not None
+        # NOTE: Typed input is decoded from calldata
+        if typed:
+            attributes.add('input')
+        if fields is not None:
+            continue
+
+        fn = package.get_callback('handlers', handler_config.callback, handler_config.callback.split('.')[-1])
+        accessed = get_accessed_attributes(fn, typed)
+        if accessed is None:
+            _logger.debug(
+                'Unable to infer fields used by `%s` handler; requesting all of them', handler_config.callback
+            )
+            return None
+        attributes |= accessed
+
+    selected = {TRANSACTION_FIELDS[attribute] for attribute in attributes if attribute in TRANSACTION_FIELDS}
+    return tuple(sorted(selected.union(REQUIRED_TRANSACTION_FIELDS)))
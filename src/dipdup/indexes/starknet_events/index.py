@@ -15,7 +15,6 @@ from dipdup.indexes.starknet_events.matcher import match_events
 from dipdup.models import RollbackMessage
 from dipdup.models._subsquid import SubsquidMessageType
 from dipdup.models.starknet import StarknetEventData
-from dipdup.performance import metrics
 
 QueueItem = tuple[StarknetEventData, ...] | RollbackMessage
 
@@ -55,17 +54,13 @@ class StarknetEventsIndex(
         first_level = self.state.level + 1
         fetcher = self._create_subsquid_fetcher(first_level, sync_level)
 
-        async for _level, events in fetcher.fetch_by_level():
-            await self._process_level_data(events, sync_level)
-            metrics._sqd_processor_last_block = _level
+        await self._process_levels(fetcher.fetch_by_level(), sync_level)
 
     async def _synchronize_node(self, sync_level: int) -> None:
         first_level = self.state.level + 1
         fetcher = self._create_node_fetcher(first_level, sync_level)
 
-        async for _level, events in fetcher.fetch_by_level():
-            await self._process_level_data(events, sync_level)
-            metrics._sqd_processor_last_block = _level
+        await self._process_levels(fetcher.fetch_by_level(), sync_level)
 
     def _create_subsquid_fetcher(self, first_level: int, last_level: int) -> StarknetSubsquidEventFetcher:
         event_ids: dict[str, set[str]] = {}
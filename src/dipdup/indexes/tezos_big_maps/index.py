@@ -49,8 +49,7 @@ class TezosBigMapsIndex(
             sync_level,
         )
 
-        async for _, big_maps in fetcher.fetch_by_level():
-            await self._process_level_data(big_maps, sync_level)
+        await self._process_levels(fetcher.fetch_by_level(), sync_level)
 
     async def _synchronize_level(self, head_level: int) -> None:
         if not self._ctx.config.advanced.early_realtime:
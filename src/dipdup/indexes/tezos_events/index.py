@@ -39,8 +39,7 @@ class TezosEventsIndex(
         self._logger.info('Fetching contract events from level %s to %s', first_level, sync_level)
         fetcher = self._create_fetcher(first_level, sync_level)
 
-        async for _, events in fetcher.fetch_by_level():
-            await self._process_level_data(events, sync_level)
+        await self._process_levels(fetcher.fetch_by_level(), sync_level)
 
         await self._exit_sync_state(sync_level)
 
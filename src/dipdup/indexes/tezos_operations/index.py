@@ -1,6 +1,7 @@
 import logging
 from collections import defaultdict
 from collections import deque
+from collections.abc import AsyncIterator
 from collections.abc import Iterable
 from collections.abc import Iterator
 from typing import TYPE_CHECKING
@@ -218,22 +219,24 @@ class TezosOperationsIndex(
 
         fetcher = await self._create_fetcher(first_level, sync_level)
 
-        async for level, operations in fetcher.fetch_by_level():
-            # FIXME: Try to use -= or += instead
-            metrics._levels_to_sync[self._config.name] = sync_level - level
-
-            operation_subgroups = tuple(
-                extract_operation_subgroups(
-                    operations,
-                    entrypoints=self._entrypoint_filter,
-                    addresses=self._address_filter,
-                    code_hashes=self._code_hash_filter,
+        async def _iter_subgroups() -> AsyncIterator[tuple[int, tuple[OperationSubgroup, ...]]]:
+            async for level, operations in fetcher.fetch_by_level():
+                # FIXME: Try to use -= or += instead
+                metrics._levels_to_sync[self._config.name] = sync_level - level
+
+                operation_subgroups = tuple(
+                    extract_operation_subgroups(
+                        operations,
+                        entrypoints=self._entrypoint_filter,
+                        addresses=self._address_filter,
+                        code_hashes=self._code_hash_filter,
+                    )
                 )
-            )
-            if operation_subgroups:
-                self._logger.debug('Processing operations of level %s', level)
-                await self._process_level_data(operation_subgroups, sync_level)
+                if operation_subgroups:
+                    self._logger.debug('Processing operations of level %s', level)
+                    yield level, operation_subgroups
 
+        await self._process_levels(_iter_subgroups(), sync_level)
         await self._exit_sync_state(sync_level)
 
     def _match_level_data(
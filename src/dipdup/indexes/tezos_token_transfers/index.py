@@ -52,8 +52,7 @@ class TezosTokenTransfersIndex(
         self._logger.info('Fetching token transfers from level %s to %s', first_level, sync_level)
         fetcher = self._create_fetcher(first_level, sync_level)
 
-        async for _, token_transfers in fetcher.fetch_by_level():
-            await self._process_level_data(token_transfers, sync_level)
+        await self._process_levels(fetcher.fetch_by_level(), sync_level)
 
         await self._exit_sync_state(sync_level)
 
@@ -1,6 +1,15 @@
+import inspect
 from abc import ABC
+from collections.abc import Callable
+from collections.abc import Sequence
+from dataclasses import Field
+from dataclasses import FrozenInstanceError
 from dataclasses import dataclass
+from dataclasses import fields
+from dataclasses import make_dataclass
+from functools import cached_property
 from typing import Any
+from typing import ClassVar
 from typing import Generic
 from typing import Self
 from typing import TypeVar
@@ -10,19 +19,142 @@ from pydantic import BaseModel
 from dipdup.fetcher import HasLevel
 
 
-@dataclass(frozen=True)
-class EvmEventData(HasLevel):
-    address: str
-    block_hash: str
-    data: str
+def _to_bytes(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value[:2] in ('0x', '0X') else value)
+
+
+def _to_hex(value: bytes) -> str:
+    return '0x' + value.hex()
+
+
+def _hex_to_int(value: str | None) -> int | None:
+    return int(value, 16) if value else None
+
+
+class _CompactData(HasLevel):
+    """Base for immutable items with `__slots__` and hex fields stored as raw bytes.
+
+    Hex strings of addresses, hashes and payloads are the bulk of memory used by readahead buffers; raw bytes take
+    half of that and a single object per field. Hex properties are computed on first access and cached.
+
+    Public fields are the arguments of `__init__`, in order; they are exposed to `dataclasses.fields`, `asdict` and
+    `replace` like fields of a frozen dataclass.
+    """
+
+    # NOTE: Holds cached hex properties only; created on first access
+    __slots__: tuple[str, ...] = ('__dict__',)
+    __dataclass_fields__: ClassVar[dict[str, Field[Any]]] = {}
+    _fields: ClassVar[tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        annotations = inspect.get_annotations(cls.__init__)
+        annotations.pop('return', None)
+        cls._fields = tuple(annotations)
+        shadow = make_dataclass(cls.__name__, list(annotations.items()), frozen=True)
+        cls.__dataclass_fields__ = {field.name: field for field in fields(shadow)}
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f'cannot assign to field {name!r}')
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f'cannot delete field {name!r}')
+
+    def _astuple(self) -> tuple[Any, ...]:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._astuple() == other._astuple()  # type: ignore[attr-defined,no-any-return]
+
+    def __hash__(self) -> int:
+        return hash(self._astuple())
+
+    def __repr__(self) -> str:
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)
+        return f'{self.__class__.__name__}({values})'
+
+    def __getstate__(self) -> tuple[Any, ...]:
+        return self._astuple()
+
+    def __setstate__(self, state: tuple[Any, ...]) -> None:
+        for slot, value in zip(self.__slots__, state, strict=True):
+            object.__setattr__(self, slot, value)
+
+
+class EvmEventData(_CompactData):
+    __slots__ = (
+        '_address',
+        '_block_hash',
+        '_data',
+        'level',
+        'log_index',
+        'removed',
+        'timestamp',
+        '_topics',
+        '_transaction_hash',
+        'transaction_index',
+    )
+
+    _address: bytes
+    _block_hash: bytes
+    _data: bytes
     level: int
     log_index: int
     removed: bool
     timestamp: int
-    topics: tuple[str, ...]
-    transaction_hash: str
+    _topics: bytes
+    _transaction_hash: bytes
     transaction_index: int
 
+    def __init__(
+        self,
+        address: str,
+        block_hash: str,
+        data: str,
+        level: int,
+        log_index: int,
+        removed: bool,
+        timestamp: int,
+        topics: Sequence[str],
+        transaction_hash: str,
+        transaction_index: int,
+    ) -> None:
+        _set = object.__setattr__
+        _set(self, '_address', _to_bytes(address))
+        _set(self, '_block_hash', _to_bytes(block_hash))
+        _set(self, '_data', _to_bytes(data))
+        _set(self, 'level', level)
+        _set(self, 'log_index', log_index)
+        _set(self, 'removed', removed)
+        _set(self, 'timestamp', timestamp)
+        # NOTE: Topics are 32-byte words; store them in a single object
+        _set(self, '_topics', b''.join(_to_bytes(topic) for topic in topics))
+        _set(self, '_transaction_hash', _to_bytes(transaction_hash))
+        _set(self, 'transaction_index', transaction_index)
+
+    @cached_property
+    def address(self) -> str:
+        return _to_hex(self._address)
+
+    @cached_property
+    def block_hash(self) -> str:
+        return _to_hex(self._block_hash)
+
+    @cached_property
+    def data(self) -> str:
+        return _to_hex(self._data)
+
+    @cached_property
+    def topics(self) -> tuple[str, ...]:
+        raw = self._topics
+        return tuple(_to_hex(raw[i : i + 32]) for i in range(0, len(raw), 32))
+
+    @cached_property
+    def transaction_hash(self) -> str:
+        return _to_hex(self._transaction_hash)
+
     @classmethod
     def from_node_json(cls, event_json: dict[str, Any], timestamp: int) -> 'EvmEventData':
         # NOTE: Skale Nebula
@@ -58,29 +190,61 @@ class EvmEventData(HasLevel):
         )
 
 
-@dataclass(frozen=True)
-class EvmTransactionData(HasLevel, ABC):
+class EvmTransactionData(_CompactData, ABC):
+    __slots__ = (
+        'access_list',
+        '_block_hash',
+        'chain_id',
+        '_contract_address',
+        'cumulative_gas_used',
+        'effective_gas_price',
+        '_from',
+        'gas',
+        'gas_price',
+        'gas_used',
+        '_hash',
+        '_input',
+        'level',
+        'max_fee_per_gas',
+        'max_priority_fee_per_gas',
+        'nonce',
+        'r',
+        's',
+        '_sighash',
+        'status',
+        'timestamp',
+        '_to',
+        'transaction_index',
+        'type',
+        'value',
+        'v',
+        'y_parity',
+    )
+
     access_list: tuple[dict[str, Any], ...] | None
-    block_hash: str
+    _block_hash: bytes
     chain_id: int | None
-    contract_address: str | None
+    _contract_address: bytes | None
     cumulative_gas_used: int | None
     effective_gas_price: int | None
-    from_: str
-    gas: int
-    gas_price: int
+    _from: bytes
+    gas: int | None
+    gas_price: int | None
     gas_used: int | None
-    hash: str
-    input: str
+    _hash: bytes
+    _input: bytes
     level: int
     max_fee_per_gas: int | None
     max_priority_fee_per_gas: int | None
-    nonce: int
+    nonce: int | None
+    # NOTE: Not padded by some nodes; kept as is
     r: str | None
     s: str | None
+    # NOTE: Set only if calldata is not available; otherwise it's the beginning of `_input`
+    _sighash: bytes | None
     status: int | None
     timestamp: int
-    to: str | None
+    _to: bytes | None
     # FIXME: Missing in some nodes. Which ones?
     transaction_index: int | None
     type: int | None
@@ -89,9 +253,92 @@ class EvmTransactionData(HasLevel, ABC):
     v: int | None
     y_parity: bool | None
 
-    @property
+    def __init__(
+        self,
+        access_list: tuple[dict[str, Any], ...] | None,
+        block_hash: str,
+        chain_id: int | None,
+        contract_address: str | None,
+        cumulative_gas_used: int | None,
+        effective_gas_price: int | None,
+        from_: str,
+        gas: int | None,
+        gas_price: int | None,
+        gas_used: int | None,
+        hash: str,
+        input: str,
+        level: int,
+        max_fee_per_gas: int | None,
+        max_priority_fee_per_gas: int | None,
+        nonce: int | None,
+        r: str | None,
+        s: str | None,
+        status: int | None,
+        timestamp: int,
+        to: str | None,
+        transaction_index: int | None,
+        type: int | None,
+        value: int | None,
+        v: int | None,
+        y_parity: bool | None,
+        sighash: str | None = None,
+    ) -> None:
+        _set = object.__setattr__
+        _set(self, 'access_list', access_list)
+        _set(self, '_block_hash', _to_bytes(block_hash))
+        _set(self, 'chain_id', chain_id)
+        _set(self, '_contract_address', None if contract_address is None else _to_bytes(contract_address))
+        _set(self, 'cumulative_gas_used', cumulative_gas_used)
+        _set(self, 'effective_gas_price', effective_gas_price)
+        _set(self, '_from', _to_bytes(from_))
+        _set(self, 'gas', gas)
+        _set(self, 'gas_price', gas_price)
+        _set(self, 'gas_used', gas_used)
+        _set(self, '_hash', _to_bytes(hash))
+        _set(self, '_input', _to_bytes(input))
+        _set(self, 'level', level)
+        _set(self, 'max_fee_per_gas', max_fee_per_gas)
+        _set(self, 'max_priority_fee_per_gas', max_priority_fee_per_gas)
+        _set(self, 'nonce', nonce)
+        _set(self, 'r', r)
+        _set(self, 's', s)
+        _set(self, '_sighash', None if sighash is None else _to_bytes(sighash))
+        _set(self, 'status', status)
+        _set(self, 'timestamp', timestamp)
+        _set(self, '_to', None if to is None else _to_bytes(to))
+        _set(self, 'transaction_index', transaction_index)
+        _set(self, 'type', type)
+        _set(self, 'value', value)
+        _set(self, 'v', v)
+        _set(self, 'y_parity', y_parity)
+
+    @cached_property
+    def block_hash(self) -> str:
+        return _to_hex(self._block_hash)
+
+    @cached_property
+    def contract_address(self) -> str | None:
+        return None if self._contract_address is None else _to_hex(self._contract_address)
+
+    @cached_property
+    def from_(self) -> str:
+        return _to_hex(self._from)
+
+    @cached_property
+    def hash(self) -> str:
+        return _to_hex(self._hash)
+
+    @cached_property
+    def input(self) -> str:
+        return _to_hex(self._input)
+
+    @cached_property
+    def to(self) -> str | None:
+        return None if self._to is None else _to_hex(self._to)
+
+    @cached_property
     def sighash(self) -> str:
-        return self.input[:10]
+        return _to_hex(self._input[:4] if self._sighash is None else self._sighash)
 
     @classmethod
     def from_node_json(
@@ -140,48 +387,40 @@ class EvmTransactionData(HasLevel, ABC):
         transaction_json: dict[str, Any],
         header: dict[str, Any],
     ) -> Self:
-        cumulative_gas_used = (
-            int(transaction_json['cumulativeGasUsed'], 16) if transaction_json['cumulativeGasUsed'] else None
-        )
-        effective_gas_price = (
-            int(transaction_json['effectiveGasPrice'], 16) if transaction_json['effectiveGasPrice'] else None
-        )
-        max_fee_per_gas = int(transaction_json['maxFeePerGas'], 16) if transaction_json['maxFeePerGas'] else None
-        max_priority_fee_per_gas = (
-            int(transaction_json['maxPriorityFeePerGas'], 16) if transaction_json['maxPriorityFeePerGas'] else None
-        )
-        v = int(transaction_json['v'], 16) if transaction_json['v'] else None
-        y_parity = bool(int(transaction_json['yParity'], 16)) if transaction_json['yParity'] else None
+        # NOTE: Fields missing in the query selection are `None`; see `TRANSACTION_FIELDS` in `dipdup.models.evm_subsquid`
+        get = transaction_json.get
+        y_parity = _hex_to_int(get('yParity'))
         return cls(
             # FIXME: 500
             # access_list=tuple(transaction_json['accessList']) if transaction_json['accessList'] else None,
             access_list=None,
             block_hash=header['hash'],
-            chain_id=transaction_json['chainId'],
-            contract_address=transaction_json['contractAddress'],
-            cumulative_gas_used=cumulative_gas_used,
-            effective_gas_price=effective_gas_price,
+            chain_id=get('chainId'),
+            contract_address=get('contractAddress'),
+            cumulative_gas_used=_hex_to_int(get('cumulativeGasUsed')),
+            effective_gas_price=_hex_to_int(get('effectiveGasPrice')),
             from_=transaction_json['from'],
-            gas=int(transaction_json['gas'], 16),
-            gas_price=int(transaction_json['gasPrice'], 16),
-            gas_used=int(transaction_json['gasUsed'], 16),
+            gas=_hex_to_int(get('gas')),
+            gas_price=_hex_to_int(get('gasPrice')),
+            gas_used=_hex_to_int(get('gasUsed')),
             hash=transaction_json['hash'],
-            input=transaction_json['input'],
+            # NOTE: Calldata is empty if not selected; method selector is kept separately for matching
+            input=get('input') or '0x',
             level=header['number'],
-            max_fee_per_gas=max_fee_per_gas,
-            max_priority_fee_per_gas=max_priority_fee_per_gas,
-            nonce=transaction_json['nonce'],
-            r=transaction_json['r'],
-            s=transaction_json['s'],
-            # sighash=transaction_json['sighash'],
-            status=transaction_json['status'],
+            max_fee_per_gas=_hex_to_int(get('maxFeePerGas')),
+            max_priority_fee_per_gas=_hex_to_int(get('maxPriorityFeePerGas')),
+            nonce=get('nonce'),
+            r=get('r'),
+            s=get('s'),
+            status=get('status'),
             timestamp=header['timestamp'],
-            to=transaction_json['to'],
-            transaction_index=transaction_json['transactionIndex'],
-            type=transaction_json['type'],
-            value=int(transaction_json['value'], 16),
-            v=v,
-            y_parity=y_parity,
+            to=get('to'),
+            transaction_index=get('transactionIndex'),
+            type=get('type'),
+            value=_hex_to_int(get('value')),
+            v=_hex_to_int(get('v')),
+            y_parity=None if y_parity is None else bool(y_parity),
+            sighash=None if get('input') else get('sighash'),
         )
 
 
@@ -199,3 +438,27 @@ class EvmEvent(Generic[PayloadT]):
 class EvmTransaction(Generic[InputT]):
     data: EvmTransactionData
     input: InputT
+
+
+class LazyEvmEvent(EvmEvent[PayloadT]):
+    """`EvmEvent` with payload decoded and validated on first access"""
+
+    def __init__(self, data: EvmEventData, decode: Callable[[], PayloadT]) -> None:
+        object.__setattr__(self, 'data', data)
+        object.__setattr__(self, '_decode', decode)
+
+    @cached_property
+    def payload(self) -> PayloadT:  # type: ignore[override]
+        return self._decode()  # type: ignore[attr-defined,no-any-return]
+
+
+class LazyEvmTransaction(EvmTransaction[InputT]):
+    """`EvmTransaction` with input decoded and validated on first access"""
+
+    def __init__(self, data: EvmTransactionData, decode: Callable[[], InputT]) -> None:
+        object.__setattr__(self, 'data', data)
+        object.__setattr__(self, '_decode', decode)
+
+    @cached_property
+    def input(self) -> InputT:  # type: ignore[override]
+        return self._decode()  # type: ignore[attr-defined,no-any-return]
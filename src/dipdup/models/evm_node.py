@@ -1,6 +1,7 @@
 from abc import ABC
 from typing import Any
 from typing import Literal
+from typing import TypedDict
 
 from pydantic.dataclasses import dataclass
 
@@ -8,6 +9,13 @@ from dipdup.fetcher import HasLevel
 from dipdup.subscriptions import Subscription
 
 
+class TraceFilter(TypedDict, total=False):
+    """Address criteria of `trace_filter` request"""
+
+    fromAddress: list[str]
+    toAddress: list[str]
+
+
 class EvmNodeSubscription(ABC, Subscription):
     name: str
 
@@ -171,3 +171,33 @@ class Query(AbstractSubsquidQuery):
     transactions: NotRequired[list[TransactionRequest]]
     type: NotRequired[str]
     fields: NotRequired[FieldSelection]
+
+
+# NOTE: `EvmTransactionData` attributes and Subsquid transaction fields they are built from
+TRANSACTION_FIELDS: dict[str, str] = {
+    'chain_id': 'chainId',
+    'contract_address': 'contractAddress',
+    'cumulative_gas_used': 'cumulativeGasUsed',
+    'effective_gas_price': 'effectiveGasPrice',
+    'from_': 'from',
+    'gas': 'gas',
+    'gas_price': 'gasPrice',
+    'gas_used': 'gasUsed',
+    'hash': 'hash',
+    'input': 'input',
+    'max_fee_per_gas': 'maxFeePerGas',
+    'max_priority_fee_per_gas': 'maxPriorityFeePerGas',
+    'nonce': 'nonce',
+    'r': 'r',
+    's': 's',
+    'sighash': 'sighash',
+    'status': 'status',
+    'to': 'to',
+    'transaction_index': 'transactionIndex',
+    'type': 'type',
+    'value': 'value',
+    'v': 'v',
+    'y_parity': 'yParity',
+}
+# NOTE: Needed to filter and match transactions regardless of what handlers use
+REQUIRED_TRANSACTION_FIELDS = ('from', 'hash', 'sighash', 'status', 'to', 'transactionIndex')
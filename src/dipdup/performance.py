@@ -11,9 +11,11 @@ These three need to be importable from anywhere, so no internal imports in this
 
 import gc
 import logging
+import sys
 from collections import deque
 from collections.abc import Callable
 from collections.abc import Coroutine
+from contextlib import suppress
 from functools import _CacheInfo
 from functools import lru_cache
 from itertools import chain
@@ -130,27 +132,85 @@ class _CacheManager:
         _logger.debug('Garbage collected %d items', collected)
 
 
+def estimate_size(obj: Any) -> int:
+    """Estimate the retained size of an object in bytes.
+
+    Descends into containers, dataclass fields and slots of any depth; every object is counted once, even if it's
+    referenced multiple times. Memory allocated outside of Python objects, e.g. by C extensions, is not counted.
+    """
+    size = 0
+    seen: set[int] = set()
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, str | bytes | int | float | bool | None):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, tuple | list | deque | set | frozenset):
+            stack.extend(obj)
+        elif hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+        else:
+            for cls in type(obj).__mro__:
+                for slot in getattr(cls, '__slots__', ()):
+                    stack.append(getattr(obj, slot, None))
+    return size
+
+
 class _QueueManager:
     def __init__(self) -> None:
         self._queues: dict[str, deque[Any]] = {}
         self._limits: dict[str, int] = {}
+        self._size_limits: dict[str, int] = {}
+        self._sizes: dict[str, int] = {}
+        self._peak_sizes: dict[str, int] = {}
 
     def add_queue(
         self,
         queue: deque[Any],
         name: str,
         limit: int = 0,
+        size_limit: int = 0,
     ) -> None:
         if name in self._queues:
             raise FrameworkException(f'Queue `{name}` already exists')
         self._queues[name] = queue
         self._limits[name] = limit
+        if size_limit:
+            self._size_limits[name] = size_limit
+            self._sizes[name] = 0
+            self._peak_sizes[name] = 0
 
     def remove_queue(self, name: str) -> None:
         if name not in self._queues:
             raise FrameworkException(f'Queue `{name}` does not exist')
         del self._queues[name]
         del self._limits[name]
+        self._size_limits.pop(name, None)
+        if self._sizes.pop(name, None) is not None:
+            # NOTE: Labels are created on the first `set_size` call
+            with suppress(KeyError):
+                metrics._readahead_bytes.remove(name)
+            with suppress(KeyError):
+                metrics._readahead_peak_bytes.remove(name)
+        self._peak_sizes.pop(name, None)
+
+    def set_size(self, name: str, size: int) -> None:
+        """Update the estimated size of queued items in bytes"""
+        if name not in self._sizes:
+            raise FrameworkException(f'Queue `{name}` is not size-limited')
+        self._sizes[name] = size
+        if size > self._peak_sizes[name]:
+            self._peak_sizes[name] = size
+            metrics._readahead_peak_bytes[name] = size
+        metrics._readahead_bytes[name] = size
 
     def stats(self) -> dict[str, Any]:
         stats: dict[str, Any] = {}
@@ -175,6 +235,13 @@ class _QueueManager:
                     'limit': None,
                     'full': None,
                 }
+
+            if name in self._size_limits:
+                stats[name].update(
+                    bytes=self._sizes[name],
+                    peak_bytes=self._peak_sizes[name],
+                    bytes_limit=self._size_limits[name],
+                )
         return stats
 
 
@@ -270,6 +337,61 @@ class _MetricManager:
         'Number of consecutive failed requests',
     )
 
+    _readahead_bytes = Gauge(
+        'dipdup_readahead_bytes',
+        'Estimated size of items buffered by index readahead',
+        ['queue'],
+    )
+    _readahead_peak_bytes = Gauge(
+        'dipdup_readahead_peak_bytes',
+        'Peak estimated size of items buffered by index readahead',
+        ['queue'],
+    )
+
+    _pipeline_occupancy = Gauge(
+        'dipdup_index_pipeline_occupancy',
+        'Number of matched levels waiting to be committed',
+        ['index'],
+    )
+    _pipeline_stall_seconds = Counter(
+        'dipdup_index_pipeline_stall_seconds',
+        'Time sync pipeline stage spent waiting for another one',
+        ['index', 'stage'],
+    )
+
+    _evm_node_range_window = Gauge(
+        'dipdup_evm_node_range_window',
+        'Current `eth_getLogs` block range of index node fetcher',
+        ['fetcher'],
+    )
+    _evm_node_range_decisions = Counter(
+        'dipdup_evm_node_range_decisions_total',
+        'Number of `eth_getLogs` range controller decisions',
+        ['fetcher', 'decision'],
+    )
+    _evm_node_head_latency: Histogram = Histogram(
+        'dipdup_evm_node_head_latency_seconds',
+        'Time from new head notification until its level data is passed to indexes',
+        ['datasource'],
+    )
+
+    _evm_node_hedged_requests = Counter(
+        'dipdup_evm_node_hedged_requests_total',
+        'Number of requests sent to another node after the primary one outlived its p95 latency',
+        ['datasource', 'winner'],
+    )
+    _evm_node_hedge_rate = Gauge(
+        'dipdup_evm_node_hedge_rate',
+        'Fraction of sync requests to the node hedged to another one',
+        ['datasource'],
+    )
+
+    _payload_decode_seconds = Counter(
+        'dipdup_payload_decode_seconds',
+        'Time spent decoding and validating typed handler arguments',
+        ['handler'],
+    )
+
     _sqd_processor_last_block: Gauge | int = Gauge(
         'sqd_processor_last_block',
         'Level of the last processed block from Subsquid Network',
@@ -21,10 +21,10 @@ KEEPALIVE_INTERVAL = 5
 
 
 class WebsocketMessage(Message, type_=MessageType.invocation):
-    def __init__(self, data: dict[str, Any]) -> None:
+    def __init__(self, data: Any) -> None:
         self.data = data
 
-    def dump(self) -> dict[str, Any]:
+    def dump(self) -> Any:
         return self.data
 
 
@@ -42,8 +42,11 @@ class WebsocketProtocol(Protocol):
     def __init__(self) -> None:
         pass
 
-    def decode(self, raw_message: str | bytes) -> tuple[WebsocketMessage]:
+    def decode(self, raw_message: str | bytes) -> tuple[WebsocketMessage, ...]:
         json_message = orjson.loads(raw_message)
+        # NOTE: JSON-RPC batch response; elements are processed separately
+        if isinstance(json_message, list):
+            return tuple(WebsocketMessage(data=item) for item in json_message)
         return (WebsocketMessage(data=json_message),)
 
     def encode(self, message: Message | HandshakeRequestMessage) -> str | bytes:
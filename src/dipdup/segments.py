@@ -0,0 +1,201 @@
+"""Persistent store of decoded level batches fetched during sync.
+
+When `DIPDUP_SEGMENTS_PATH` is set, fetchers save data they've got from datasources to local segments and read them
+back on the next sync of the same range, e.g. after reindexing. A segment covers `SEGMENT_SIZE` levels aligned to
+the multiple of its size and is keyed by DipDup version, datasource, filter hash and level range.
+
+Every key has its own directory with an append-only `index` file and zlib-compressed pickle segment files. Windows
+without data are recorded in the index only. Segments are immutable; to drop stale data remove the directory.
+Pickled models are tied to the code that wrote them, so segments of other DipDup versions are not reused, and
+segments that fail to load are fetched again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import pickle
+import zlib
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any
+from typing import TypeVar
+
+from dipdup import __version__
+from dipdup import env
+from dipdup.exceptions import FrameworkException
+
+SEGMENT_SIZE = 10_000
+INDEX_FILENAME = 'index'
+
+_logger = logging.getLogger(__name__)
+
+BatchT = TypeVar('BatchT', bound=Sequence[Any])
+
+
+@dataclass(frozen=True)
+class Segment:
+    first_level: int
+    last_level: int
+    filename: str | None
+
+
+def _normalize(obj: Any) -> Any:
+    if isinstance(obj, set | frozenset):
+        return tuple(sorted(_normalize(i) for i in obj))
+    if isinstance(obj, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in obj.items()))
+    if isinstance(obj, list | tuple):
+        return tuple(_normalize(i) for i in obj)
+    return obj
+
+
+def get_filter_hash(*filter: Any) -> str:
+    """Stable hash of fetcher filter; sets and dicts are sorted first"""
+    return hashlib.sha256(repr(_normalize(filter)).encode()).hexdigest()[:16]
+
+
+class SegmentIndex:
+    """Segments stored for a single datasource and filter"""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._segments: dict[int, Segment] = {}
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        index_path = self._path / INDEX_FILENAME
+        if not index_path.exists():
+            return
+
+        for line in index_path.read_text().splitlines():
+            # NOTE: Unfinished line after crash; segment will be fetched again
+            if line.count(' ') != 2:
+                continue
+            first_level, last_level, filename = line.split(' ')
+            self._segments[int(first_level)] = Segment(
+                first_level=int(first_level),
+                last_level=int(last_level),
+                filename=None if filename == '-' else filename,
+            )
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def get(self, level: int) -> Segment | None:
+        return self._segments.get(level - level % SEGMENT_SIZE)
+
+    def read(self, segment: Segment) -> list[Any] | None:
+        """Load segment batches; `None` if the segment is missing or can't be unpickled"""
+        if not segment.filename:
+            return []
+        path = self._path / segment.filename
+        try:
+            return pickle.loads(zlib.decompress(path.read_bytes()))  # type: ignore[no-any-return]
+        # NOTE: Unpickling models which layout has changed may fail with pretty much any error
+        except Exception as e:
+            _logger.warning('Failed to read segment `%s`, fetching it again: %s', path, e)
+            return None
+
+    def forget(self, segment: Segment) -> None:
+        """Treat segment as missing; it will be written again once fetched"""
+        self._segments.pop(segment.first_level, None)
+
+    def write(self, first_level: int, batches: list[Any]) -> None:
+        if first_level % SEGMENT_SIZE:
+            raise FrameworkException(f'Segment must start at multiple of {SEGMENT_SIZE}, got {first_level}')
+        if first_level in self._segments:
+            return
+
+        last_level = first_level + SEGMENT_SIZE - 1
+        filename = None
+        if batches:
+            filename = f'{first_level}-{last_level}.seg'
+            tmp_path = self._path / f'{filename}.tmp'
+            tmp_path.write_bytes(zlib.compress(pickle.dumps(batches, protocol=pickle.HIGHEST_PROTOCOL)))
+            tmp_path.rename(self._path / filename)
+
+        with (self._path / INDEX_FILENAME).open('a') as f:
+            f.write(f'{first_level} {last_level} {filename or "-"}\n')
+        self._segments[first_level] = Segment(first_level, last_level, filename)
+
+
+class SegmentStore:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._indexes: dict[tuple[str, str], SegmentIndex] = {}
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def open(self, datasource: str, filter_hash: str) -> SegmentIndex:
+        key = (datasource, filter_hash)
+        if key not in self._indexes:
+            self._indexes[key] = SegmentIndex(self._path / __version__ / datasource / filter_hash)
+        return self._indexes[key]
+
+
+@cache
+def get_segment_store() -> SegmentStore | None:
+    if not env.SEGMENTS_PATH:
+        return None
+    _logger.info('Using segment store at `%s`', env.SEGMENTS_PATH)
+    return SegmentStore(env.SEGMENTS_PATH.expanduser())
+
+
+async def iter_segments(
+    index: SegmentIndex,
+    iter_range: Callable[[int, int], AsyncIterator[BatchT]],
+    first_level: int,
+    last_level: int,
+    persist_until: int,
+) -> AsyncIterator[BatchT]:
+    """Yield stored batches for `first_level`-`last_level` range and fetch the gaps with `iter_range`.
+
+    Fetched segments are saved if they were covered from the first level and end no later than `persist_until`.
+    Batches returned by `iter_range` must be sorted and not span multiple levels.
+    """
+    level = first_level
+    while level <= last_level:
+        segment = index.get(level)
+        if segment:
+            batches = await asyncio.to_thread(index.read, segment)
+            if batches is not None:
+                for batch in batches:
+                    if first_level <= batch[0].level <= last_level:
+                        yield batch
+                level = segment.last_level + 1
+                continue
+            index.forget(segment)
+
+        # NOTE: Fetch everything up to the next stored segment at once
+        segment_first = level - level % SEGMENT_SIZE
+        gap_last = segment_first + SEGMENT_SIZE
+        while gap_last <= last_level and index.get(gap_last) is None:
+            gap_last += SEGMENT_SIZE
+        gap_last = min(gap_last - 1, last_level)
+
+        complete = level == segment_first
+        pending: list[BatchT] = []
+
+        async def _flush(until: int) -> None:
+            nonlocal segment_first, complete, pending
+            while segment_first + SEGMENT_SIZE - 1 <= until:
+                if complete and segment_first + SEGMENT_SIZE - 1 <= persist_until:
+                    await asyncio.to_thread(index.write, segment_first, pending)
+                segment_first += SEGMENT_SIZE
+                complete = True
+                pending = []
+
+        async for batch in iter_range(level, gap_last):
+            if not batch:
+                continue
+            await _flush(batch[0].level - 1)
+            pending.append(batch)
+            yield batch
+
+        await _flush(gap_last)
+        level = gap_last + 1
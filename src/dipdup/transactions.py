@@ -1,12 +1,18 @@
 from collections import deque
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 
 from tortoise.transactions import in_transaction
 
 import dipdup.models
 from dipdup.database import get_connection
 from dipdup.database import set_connection
+from dipdup.exceptions import FrameworkException
+
+# NOTE: Indexes are synchronized in separate tasks; the flag is set for the task which started the batch only, like
+# the connection itself
+_batched: ContextVar[bool] = ContextVar('batched', default=False)
 
 
 class TransactionManager:
@@ -22,6 +28,10 @@ class TransactionManager:
         self._transaction: dipdup.models.VersionedTransaction | None = None
         self._pending_updates: deque[dipdup.models.ModelUpdate] = deque()
 
+    @property
+    def batched(self) -> bool:
+        return _batched.get()
+
     @asynccontextmanager
     async def register(self) -> AsyncIterator[None]:
         """Register this manager to use in the current scope"""
@@ -34,6 +44,21 @@ class TransactionManager:
         dipdup.models.get_transaction = original_get_transaction
         dipdup.models.get_pending_updates = original_get_pending_updates
 
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """Run all `in_transaction` blocks inside wrapped block in a single transaction. They must not be versioned."""
+        token = None
+        try:
+            original_conn = get_connection()
+            async with in_transaction() as conn:
+                set_connection(conn)
+                token = _batched.set(True)
+                yield
+        finally:
+            if token:
+                _batched.reset(token)
+            set_connection(original_conn)
+
     @asynccontextmanager
     async def in_transaction(
         self,
@@ -42,6 +67,12 @@ class TransactionManager:
         index: str | None = None,
     ) -> AsyncIterator[None]:
         """Enforce using transaction for all queries inside wrapped block. Works for a single DB only."""
+        if self.batched:
+            if level and index and self._depth and (not sync_level or sync_level - level <= self._depth):
+                raise FrameworkException("Versioned transaction can't be started inside a batch")
+            yield
+            return
+
         try:
             original_conn = get_connection()
             async with in_transaction() as conn:
@@ -1,8 +1,10 @@
 import tempfile
 from pathlib import Path
 
+import orjson
 import pytest
 from pydantic import ValidationError
+from pydantic_core import to_jsonable_python
 
 from dipdup.config import DipDupConfig
 from dipdup.config import HasuraConfig
@@ -10,6 +12,7 @@ from dipdup.config import HttpConfig
 from dipdup.config import PostgresDatabaseConfig
 from dipdup.config import ResolvedHttpConfig
 from dipdup.config.evm_transactions import EvmTransactionsHandlerConfig
+from dipdup.config.evm_transactions import EvmTransactionsIndexConfig
 from dipdup.config.tezos import TezosContractConfig
 from dipdup.config.tezos_operations import TezosOperationsIndexConfig
 from dipdup.config.tezos_tzkt import TezosTzktDatasourceConfig
@@ -150,3 +153,21 @@ async def test_http_config() -> None:
 
 # async def test_evm() -> None:
 #     DipDupConfig.load([Path(__file__).parent.parent / 'configs' / 'evm_subsquid.yml'])
+
+
+async def test_evm_transactions_fields_hash() -> None:
+    path = Path(__file__).parent.parent.parent / 'src' / 'demo_evm_transactions' / 'dipdup.yaml'
+    config = DipDupConfig.load([path])
+    config.initialize()
+    index_config = config.indexes['eth_usdt_transactions']
+    assert isinstance(index_config, EvmTransactionsIndexConfig)
+
+    # NOTE: Default `fields` must not change hashes of existing indexes
+    config_dict = orjson.loads(orjson.dumps(index_config, default=to_jsonable_python))
+    assert config_dict['fields'] is None
+    EvmTransactionsIndexConfig.strip(config_dict)
+    assert 'fields' not in config_dict
+
+    default_hash = index_config.hash()
+    object.__setattr__(index_config, 'fields', ('value',))
+    assert index_config.hash() != default_hash
@@ -0,0 +1,253 @@
+import asyncio
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock
+
+from dipdup.config import HttpConfig
+from dipdup.config.evm_node import EvmNodeDatasourceConfig
+from dipdup.datasources._headers import BlockHeader
+from dipdup.datasources._headers import HeaderCache
+from dipdup.datasources._headers import Reorg
+from dipdup.datasources._headers import ReorgTracker
+from dipdup.datasources.evm_node import JSONRPC_INVALID_REQUEST
+from dipdup.datasources.evm_node import EvmNodeDatasource
+from dipdup.models.evm import EvmEventData
+from dipdup.models.evm import EvmTransactionData
+from dipdup.models.evm_node import EvmNodeHeadSubscription
+from dipdup.models.evm_node import EvmNodeLogsSubscription
+
+
+def _create_datasource(batch_size: int = 2, realtime_prefetch: int = 0) -> EvmNodeDatasource:
+    config = EvmNodeDatasourceConfig(
+        kind='evm.node',
+        url='https://localhost',
+        http=HttpConfig(batch_size=batch_size),
+        realtime_prefetch=realtime_prefetch,
+    )
+    config._name = 'evm_node'
+    return EvmNodeDatasource(config)
+
+
+def _make_block(level: int) -> dict[str, Any]:
+    return {
+        'number': hex(level),
+        'hash': f'0x{level:064x}',
+        'parentHash': f'0x{level - 1:064x}',
+        'timestamp': hex(level),
+    }
+
+
+def _make_response(request: dict[str, Any]) -> dict[str, Any]:
+    level = int(request['params'][0], 16)
+    if level == 3:
+        return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': 'header not found'}}
+    return {'jsonrpc': '2.0', 'id': request['id'], 'result': _make_block(level)}
+
+
+async def _respond(method: str, url: str, weight: int = 1, **kwargs: Any) -> Any:
+    payload = kwargs['json']
+    if isinstance(payload, list):
+        # NOTE: Order of batch responses is not guaranteed
+        return [_make_response(request) for request in reversed(payload)]
+    # NOTE: Single requests always succeed
+    return {'jsonrpc': '2.0', 'id': payload['id'], 'result': _make_block(int(payload['params'][0], 16))}
+
+
+async def test_jsonrpc_batch() -> None:
+    datasource = _create_datasource()
+    datasource._http._request = AsyncMock(side_effect=_respond)  # type: ignore[method-assign]
+    datasource.request = AsyncMock(side_effect=_respond)  # type: ignore[method-assign]
+
+    blocks = await datasource.get_blocks_by_level(range(1, 6))
+    assert [block['number'] for block in blocks] == ['0x1', '0x2', '0x3', '0x4', '0x5']
+    assert datasource._batch_support is True
+
+    # NOTE: Three chunks; the failed element is retried with a single request
+    batch_calls = datasource._http._request.await_count + datasource.request.await_count
+    assert batch_calls == 4
+
+
+async def test_jsonrpc_batch_rejected() -> None:
+    async def _reject(method: str, url: str, weight: int = 1, **kwargs: Any) -> Any:
+        payload = kwargs['json']
+        if isinstance(payload, list):
+            return {'jsonrpc': '2.0', 'id': None, 'error': {'code': JSONRPC_INVALID_REQUEST, 'message': 'no batches'}}
+        return await _respond(method, url, weight, **kwargs)
+
+    datasource = _create_datasource()
+    datasource._http._request = AsyncMock(side_effect=_reject)  # type: ignore[method-assign]
+    datasource.request = AsyncMock(side_effect=_reject)  # type: ignore[method-assign]
+
+    blocks = await datasource.get_blocks_by_level([1, 2, 4, 5])
+    assert [block['number'] for block in blocks] == ['0x1', '0x2', '0x4', '0x5']
+    assert datasource._batch_support is False
+    assert all(not isinstance(call.kwargs['json'], list) for call in datasource.request.await_args_list)
+
+
+def _make_header(level: int) -> BlockHeader:
+    return BlockHeader(level, f'0x{level:064x}', f'0x{level - 1:064x}', level * 12)
+
+
+async def test_header_cache(tmp_path: Path) -> None:
+    path = tmp_path / 'headers.sqlite'
+    cache = HeaderCache(rollback_depth=2, path=path, size=3)
+    cache.set_head_level(5)
+    await cache.put_many(_make_header(level) for level in range(1, 6))
+
+    # NOTE: LRU keeps last three headers in memory; irreversible ones are stored on disk
+    assert len(cache) == 3
+    assert list(await cache.get_many([1, 2, 3, 4, 5])) == [3, 4, 5, 1, 2]
+
+    cache.rollback(3)
+    assert cache.get(5) is None
+    assert cache.get(2) == _make_header(2)
+
+    await cache.close()
+    assert cache._db is None
+
+    cache = HeaderCache(rollback_depth=2, path=path)
+    assert list(await cache.get_many([1, 2, 3, 4, 5])) == [1, 2, 3]
+    await cache.close()
+
+
+async def test_get_headers() -> None:
+    datasource = _create_datasource()
+    datasource.request = AsyncMock(side_effect=_respond)  # type: ignore[method-assign]
+    datasource._batch_support = True
+
+    headers = await datasource.get_headers([1, 2])
+    assert headers[2] == BlockHeader(2, f'0x{2:064x}', f'0x{1:064x}', 2)
+    assert datasource.request.await_count == 1
+
+    assert await datasource.get_headers([2, 1]) == headers
+    assert datasource.request.await_count == 1
+
+
+def _make_head(level: int) -> dict[str, Any]:
+    return {
+        **_make_block(level),
+        'difficulty': '0x0',
+        'extraData': '0x',
+        'gasLimit': '0x0',
+        'gasUsed': '0x0',
+        'logsBloom': '0x',
+        'miner': '0x' + '00' * 20,
+        'mixHash': '0x' + '00' * 32,
+        'nonce': '0x0',
+        'receiptsRoot': '0x' + '00' * 32,
+        'sha3Uncles': '0x' + '00' * 32,
+        'stateRoot': '0x' + '00' * 32,
+        'transactionsRoot': '0x' + '00' * 32,
+    }
+
+
+def _make_log(level: int, log_index: int) -> dict[str, Any]:
+    return {
+        'address': '0x' + '11' * 20,
+        'blockHash': f'0x{level:064x}',
+        'blockNumber': hex(level),
+        'data': '0x',
+        'logIndex': hex(log_index),
+        'topics': [],
+        'transactionHash': '0x' + '22' * 32,
+        'transactionIndex': '0x0',
+        'removed': False,
+    }
+
+
+async def test_realtime_prefetch() -> None:
+    datasource = _create_datasource(realtime_prefetch=2)
+    datasource.get_head_level = AsyncMock(return_value=1)  # type: ignore[method-assign]
+    for logs_subscription in (
+        EvmNodeLogsSubscription(address='0x' + '11' * 20),
+        EvmNodeLogsSubscription(topics=(('0x' + '33' * 32,),)),
+    ):
+        datasource._subscriptions.add(logs_subscription)
+        await datasource._subscribe(logs_subscription)
+    assert not datasource._subscription_ids
+    assert len(datasource._logs_filters) == 2
+
+    released = asyncio.Event()
+    calls: list[Sequence[tuple[str, Any]]] = []
+
+    async def _batch(batch_calls: Sequence[tuple[str, Any]], ws: bool = False) -> list[Any]:
+        calls.append(batch_calls)
+        level = int(batch_calls[0][1][0]['blockHash'], 16)
+        # NOTE: The first block is slow; the second one is fetched meanwhile
+        if level == 1:
+            await released.wait()
+        logs = [_make_log(level, 2), _make_log(level, 1)]
+        return [logs, logs[:1], {'transactions': []}]
+
+    datasource._jsonrpc_batch_request = _batch  # type: ignore[assignment,method-assign]
+
+    emitted: list[tuple[int, int]] = []
+
+    async def _on_events(_: EvmNodeDatasource, events: tuple[EvmEventData, ...]) -> None:
+        emitted.extend((event.level, event.log_index) for event in events)
+
+    async def _on_transactions(_: EvmNodeDatasource, transactions: tuple[EvmTransactionData, ...]) -> None:
+        emitted.append((-1, len(transactions)))
+
+    datasource.call_on_events(_on_events)
+    datasource.call_on_transactions(_on_transactions)
+    emitter = asyncio.create_task(datasource._emitter_loop())
+
+    subscription = EvmNodeHeadSubscription(transactions=True)
+    await datasource._handle_subscription(subscription, _make_head(1))
+    await datasource._handle_subscription(subscription, _make_head(2))
+    await asyncio.sleep(0.01)
+    assert len(calls) == 2
+    assert emitted == []
+
+    released.set()
+    await asyncio.sleep(0.01)
+    emitter.cancel()
+
+    # NOTE: Levels are emitted in order; overlapping logs are deduplicated
+    assert emitted == [(1, 1), (1, 2), (2, 1), (2, 2)]
+    assert not datasource._level_data
+
+
+def _make_fork_header(level: int, fork: int, parent_fork: int | None = None) -> BlockHeader:
+    parent_fork = fork if parent_fork is None else parent_fork
+    return BlockHeader(level, f'0x{fork:02x}{level:062x}', f'0x{parent_fork:02x}{level - 1:062x}', level * 12)
+
+
+async def test_reorg_tracker() -> None:
+    fetched: list[int] = []
+    forks: dict[str, BlockHeader] = {}
+
+    async def get_header(block_hash: str) -> BlockHeader | None:
+        header = forks.get(block_hash)
+        if header:
+            fetched.append(header.level)
+        return header
+
+    tracker = ReorgTracker(size=5)
+    for level in range(1, 8):
+        assert await tracker.add(_make_fork_header(level, 0), get_header) is None
+    assert len(tracker) == 5
+
+    # NOTE: Duplicate head
+    assert _make_fork_header(7, 0) in tracker
+    assert await tracker.add(_make_fork_header(7, 0), get_header) is None
+
+    # NOTE: Two levels replaced; ancestors of the new head are fetched by hash
+    forks[_make_fork_header(6, 1, 0).hash] = _make_fork_header(6, 1, 0)
+    forks[_make_fork_header(7, 1).hash] = _make_fork_header(7, 1)
+    assert await tracker.add(_make_fork_header(8, 1), get_header) == Reorg(7, 5)
+    assert fetched == [7, 6]
+    assert tracker.head == _make_fork_header(8, 1)
+
+    assert await tracker.add(_make_fork_header(7, 2, 1), get_header) == Reorg(8, 6)
+
+    # NOTE: Missed heads without reorg
+    forks.update({_make_fork_header(level, 2).hash: _make_fork_header(level, 2) for level in (8, 9)})
+    assert await tracker.add(_make_fork_header(10, 2), get_header) is None
+    assert tracker.head == _make_fork_header(10, 2)
+
+    # NOTE: Node doesn't know the parent, e.g. pruned; roll back all levels in the chain
+    assert await tracker.add(_make_fork_header(12, 3), get_header) == Reorg(10, 5)
+    assert tracker.head == _make_fork_header(12, 3)
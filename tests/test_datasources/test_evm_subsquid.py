@@ -0,0 +1,156 @@
+from collections.abc import AsyncIterator
+from typing import Any
+from unittest.mock import Mock
+
+import aiohttp
+import orjson
+
+from dipdup.config.evm_subsquid import EvmSubsquidDatasourceConfig
+from dipdup.datasources._subsquid import JsonArraySplitter
+from dipdup.datasources._subsquid import SubsquidWorkerPool
+from dipdup.datasources.evm_subsquid import EvmSubsquidDatasource
+
+PAGE_SIZE = 30
+
+
+class _Worker:
+    def __init__(self, url: str, first_level: int, last_level: int) -> None:
+        self.url = url
+        self.first_level = first_level
+        self.last_level = last_level
+        self.queries: list[int] = []
+        self.fail_at: int | None = None
+        self.opened = 0
+        self.closed = 0
+
+    async def __aenter__(self) -> None:
+        self.opened += 1
+
+    async def __aexit__(self, *args: Any) -> None:
+        self.closed += 1
+
+    async def query(self, query: dict[str, Any]) -> list[dict[str, Any]]:
+        first_level = query['fromBlock']
+        self.queries.append(first_level)
+        if not self.first_level <= first_level <= self.last_level:
+            raise aiohttp.ClientResponseError(Mock(), (), status=400)
+        last_level = min(first_level + PAGE_SIZE - 1, self.last_level, query['toBlock'])
+        return [
+            {'header': {'number': level, 'hash': f'0x{level:064x}', 'timestamp': level}, 'logs': []}
+            for level in range(first_level, last_level + 1)
+        ]
+
+    async def query_bytes(self, query: dict[str, Any]) -> bytes:
+        return orjson.dumps(await self.query(query))
+
+    async def iter_query(self, query: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        for block in await self.query(query):
+            if block['header']['number'] == self.fail_at:
+                self.fail_at = None
+                raise aiohttp.ClientPayloadError
+            yield block
+
+
+class _Router:
+    def __init__(self, *ranges: tuple[int, int]) -> None:
+        self.calls: list[int] = []
+        self.workers = [_Worker(f'https://worker{i}', *r) for i, r in enumerate(ranges)]
+
+    async def get_worker(self, level: int) -> _Worker:
+        self.calls.append(level)
+        for worker in self.workers:
+            if worker.first_level <= level <= worker.last_level:
+                # NOTE: New datasource object every time, like the real one
+                return _Worker(worker.url, worker.first_level, worker.last_level)
+        raise AssertionError
+
+
+def _create_datasource(router: _Router, streaming: bool = False) -> EvmSubsquidDatasource:
+    config = EvmSubsquidDatasourceConfig(kind='evm.subsquid', url='https://localhost', streaming=streaming)
+    config._name = 'evm_subsquid'
+    datasource = EvmSubsquidDatasource(config)
+    datasource._get_worker = router.get_worker  # type: ignore[assignment,method-assign]
+    return datasource
+
+
+async def test_worker_pool() -> None:
+    router = _Router((0, 99), (100, 199))
+    datasource = _create_datasource(router)
+
+    batches = [batch async for batch in datasource.iter_events(((None, '0x' + '00' * 32),), 0, 199)]
+    assert len(batches) == 200
+
+    # NOTE: One router call per worker range; continuation is asked from the same worker first
+    assert router.calls == [0, 100]
+    workers = list(datasource._workers._workers.values())
+    assert len(workers) == 2
+    first, second = (state.worker for state in workers)
+    assert first.queries == [0, 30, 60, 90, 100]  # type: ignore[attr-defined]
+    assert second.queries == [100, 130, 160, 190]  # type: ignore[attr-defined]
+    assert workers[0].errors == 1
+
+    await datasource._workers.close()
+    assert (first.opened, first.closed) == (1, 1)  # type: ignore[attr-defined]
+    assert len(datasource._workers) == 0
+
+
+async def test_worker_pool_streaming() -> None:
+    router = _Router((0, 99), (100, 199))
+    datasource = _create_datasource(router, streaming=True)
+    datasource._http_config.retry_sleep = 0
+
+    async def get_worker(level: int) -> _Worker:
+        worker = await router.get_worker(level)
+        if level == 0:
+            worker.fail_at = 10
+        return worker
+
+    datasource._get_worker = get_worker  # type: ignore[assignment,method-assign]
+
+    batches = [batch async for batch in datasource.iter_events(((None, '0x' + '00' * 32),), 0, 199)]
+    assert len(batches) == 200
+
+    # NOTE: Interrupted stream is resumed from the next level
+    assert router.calls == [0, 10, 100]
+    await datasource._workers.close()
+
+
+async def test_worker_pool_eviction() -> None:
+    router = _Router((0, 99), (100, 199), (200, 299))
+    datasource = _create_datasource(router)
+    datasource._workers = SubsquidWorkerPool(max_sessions=2)
+    opened: list[_Worker] = []
+
+    async def get_worker(level: int) -> _Worker:
+        worker = await router.get_worker(level)
+        opened.append(worker)
+        return worker
+
+    datasource._get_worker = get_worker  # type: ignore[assignment,method-assign]
+
+    batches = [batch async for batch in datasource.iter_events(((None, '0x' + '00' * 32),), 0, 299)]
+    assert len(batches) == 300
+
+    # NOTE: Least recently used session is closed to make room for the third worker
+    assert [worker.url for worker in opened] == ['https://worker0', 'https://worker1', 'https://worker2']
+    assert [(worker.opened, worker.closed) for worker in opened] == [(1, 1), (1, 0), (1, 0)]
+    assert len(datasource._workers) == 2
+
+    await datasource._workers.close()
+    assert [(worker.opened, worker.closed) for worker in opened] == [(1, 1), (1, 1), (1, 1)]
+    assert len(datasource._workers) == 0
+
+
+def test_json_array_splitter() -> None:
+    items = [{'header': {'number': i}, 'logs': [{'data': f'"]}}{{\\{i}', 'topics': ['[', ']']}]} for i in range(20)]
+    data = orjson.dumps(items)
+
+    for chunk_size in (1, 2, 3, 7, 64, len(data)):
+        splitter = JsonArraySplitter()
+        result: list[Any] = []
+        for i in range(0, len(data), chunk_size):
+            result.extend(orjson.loads(item) for item in splitter.feed(data[i : i + chunk_size]))
+        splitter.close()
+        assert result == items
+        # NOTE: Only the unfinished item is buffered
+        assert not splitter._buffer
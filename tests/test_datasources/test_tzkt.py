@@ -219,6 +219,16 @@ async def test_no_content() -> None:
             await tzkt.get_jsonschemas('KT1EHdK9asB6BtPLvt1ipKRuxsrKoQhDoKgs')
 
 
+async def test_request_operations_fields() -> None:
+    async with tzkt_replay() as tzkt:
+        with pytest.raises(DatasourceError, match='No fields selected'):
+            await tzkt._request_operations('transaction', 'get', url='v1/operations/transactions', params={})
+        with pytest.raises(DatasourceError, match='one field request'):
+            await tzkt._request_operations(
+                'transaction', 'get', url='v1/operations/transactions', params={'select.values': 'id'}
+            )
+
+
 async def test_signalr_client() -> None:
     fail_mock = AsyncMock(side_effect=pysignalr.exceptions.ConnectionError(418))
 
@@ -0,0 +1,44 @@
+from typing import Any
+
+import orjson
+
+from dipdup.datasources.evm_subsquid import _decode_events
+from dipdup.decoder import DECODE_THRESHOLD
+from dipdup.decoder import decode
+from dipdup.decoder import decode_pool
+
+
+def _make_response(levels: int) -> list[dict[str, Any]]:
+    return [
+        {
+            'header': {'number': level, 'hash': f'0x{level:064x}', 'timestamp': level * 12},
+            'logs': [
+                {
+                    'address': '0x' + '00' * 20,
+                    'data': '0x',
+                    'logIndex': i,
+                    'topics': ['0x' + 'ff' * 32],
+                    'transactionHash': f'0x{level:032x}{i:032x}',
+                    'transactionIndex': i,
+                }
+                for i in range(3)
+            ],
+        }
+        for level in range(levels)
+    ]
+
+
+async def test_decode_pool() -> None:
+    response = orjson.dumps(_make_response(DECODE_THRESHOLD // 100))
+    assert len(response) > DECODE_THRESHOLD
+    small_response = orjson.dumps(_make_response(1))
+    last_level, expected = _decode_events(response)
+    assert last_level == DECODE_THRESHOLD // 100 - 1
+
+    assert await decode(_decode_events, response) == (last_level, expected)
+    async with decode_pool(2):
+        assert await decode(_decode_events, response) == (last_level, expected)
+        assert await decode(_decode_events, small_response) == (0, expected[:1])
+        assert await decode(_decode_events, b'[]') == (None, [])
+    async with decode_pool(None):
+        assert await decode(_decode_events, response) == (last_level, expected)
@@ -0,0 +1,304 @@
+import asyncio
+import random
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+
+from dipdup import env
+from dipdup.fetcher import DataFetcher
+from dipdup.fetcher import DatasourceWeights
+from dipdup.fetcher import FetcherChannel
+from dipdup.fetcher import HasLevel
+from dipdup.fetcher import LevelBuffer
+from dipdup.fetcher import _readahead_by_level
+from dipdup.fetcher import yield_by_level
+from dipdup.performance import estimate_size
+from dipdup.performance import metrics
+from dipdup.performance import queues
+
+
+@dataclass(frozen=True)
+class Item(HasLevel):
+    level: int
+    id: int
+
+
+async def _iter_batches(*batches: tuple[Item, ...]) -> AsyncIterator[tuple[Item, ...]]:
+    for batch in batches:
+        yield batch
+
+
+def _make_items(*levels: int) -> tuple[Item, ...]:
+    return tuple(Item(level=level, id=i) for i, level in enumerate(levels))
+
+
+async def test_yield_by_level() -> None:
+    items = _make_items(1, 1, 2, 3, 3, 3, 4)
+    batches = (items[:3], items[3:5], (), items[5:])
+
+    result = [(level, batch) async for level, batch in yield_by_level(_iter_batches(*batches))]
+
+    assert [level for level, _ in result] == [1, 2, 3, 4]
+    assert [len(batch) for _, batch in result] == [2, 1, 3, 1]
+    assert tuple(item for _, batch in result for item in batch) == items
+    for level, batch in result:
+        assert all(item.level == level for item in batch)
+
+
+async def test_yield_by_level_single_level_batches() -> None:
+    first, second = _make_items(1, 1), _make_items(2)
+
+    result = [(level, batch) async for level, batch in yield_by_level(_iter_batches(first, second))]
+
+    # NOTE: Batches containing a single level are yielded as is, without copying
+    assert result == [(1, first), (2, second)]
+    assert result[0][1] is first
+
+
+async def test_yield_by_level_carry_over() -> None:
+    items = _make_items(1, 2, 2, 2, 2, 3)
+    batches = tuple((item,) for item in items)
+
+    result = [(level, batch) async for level, batch in yield_by_level(_iter_batches(*batches))]
+
+    assert result == [(1, items[:1]), (2, items[1:5]), (3, items[5:])]
+
+
+async def test_yield_by_level_empty() -> None:
+    result = [(level, batch) async for level, batch in yield_by_level(_iter_batches((), ()))]
+    assert result == []
+
+
+@dataclass(frozen=True)
+class BlobItem(HasLevel):
+    level: int
+    blob: bytes
+
+
+async def test_readahead_size_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(env, 'READAHEAD_MB', 1)
+    produced = 0
+
+    async def _iter_blobs() -> AsyncIterator[tuple[BlobItem, ...]]:
+        nonlocal produced
+        for level in range(100):
+            produced += 1
+            yield (BlobItem(level=level, blob=bytes(2**18)),)
+
+    levels: list[int] = []
+    async for level, _ in _readahead_by_level(_iter_blobs(), limit=1000, name='test'):
+        if not levels:
+            await asyncio.sleep(0.1)
+            # NOTE: Four 256 KiB levels fill the budget; a couple more are in flight in `yield_by_level`
+            assert produced < 10
+            stats = queues.stats()['test:readahead']
+            assert stats['bytes_limit'] == 2**20
+            assert stats['peak_bytes'] >= 2**20
+        levels.append(level)
+
+    assert levels == list(range(100))
+    assert 'test:readahead' not in queues.stats()
+    assert ('test:readahead',) not in metrics._readahead_bytes._metrics
+
+
+def test_estimate_size() -> None:
+    item = BlobItem(level=1, blob=bytes(1000))
+    assert estimate_size(item) > 1000
+    assert estimate_size((item, BlobItem(level=1, blob=bytes(1000)))) > 2000
+    # NOTE: Shared objects are counted once
+    assert estimate_size((item, item)) < 2000
+    # NOTE: Nested payloads are counted at any depth
+    assert estimate_size({'a': [{'b': {'c': [bytes(1000)]}}]}) > 1000
+
+
+class _PageChannel(FetcherChannel[Item, Any, None]):
+    in_flight = 0
+    max_in_flight = 0
+
+    def __init__(self, buffer: LevelBuffer[Item], pages: list[tuple[Item, ...]], last_level: int) -> None:
+        super().__init__(buffer, set(), 0, last_level, ())
+        self._pages = pages
+
+    async def fetch(self) -> None:
+        _PageChannel.in_flight += 1
+        _PageChannel.max_in_flight = max(_PageChannel.max_in_flight, _PageChannel.in_flight)
+        await asyncio.sleep(0)
+        _PageChannel.in_flight -= 1
+
+        page = self._pages.pop(0)
+        for item in page:
+            self._buffer[item.level].append(item)
+        # NOTE: The last level of a page may continue on the next one
+        self._head = page[-1].level - 1 if self._pages else self._last_level
+
+
+class _MergedFetcher(DataFetcher[Item, Any]):
+    def fetch_by_level(self) -> AsyncIterator[tuple[int, tuple[Item, ...]]]:
+        raise NotImplementedError
+
+
+async def test_merged_iter() -> None:
+    fetcher = _MergedFetcher('test', (), 0, 20, 100)
+    channels: set[FetcherChannel[Any, Any, Any]] = {
+        _PageChannel(fetcher._buffer, [_make_items(1, 2, 3), _make_items(3, 8), _make_items(8, 20)], 20),
+        _PageChannel(fetcher._buffer, [_make_items(2, 5, 6), _make_items(6, 7)], 20),
+        _PageChannel(fetcher._buffer, [_make_items(1, 15)], 20),
+    }
+
+    result = [batch async for batch in fetcher._merged_iter(channels, tuple)]
+
+    levels = [batch[0].level for batch in result]
+    assert levels == [1, 2, 3, 5, 6, 7, 8, 15, 20]
+    assert [len(batch) for batch in result] == [2, 2, 2, 1, 2, 1, 2, 1, 1]
+    assert _PageChannel.max_in_flight == 3
+
+
+@dataclass(frozen=True)
+class _StripeDatasource:
+    name: str
+    delay: float = 0.0
+    broken: bool = False
+
+
+async def test_striped_iter() -> None:
+    datasources = (_StripeDatasource('a'), _StripeDatasource('b', 0.01), _StripeDatasource('broken', broken=True))
+    fetcher = _MergedFetcher('test', datasources, 0, 99, 100)
+    used: list[tuple[str, int]] = []
+    random.seed(0)
+
+    async def _fetch_window(
+        datasource: _StripeDatasource, first_level: int, last_level: int
+    ) -> AsyncIterator[tuple[Item, ...]]:
+        await asyncio.sleep(datasource.delay)
+        used.append((datasource.name, first_level))
+        for level in range(first_level, last_level + 1):
+            # NOTE: Broken datasource fails in the middle of a window
+            if datasource.broken and level % 7 == 3:
+                raise ConnectionError
+            yield (Item(level=level, id=0),)
+
+    result = [batch async for batch in fetcher.striped_iter(_fetch_window, 7, 0, 99)]
+
+    assert [batch[0].level for batch in result] == list(range(100))
+    # NOTE: Windows failed by the broken datasource are resumed from the failed level
+    resumed = [level for name, level in used if name != 'broken' and level % 7]
+    assert resumed
+    assert all(level % 7 == 3 for level in resumed)
+
+
+async def test_striped_iter_readahead() -> None:
+    # NOTE: Readahead limit of 5 batches
+    fetcher = _MergedFetcher('test', (_StripeDatasource('a'), _StripeDatasource('b')), 0, 99, 5)
+    produced, peak = 0, 0
+
+    async def _fetch_window(
+        datasource: _StripeDatasource, first_level: int, last_level: int
+    ) -> AsyncIterator[tuple[Item, ...]]:
+        nonlocal produced
+        for level in range(first_level, last_level + 1):
+            produced += 1
+            yield (Item(level=level, id=0),)
+
+    result = []
+    async for batch in fetcher.striped_iter(_fetch_window, 10, 0, 99):
+        result.append(batch[0].level)
+        peak = max(peak, produced - len(result))
+        await asyncio.sleep(0.001)
+
+    assert result == list(range(100))
+    # NOTE: Windows ahead of the current one stop at the readahead limit; the current one is never paused
+    assert 5 <= peak <= 5 + 10
+
+
+async def test_striped_iter_close() -> None:
+    fetcher = _MergedFetcher('test', (_StripeDatasource('a'), _StripeDatasource('b')), 0, 99, 5)
+
+    async def _fetch_window(
+        datasource: _StripeDatasource, first_level: int, last_level: int
+    ) -> AsyncIterator[tuple[Item, ...]]:
+        for level in range(first_level, last_level + 1):
+            await asyncio.sleep(0)
+            yield (Item(level=level, id=0),)
+
+    batches = fetcher.striped_iter(_fetch_window, 10, 0, 99)
+    async for batch in batches:
+        if batch[0].level == 15:
+            break
+    await batches.aclose()  # type: ignore[attr-defined]
+
+    # NOTE: Windows in flight are cancelled and awaited on exit
+    assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+
+
+def test_datasource_weights() -> None:
+    fast, slow = _StripeDatasource('fast'), _StripeDatasource('slow')
+    weights: DatasourceWeights[Any] = DatasourceWeights((fast, slow))
+    weights.update(fast, 1.0, 100)
+    weights.update(slow, 10.0, 100)
+    weights.update(slow, 10.0, 100)
+
+    assert weights.get_latency(fast) == 0.01
+    assert weights.get_latency(slow) == pytest.approx(0.1)
+    assert weights.choose(exclude={fast}) is slow
+
+    random.seed(0)
+    picks = [weights.choose() for _ in range(1000)]
+    assert picks.count(fast) > picks.count(slow) * 5
+
+
+async def test_striped_iter_all_failed() -> None:
+    fetcher = _MergedFetcher(
+        'test', (_StripeDatasource('a', broken=True), _StripeDatasource('b', broken=True)), 0, 9, 100
+    )
+
+    async def _fetch_window(
+        datasource: _StripeDatasource, first_level: int, last_level: int
+    ) -> AsyncIterator[tuple[Item, ...]]:
+        raise ConnectionError
+        yield
+
+    with pytest.raises(ConnectionError):
+        _ = [batch async for batch in fetcher.striped_iter(_fetch_window, 5, 0, 9)]
+
+
+async def test_pipelined_iter() -> None:
+    # NOTE: Readahead limit of 5 batches
+    fetcher = _MergedFetcher('test', (), 0, 99, 5)
+    started: list[int] = []
+    produced, peak = 0, 0
+
+    async def _iter_range(first_level: int, last_level: int) -> AsyncIterator[tuple[Item, ...]]:
+        nonlocal produced
+        started.append(first_level)
+        for level in range(first_level, last_level + 1):
+            produced += 1
+            yield (Item(level=level, id=0),)
+
+    result = []
+    async for batch in fetcher.pipelined_iter(_iter_range, 10, 4, 0, 99):
+        result.append(batch[0].level)
+        peak = max(peak, produced - len(result))
+        await asyncio.sleep(0.001)
+
+    assert result == list(range(100))
+    assert started == list(range(0, 100, 10))
+    # NOTE: Windows ahead of the current one stop at the readahead limit; the current one is never paused
+    assert 5 <= peak <= 5 + 10
+
+
+async def test_pipelined_iter_error() -> None:
+    fetcher = _MergedFetcher('test', (), 0, 99, 5)
+
+    async def _iter_range(first_level: int, last_level: int) -> AsyncIterator[tuple[Item, ...]]:
+        if first_level == 20:
+            raise ConnectionError
+        for level in range(first_level, last_level + 1):
+            yield (Item(level=level, id=0),)
+
+    result = []
+    with pytest.raises(ConnectionError):
+        async for batch in fetcher.pipelined_iter(_iter_range, 10, 3, 0, 99):
+            result.append(batch[0].level)
+    assert result == list(range(20))
@@ -0,0 +1,46 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from dipdup.config import HttpConfig
+from dipdup.config import ResolvedHttpConfig
+from dipdup.exceptions import InvalidRequestError
+from dipdup.http import _HTTPGateway
+
+
+async def _json(request: web.Request) -> web.Response:
+    return web.json_response([{'id': 1}])
+
+
+async def _no_content(request: web.Request) -> web.Response:
+    return web.Response(status=204)
+
+
+async def _empty(request: web.Request) -> web.Response:
+    return web.Response(body=b'')
+
+
+@asynccontextmanager
+async def _gateway() -> AsyncIterator[_HTTPGateway]:
+    app = web.Application()
+    app.router.add_get('/json', _json)
+    app.router.add_get('/no_content', _no_content)
+    app.router.add_get('/empty', _empty)
+
+    async with TestServer(app) as server:
+        config = ResolvedHttpConfig.create(HttpConfig(), HttpConfig(retry_count=0))
+        gateway = _HTTPGateway(str(server.make_url('/')), config)
+        async with gateway:
+            yield gateway
+
+
+async def test_request_bytes() -> None:
+    async with _gateway() as gateway:
+        assert await gateway.request_bytes('get', 'json') == b'[{"id": 1}]'
+        with pytest.raises(InvalidRequestError, match='204 No Content'):
+            await gateway.request_bytes('get', 'no_content')
+        with pytest.raises(InvalidRequestError, match='Empty response'):
+            await gateway.request_bytes('get', 'empty')
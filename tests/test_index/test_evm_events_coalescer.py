@@ -0,0 +1,87 @@
+import asyncio
+from collections.abc import AsyncIterator
+from types import SimpleNamespace
+
+import pytest
+
+from dipdup.indexes.evm_events import coalescer
+from dipdup.indexes.evm_events.coalescer import EvmEventsCoalescer
+from dipdup.indexes.evm_events.fetcher import EvmSubsquidEventFetcher
+from dipdup.models.evm import EvmEventData
+
+ADDRESSES = ('0x' + 'aa' * 20, '0x' + 'bb' * 20)
+TOPIC0 = '0x' + 'ff' * 32
+
+
+def _make_event(level: int, address: str) -> EvmEventData:
+    return EvmEventData(
+        address=address,
+        block_hash=f'0x{level:064x}',
+        data='0x',
+        level=level,
+        log_index=ADDRESSES.index(address),
+        removed=False,
+        timestamp=level * 12,
+        topics=(TOPIC0,),
+        transaction_hash=f'0x{level:064x}',
+        transaction_index=0,
+    )
+
+
+class _Datasource:
+    name = 'subsquid'
+    _config = SimpleNamespace(concurrency=1)
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[tuple[tuple[str | None, str], ...], int, int]] = []
+
+    async def iter_events(
+        self,
+        topics: tuple[tuple[str | None, str], ...],
+        first_level: int,
+        last_level: int,
+    ) -> AsyncIterator[tuple[EvmEventData, ...]]:
+        self.calls.append((topics, first_level, last_level))
+        for level in range(first_level, last_level + 1):
+            yield tuple(_make_event(level, address) for address, _ in topics if address)
+
+
+async def test_coalescer(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(coalescer, 'COALESCE_WINDOW', 0.01)
+    datasource = _Datasource()
+    ranges = ((1, 20), (5, 10))
+    fetchers = [
+        EvmSubsquidEventFetcher(f'index_{i}', (datasource,), first, last, ((ADDRESSES[i], TOPIC0),))  # type: ignore[arg-type]
+        for i, (first, last) in enumerate(ranges)
+    ]
+
+    events_coalescer = EvmEventsCoalescer()
+    members = [events_coalescer.join(fetcher) for fetcher in fetchers]
+
+    async def _collect(i: int) -> list[tuple[int, str]]:
+        return [(level, event.address) async for level, batch in members[i].fetch_by_level() for event in batch]
+
+    results = await asyncio.gather(_collect(0), _collect(1))
+    assert results[0] == [(level, ADDRESSES[0]) for level in range(1, 21)]
+    assert results[1] == [(level, ADDRESSES[1]) for level in range(5, 11)]
+    assert len(datasource.calls) == 1
+    assert datasource.calls[0][1:] == (1, 20)
+
+
+async def test_coalescer_closed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(coalescer, 'COALESCE_WINDOW', 0.01)
+    monkeypatch.setattr(coalescer, 'COALESCE_QUEUE_SIZE', 1)
+    datasource = _Datasource()
+    fetchers = [
+        EvmSubsquidEventFetcher(f'index_{i}', (datasource,), 1, 20, ((ADDRESSES[i], TOPIC0),))  # type: ignore[arg-type]
+        for i in range(2)
+    ]
+
+    events_coalescer = EvmEventsCoalescer()
+    members = [events_coalescer.join(fetcher) for fetcher in fetchers]
+
+    # NOTE: The first index stops consuming; the second one must not be blocked
+    await asyncio.sleep(0.05)
+    members[0].close()
+    levels = [level async for level, _ in members[1].fetch_by_level()]
+    assert levels == list(range(1, 21))
@@ -0,0 +1,186 @@
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from eth_abi.abi import encode as encode_abi
+from pydantic import BaseModel
+
+from dipdup.indexes.evm_events.matcher import build_dispatch_table
+from dipdup.indexes.evm_events.matcher import decode_event_data
+from dipdup.indexes.evm_events.matcher import get_static_decoder
+from dipdup.indexes.evm_events.matcher import match_events
+from dipdup.models.evm import EvmEventData
+from dipdup.models.evm import LazyEvmEvent
+
+TRANSFER_TOPIC0 = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+APPROVAL_TOPIC0 = '0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925'
+TOKEN_A = '0x' + 'aa' * 20
+TOKEN_B = '0x' + 'bb' * 20
+HOLDER = '0x' + '11' * 20
+
+
+class TransferPayload(BaseModel):
+    from_: str
+    to: str
+    value: int
+
+
+class ApprovalPayload(BaseModel):
+    owner: str
+    spender: str
+    value: int
+
+
+_ABIS = {
+    'Transfer': {
+        'name': 'Transfer',
+        'topic0': TRANSFER_TOPIC0,
+        'inputs': (('address', True), ('address', True), ('uint256', False)),
+        'topic_count': 2,
+    },
+    'Approval': {
+        'name': 'Approval',
+        'topic0': APPROVAL_TOPIC0,
+        'inputs': (('address', True), ('address', True), ('uint256', False)),
+        'topic_count': 2,
+    },
+}
+
+
+class _Abis:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get_event_abi(self, typename: str, name: str) -> dict[str, Any]:
+        self.calls += 1
+        return _ABIS[name]
+
+
+def _make_package() -> Any:
+    def get_type(typename: str, module: str, name: str) -> type[BaseModel]:
+        return TransferPayload if name == 'TransferPayload' else ApprovalPayload
+
+    return SimpleNamespace(_evm_abis=_Abis(), get_type=get_type)
+
+
+def _make_handler(name: str, address: str | None) -> Any:
+    return SimpleNamespace(
+        name=name,
+        callback=f'on_{name.lower()}_{address}',
+        contract=SimpleNamespace(module_name='token', address=address),
+    )
+
+
+def _make_event(topic0: str, address: str, value: int) -> EvmEventData:
+    return EvmEventData(
+        address=address,
+        block_hash='0x' + '00' * 32,
+        data=f'0x{value:064x}',
+        level=1,
+        log_index=0,
+        removed=False,
+        timestamp=0,
+        topics=(topic0, '0x' + '00' * 12 + HOLDER[2:], '0x' + '00' * 12 + HOLDER[2:]),
+        transaction_hash='0x' + '00' * 32,
+        transaction_index=0,
+    )
+
+
+def test_match_events_dispatch_table() -> None:
+    package = _make_package()
+    handlers = (
+        _make_handler('Transfer', TOKEN_A),
+        _make_handler('Approval', None),
+        _make_handler('Transfer', None),
+    )
+    table = build_dispatch_table(package, handlers)
+    assert [entry.handler_config for entry in table[TRANSFER_TOPIC0]] == [handlers[0], handlers[2]]
+    assert package._evm_abis.calls == 3
+
+    events = (
+        _make_event(TRANSFER_TOPIC0, TOKEN_A, 1),
+        _make_event(TRANSFER_TOPIC0, TOKEN_B, 2),
+        _make_event(APPROVAL_TOPIC0, TOKEN_B, 3),
+        _make_event('0x' + 'ff' * 32, TOKEN_A, 4),
+    )
+    matched = match_events(package, handlers, events, table)
+    # NOTE: ABIs are not looked up while matching
+    assert package._evm_abis.calls == 3
+
+    assert [handler for handler, _ in matched] == [handlers[0], handlers[2], handlers[1]]
+    assert [event.payload.value for _, event in matched] == [1, 2, 3]
+    assert matched[0][1].payload.to == HOLDER
+
+
+def test_match_events_lazy() -> None:
+    package = _make_package()
+    handlers = (_make_handler('Transfer', None),)
+    events = (_make_event(TRANSFER_TOPIC0, TOKEN_A, 1), _make_event(TRANSFER_TOPIC0, TOKEN_B, 2))
+
+    matched = match_events(package, handlers, events, lazy=True)
+    args = [arg for _, arg in matched]
+    assert all(isinstance(arg, LazyEvmEvent) for arg in args)
+    assert all('payload' not in arg.__dict__ for arg in args)
+
+    assert args[1].data.address == TOKEN_B
+    assert args[1].payload.value == 2
+    assert args[1].payload is args[1].payload
+    assert 'payload' not in args[0].__dict__
+
+
+SWAP_INPUTS = (
+    ('address', True),
+    ('address', True),
+    ('int256', False),
+    ('int256', False),
+    ('uint160', False),
+    ('uint128', False),
+    ('int24', False),
+)
+
+
+def _encode_event(inputs: tuple[tuple[str, bool], ...], values: tuple[Any, ...]) -> tuple[str, tuple[str, ...]]:
+    topics = ['0x' + 'ee' * 32]
+    data_types, data_values = [], []
+    for (type_, indexed), value in zip(inputs, values, strict=True):
+        if indexed:
+            topics.append('0x' + encode_abi((type_,), (value,)).hex())
+        else:
+            data_types.append(type_)
+            data_values.append(value)
+    return '0x' + encode_abi(data_types, data_values).hex(), tuple(topics)
+
+
+@pytest.mark.parametrize(
+    ('inputs', 'values'),
+    (
+        (SWAP_INPUTS, (TOKEN_A, HOLDER, -(10**18), 2**200, 2**159 + 1, 12345, -887272)),
+        (SWAP_INPUTS, (TOKEN_B, HOLDER, 2**255 - 1, -(2**255), 0, 2**128 - 1, 887272)),
+        (
+            (('bool', False), ('bytes32', True), ('uint8', True), ('bytes4', False), ('address', False)),
+            (True, b'\x01' * 32, 255, b'\xde\xad\xbe\xef', TOKEN_B),
+        ),
+    ),
+)
+def test_static_decoder(inputs: tuple[tuple[str, bool], ...], values: tuple[Any, ...]) -> None:
+    data, topics = _encode_event(inputs, values)
+    decoder = get_static_decoder(inputs)
+    assert decoder is not None
+    assert decoder(data, topics) == values
+    assert decode_event_data(data, topics, inputs) == values
+
+
+def test_static_decoder_fallback() -> None:
+    # NOTE: Dynamic types are decoded by eth_abi
+    inputs = (('address', True), ('string', False), ('uint256', False))
+    assert get_static_decoder(inputs) is None
+    data, topics = _encode_event(inputs, (TOKEN_A, 'hello', 42))
+    assert decode_event_data(data, topics, inputs) == (TOKEN_A, 'hello', 42)
+
+    decoder = get_static_decoder(SWAP_INPUTS)
+    assert decoder is not None
+    _, topics = _encode_event(SWAP_INPUTS, (TOKEN_A, HOLDER, 0, 0, 0, 0, 0))
+    # NOTE: Empty data means all non-indexed values are zero
+    assert decoder('0x', topics) == (TOKEN_A, HOLDER, 0, 0, 0, 0, 0)
+    # NOTE: Truncated data is left to eth_abi
+    assert decoder('0x' + '00' * 64, topics) is None
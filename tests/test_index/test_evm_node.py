@@ -0,0 +1,317 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from dipdup.datasources._headers import BlockHeader
+from dipdup.datasources._hedging import HEDGE_MIN_SAMPLES
+from dipdup.datasources._hedging import HedgePolicy
+from dipdup.datasources.evm_node import JSONRPC_METHOD_NOT_FOUND
+from dipdup.exceptions import DatasourceError
+from dipdup.indexes.evm_events.fetcher import EvmNodeEventFetcher
+from dipdup.indexes.evm_node import MAX_BATCH_SIZE
+from dipdup.indexes.evm_node import MIN_BATCH_SIZE
+from dipdup.indexes.evm_node import RANGE_CEILING_SUCCESSES
+from dipdup.indexes.evm_node import RANGE_MAX_BYTES
+from dipdup.indexes.evm_node import RANGE_REGION_SIZE
+from dipdup.indexes.evm_node import RANGE_STEP_UP
+from dipdup.indexes.evm_node import RangeController
+from dipdup.indexes.evm_node import is_range_error
+from dipdup.indexes.evm_transactions.fetcher import EvmNodeTransactionFetcher
+from dipdup.indexes.evm_transactions.fetcher import is_trace_unsupported_error
+
+
+class _Node:
+    name = 'node'
+    _http_config = SimpleNamespace(ratelimit_sleep=1.0)
+
+    def __init__(self, max_range: int, concurrency: int = 1) -> None:
+        self.max_range = max_range
+        self.calls: list[tuple[int, int]] = []
+        self.fetch_semaphore = asyncio.Semaphore(concurrency)
+        self._config = SimpleNamespace(concurrency=concurrency)
+        self.hedge_policy = HedgePolicy(self.name, budget=0.0)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_events(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        first_level, last_level = int(params['fromBlock'], 16), int(params['toBlock'], 16)
+        self.calls.append((first_level, last_level))
+        if last_level - first_level + 1 > self.max_range:
+            raise DatasourceError('query returned more than 10000 results', self.name)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # NOTE: Later windows are returned first
+        await asyncio.sleep(0.05 / (first_level + 1))
+        self.in_flight -= 1
+        return [_make_log(level) for level in range(first_level, last_level + 1)]
+
+    async def get_headers(self, block_numbers: list[int]) -> dict[int, BlockHeader]:
+        return {
+            level: BlockHeader(level, f'0x{level:064x}', f'0x{level - 1:064x}', level * 12) for level in block_numbers
+        }
+
+
+def _make_log(level: int) -> dict[str, Any]:
+    return {
+        'address': '0x' + '00' * 20,
+        'blockHash': f'0x{level:064x}',
+        'blockNumber': hex(level),
+        'data': '0x',
+        'logIndex': '0x0',
+        'removed': False,
+        'topics': ['0x' + 'ff' * 32],
+        'transactionHash': f'0x{level:064x}',
+        'transactionIndex': '0x0',
+    }
+
+
+def test_is_range_error() -> None:
+    assert is_range_error(DatasourceError('Query returned more than 10000 results', 'node'))
+    assert is_range_error(DatasourceError('block range too large', 'node'))
+    assert not is_range_error(DatasourceError('invalid params', 'node'))
+    assert is_range_error(DatasourceError('Log response size exceeded. You can make eth_getLogs requests', 'node'))
+    assert not is_range_error(DatasourceError('header not found', 'node'))
+    assert not is_range_error(DatasourceError('request timed out', 'node'))
+    assert not is_range_error(DatasourceError('execution reverted: index out of range', 'node'))
+
+
+def test_is_trace_unsupported_error() -> None:
+    assert is_trace_unsupported_error(
+        DatasourceError('the method trace_filter does not exist/is not available', 'node')
+    )
+    assert is_trace_unsupported_error(DatasourceError('Method not found', 'node', JSONRPC_METHOD_NOT_FOUND))
+    assert is_trace_unsupported_error(DatasourceError('Unsupported method: trace_filter', 'node', -32600))
+    assert not is_trace_unsupported_error(DatasourceError('header not found', 'node'))
+    assert not is_trace_unsupported_error(DatasourceError('header not found', 'node', -32000))
+    assert not is_trace_unsupported_error(DatasourceError('Method not found', 'node'))
+
+
+def test_range_controller() -> None:
+    controller = RangeController('test', target_latency=1.0)
+    assert controller.get_window(0) == MIN_BATCH_SIZE
+
+    controller.on_success(0, MIN_BATCH_SIZE - 1, 0.1, 0)
+    assert controller.get_window(0) == MIN_BATCH_SIZE + RANGE_STEP_UP
+
+    controller.on_success(0, 99, 0.1, RANGE_MAX_BYTES * 2)
+    assert controller.get_window(0) == 50
+
+    # NOTE: Unknown region starts from the last window, known one keeps its own
+    controller.on_error(RANGE_REGION_SIZE, RANGE_REGION_SIZE + 999)
+    assert controller.get_window(RANGE_REGION_SIZE) == 500
+    assert controller.get_window(0) == 50
+    assert controller.get_window(RANGE_REGION_SIZE * 2) == 500
+
+    # NOTE: Window doesn't grow beyond the half of the rejected one
+    controller.on_success(RANGE_REGION_SIZE, RANGE_REGION_SIZE + 499, 0.1, 0)
+    assert controller.get_window(RANGE_REGION_SIZE) == 500
+
+    for _ in range(5):
+        controller.on_success(0, controller.get_window(0) - 1, 2.0, 0)
+    assert controller.get_window(0) == MIN_BATCH_SIZE
+
+    controller.on_success(RANGE_REGION_SIZE * 2, RANGE_REGION_SIZE * 2 + MAX_BATCH_SIZE * 2, 0.1, 0)
+    assert controller.get_window(RANGE_REGION_SIZE * 2) == MAX_BATCH_SIZE
+
+
+def test_range_controller_ceiling() -> None:
+    controller = RangeController('test', target_latency=1.0)
+    controller.on_error(0, 999)
+    assert controller.get_window(0) == 500
+
+    # NOTE: Ceiling is raised after enough successful requests at it
+    for _ in range(RANGE_CEILING_SUCCESSES - 1):
+        controller.on_success(0, 499, 0.1, 0)
+    assert controller.get_window(0) == 500
+    controller.on_success(0, 499, 0.1, 0)
+    assert controller.get_window(0) == 500 + RANGE_STEP_UP
+
+    # NOTE: Another rejection resets the progress
+    controller.on_error(0, 599)
+    assert controller.get_window(0) == 300
+
+
+async def test_get_events_range_split() -> None:
+    node = _Node(max_range=30)
+    fetcher = EvmNodeEventFetcher('test', (node,), 0, 99, set())  # type: ignore[arg-type]
+
+    events = await fetcher.get_events_range(0, 99, None, node)  # type: ignore[arg-type]
+    assert list(events) == list(range(100))
+    assert node.calls[:3] == [(0, 99), (0, 49), (0, 24)]
+    assert fetcher.get_range_controller(node).get_window(0) <= 30  # type: ignore[arg-type]
+
+    with pytest.raises(DatasourceError):
+        await fetcher.get_events_range(0, 0, None, _Node(max_range=0))  # type: ignore[arg-type]
+
+
+async def test_fetch_range_concurrent() -> None:
+    node = _Node(max_range=MAX_BATCH_SIZE, concurrency=3)
+    fetchers = [EvmNodeEventFetcher(f'test_{i}', (node,), 0, 99, set()) for i in range(2)]  # type: ignore[arg-type]
+
+    async def _collect(fetcher: EvmNodeEventFetcher) -> list[int]:
+        return [batch[0].level async for batch in fetcher._fetch_range(0, 99)]
+
+    results = await asyncio.gather(*(_collect(fetcher) for fetcher in fetchers))
+    assert results == [list(range(100)), list(range(100))]
+    # NOTE: Both indexes share the datasource budget
+    assert node.max_in_flight == 3
+
+
+async def test_fetch_range_close() -> None:
+    node = _Node(max_range=10, concurrency=3)
+    fetcher = EvmNodeEventFetcher('test', (node,), 0, 99, set())  # type: ignore[arg-type]
+    get_events = node.get_events
+
+    async def _get_events(params: dict[str, Any]) -> list[dict[str, Any]]:
+        # NOTE: Windows after the first one are still in flight when consumer stops
+        if params['fromBlock'] != '0x0':
+            await asyncio.sleep(10)
+        return await get_events(params)
+
+    node.get_events = _get_events  # type: ignore[method-assign]
+
+    batches = fetcher._fetch_range(0, 99)
+    assert (await anext(batches))[0].level == 0
+    await batches.aclose()  # type: ignore[attr-defined]
+
+    # NOTE: Windows in flight are cancelled and awaited
+    pending = [task for task in asyncio.all_tasks() if task.get_name().startswith('fetch_events:test:')]
+    assert not [task for task in pending if not task.done()]
+
+
+async def test_hedged_request() -> None:
+    primary, secondary = _Node(max_range=MAX_BATCH_SIZE), _Node(max_range=MAX_BATCH_SIZE)
+    primary.hedge_policy = HedgePolicy('primary', budget=0.05)
+    fetcher = EvmNodeEventFetcher('test', (primary, secondary), 0, 99, set())  # type: ignore[arg-type]
+    delays = {id(primary): 0.01, id(secondary): 0.01}
+    calls: list[_Node] = []
+
+    async def _request(node: _Node) -> int:
+        calls.append(node)
+        await asyncio.sleep(delays[id(node)])
+        return id(node)
+
+    for _ in range(HEDGE_MIN_SAMPLES):
+        assert await fetcher.hedged(primary, 'eth_getLogs', _request) == id(primary)  # type: ignore[arg-type]
+    assert calls == [primary] * HEDGE_MIN_SAMPLES
+
+    # NOTE: Primary node is stuck; request is hedged and the secondary node answers first
+    calls.clear()
+    delays[id(primary)] = 10.0
+    assert await fetcher.hedged(primary, 'eth_getLogs', _request) == id(secondary)  # type: ignore[arg-type]
+    assert calls == [primary, secondary]
+
+    # NOTE: Budget is spent; waiting for the primary node
+    delays[id(primary)] = 0.05
+    calls.clear()
+    assert await fetcher.hedged(primary, 'eth_getLogs', _request) == id(primary)  # type: ignore[arg-type]
+    assert calls == [primary]
+    assert primary.hedge_policy.rate == 1 / (HEDGE_MIN_SAMPLES + 2)
+
+
+async def test_hedged_request_semaphore() -> None:
+    primary, secondary = _Node(max_range=MAX_BATCH_SIZE), _Node(max_range=MAX_BATCH_SIZE)
+    primary.hedge_policy = HedgePolicy('primary', budget=1.0)
+    fetcher = EvmNodeEventFetcher('test', (primary, secondary), 0, 99, set())  # type: ignore[arg-type]
+    delays = {id(primary): 0.01, id(secondary): 0.01}
+    calls: list[_Node] = []
+
+    async def _request(node: _Node) -> int:
+        calls.append(node)
+        await asyncio.sleep(delays[id(node)])
+        return id(node)
+
+    for _ in range(HEDGE_MIN_SAMPLES):
+        await fetcher.hedged(primary, 'eth_getLogs', _request)  # type: ignore[arg-type]
+
+    # NOTE: Secondary node is busy with its own windows; duplicate request waits for a slot
+    calls.clear()
+    delays[id(primary)] = 0.2
+    async with secondary.fetch_semaphore:
+        assert await fetcher.hedged(primary, 'eth_getLogs', _request) == id(primary)  # type: ignore[arg-type]
+    assert calls == [primary]
+
+
+def _make_transaction(level: int, index: int, to: str) -> dict[str, Any]:
+    return {
+        'blockHash': f'0x{level:064x}',
+        'blockNumber': hex(level),
+        'from': '0x' + '11' * 20,
+        'gas': '0x5208',
+        'gasPrice': '0x1',
+        'hash': f'0x{level:060x}{index:04x}',
+        'input': '0x',
+        'nonce': '0x0',
+        'to': to,
+        'transactionIndex': hex(index),
+        'value': '0x0',
+    }
+
+
+class _TraceNode(_Node):
+    contract = '0x' + 'cc' * 20
+
+    def __init__(self, trace_support: bool = True) -> None:
+        super().__init__(max_range=MAX_BATCH_SIZE)
+        self.trace_support = trace_support
+        # NOTE: Contract is called at every 100th level by the second transaction in block
+        self.transactions = {
+            level: [_make_transaction(level, 0, '0x' + 'aa' * 20), _make_transaction(level, 1, self.contract)]
+            for level in range(0, 1000, 100)
+        }
+        self.requested: list[str] = []
+
+    async def get_traces(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        if not self.trace_support:
+            raise DatasourceError('the method trace_filter does not exist/is not available', self.name)
+        assert params['toAddress'] == [self.contract]
+        first_level, last_level = int(params['fromBlock'], 16), int(params['toBlock'], 16)
+        traces = []
+        for level, transactions in self.transactions.items():
+            if not first_level <= level <= last_level:
+                continue
+            transaction = transactions[1]
+            trace = {'blockNumber': level, 'transactionHash': transaction['hash'], 'traceAddress': []}
+            traces.append(trace)
+            # NOTE: Internal call of the same transaction
+            traces.append({**trace, 'traceAddress': [0]})
+        return traces
+
+    async def get_transactions_by_hash(self, transaction_hashes: list[str]) -> list[dict[str, Any]]:
+        self.requested.extend(transaction_hashes)
+        by_hash = {tx['hash']: tx for transactions in self.transactions.values() for tx in transactions}
+        return [by_hash[transaction_hash] for transaction_hash in transaction_hashes]
+
+    async def get_blocks_by_level(self, levels: list[int], full_transactions: bool) -> list[dict[str, Any]]:
+        self.requested.extend(f'block:{level}' for level in levels)
+        return [
+            {'number': hex(level), 'timestamp': hex(level * 12), 'transactions': self.transactions.get(level, [])}
+            for level in levels
+        ]
+
+
+async def test_transactions_trace_discovery() -> None:
+    node = _TraceNode()
+    fetcher = EvmNodeTransactionFetcher(
+        'test', (node,), 0, 999, trace_filters=({'toAddress': [node.contract]},)  # type: ignore[arg-type]
+    )
+    batches = [batch async for batch in fetcher._fetch_range(0, 999)]
+    assert [batch[0].level for batch in batches] == list(range(0, 1000, 100))
+    assert all(len(batch) == 1 and batch[0].to == node.contract for batch in batches)
+    assert batches[1][0].timestamp == 1200
+    # NOTE: Only matching transactions are fetched, no full blocks
+    assert node.requested == [transactions[1]['hash'] for transactions in node.transactions.values()]
+
+
+async def test_transactions_trace_discovery_unsupported() -> None:
+    node = _TraceNode(trace_support=False)
+    fetcher = EvmNodeTransactionFetcher(
+        'test', (node,), 0, 199, trace_filters=({'toAddress': [node.contract]},)  # type: ignore[arg-type]
+    )
+    batches = [batch async for batch in fetcher._fetch_range(0, 199)]
+    assert [(batch[0].level, len(batch)) for batch in batches] == [(0, 2), (100, 2)]
+    assert fetcher._trace_filters is None
+    assert len(node.requested) == 200
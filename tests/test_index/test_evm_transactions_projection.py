@@ -0,0 +1,50 @@
+from typing import Any
+
+from dipdup.indexes.evm_transactions.projection import get_accessed_attributes
+from dipdup.models.evm import EvmTransactionData
+
+
+async def on_typed(ctx: Any, transaction: Any) -> None:
+    await ctx.save(transaction.input.value, transaction.data.from_, transaction.data.gas_used, transaction.data.level)
+
+
+async def on_untyped(ctx: Any, transaction: Any) -> None:
+    if transaction.value:
+        await ctx.save(transaction.hash, transaction.nonce)
+
+
+async def on_passed(ctx: Any, transaction: Any) -> None:
+    await ctx.save(transaction)
+
+
+async def on_data_passed(ctx: Any, transaction: Any) -> None:
+    await ctx.save(transaction.data)
+
+
+def test_get_accessed_attributes() -> None:
+    assert get_accessed_attributes(on_typed, typed=True) == {'input', 'from_', 'gas_used', 'level'}
+    assert get_accessed_attributes(on_untyped, typed=False) == {'value', 'hash', 'nonce'}
+    assert get_accessed_attributes(on_passed, typed=False) is None
+    assert get_accessed_attributes(on_data_passed, typed=True) is None
+    assert get_accessed_attributes(print, typed=False) is None
+
+
+def test_transaction_from_projected_json() -> None:
+    header = {'hash': '0x' + '11' * 32, 'number': 100, 'timestamp': 1000}
+    transaction = EvmTransactionData.from_subsquid_json(
+        transaction_json={
+            'from': '0x' + '22' * 20,
+            'hash': '0x' + '33' * 32,
+            'sighash': '0xa9059cbb',
+            'status': 1,
+            'to': '0x' + '44' * 20,
+            'transactionIndex': 5,
+            'value': '0x10',
+        },
+        header=header,
+    )
+    assert transaction.sighash == '0xa9059cbb'
+    assert transaction.input == '0x'
+    assert transaction.value == 16
+    assert transaction.gas is None
+    assert transaction.nonce is None
@@ -0,0 +1,215 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from dipdup.database import tortoise_wrapper
+from dipdup.index import Index
+from dipdup.transactions import TransactionManager
+
+
+@dataclass(frozen=True)
+class Item:
+    level: int
+
+
+class _Transactions:
+    def __init__(self, events: list[tuple[str, int]]) -> None:
+        self.events = events
+        self.batched = False
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        self.events.append(('begin', 0))
+        self.batched = True
+        try:
+            yield
+        finally:
+            self.batched = False
+        self.events.append(('end', 0))
+
+    @asynccontextmanager
+    async def in_transaction(self, **kwargs: Any) -> AsyncIterator[None]:
+        yield
+
+
+class _PipelineIndex(Index[Any, Any, Any]):
+    def __init__(
+        self,
+        depth: int | None,
+        batch_levels: int | None = None,
+        rollback_depth: int = 0,
+    ) -> None:
+        self.events: list[tuple[str, int]] = []
+        self.synced: list[int] = []
+        self.batched: list[bool] = []
+        advanced = SimpleNamespace(
+            pipeline_depth=depth,
+            sync_batch_levels=batch_levels,
+            sync_batch_ms=None,
+            rollback_depth=rollback_depth,
+        )
+        config = SimpleNamespace(advanced=advanced, contracts={}, indexes={})
+        ctx = SimpleNamespace(config=config, transactions=_Transactions(self.events))
+        super().__init__(ctx, SimpleNamespace(name='test', handlers=()), ())  # type: ignore[arg-type]
+        self._state = SimpleNamespace(level=0)  # type: ignore[assignment]
+
+    async def _update_state(self, status: Any = None, level: int | None = None) -> None:
+        self.events.append(('save', self.state.level))
+
+    async def _synchronize(self, sync_level: int) -> None:
+        raise NotImplementedError
+
+    def _match_level_data(self, handlers: Any, level_data: Any) -> deque[Any]:
+        raise NotImplementedError
+
+    def _match_level(self, level_data: Any) -> deque[Any]:
+        if level_data[0].level == 13:
+            raise ValueError
+        self.events.append(('match', level_data[0].level))
+        return deque()
+
+    async def _commit_level(self, level_data: Any, matched_handlers: deque[Any], sync_level: int) -> None:
+        await asyncio.sleep(0.01)
+        self.events.append(('commit', level_data[0].level))
+        self.batched.append(self._ctx.transactions.batched)
+        self.state.level = level_data[0].level
+
+    def _on_level_synced(self, level: int) -> None:
+        self.synced.append(level)
+
+
+async def _iter_levels(*levels: int) -> AsyncIterator[tuple[int, tuple[Item, ...]]]:
+    for level in levels:
+        yield level, (Item(level),)
+
+
+async def test_process_levels_sequential() -> None:
+    index = _PipelineIndex(None)
+    await index._process_levels(_iter_levels(1, 2), 2)
+    assert index.events == [('match', 1), ('commit', 1), ('match', 2), ('commit', 2)]
+
+
+async def test_process_levels_pipeline() -> None:
+    index = _PipelineIndex(2)
+    await index._process_levels(_iter_levels(1, 2, 3, 4), 4)
+
+    assert [level for stage, level in index.events if stage == 'commit'] == [1, 2, 3, 4]
+    # NOTE: Levels are matched ahead while the first one commits, up to the pipeline depth
+    assert index.events[:4] == [('match', 1), ('match', 2), ('match', 3), ('match', 4)]
+
+
+async def test_process_levels_pipeline_rematch() -> None:
+    class _AddContractIndex(_PipelineIndex):
+        async def _commit_level(self, level_data: Any, matched_handlers: deque[Any], sync_level: int) -> None:
+            await super()._commit_level(level_data, matched_handlers, sync_level)
+            if level_data[0].level == 1:
+                self._ctx.config.contracts['new'] = object()  # type: ignore[assignment]
+
+    index = _AddContractIndex(2)
+    await index._process_levels(_iter_levels(1, 2, 3, 4, 5), 5)
+
+    assert [level for stage, level in index.events if stage == 'commit'] == [1, 2, 3, 4, 5]
+    # NOTE: Levels matched ahead before the contract was added are matched again
+    matched = [level for stage, level in index.events if stage == 'match']
+    assert matched[:4] == [1, 2, 3, 4]
+    assert matched.count(2) == 2
+    assert matched.count(3) == 2
+    assert matched.count(5) == 1
+
+
+async def test_process_levels_empty() -> None:
+    async def _iter_levels() -> AsyncIterator[tuple[int, tuple[Item, ...]]]:
+        yield 1, (Item(1),)
+        yield 2, ()
+        yield 3, (Item(3),)
+        yield 4, ()
+
+    for depth in (None, 2):
+        index = _PipelineIndex(depth)
+        await index._process_levels(_iter_levels(), 4)
+        assert [level for stage, level in index.events if stage == 'commit'] == [1, 3]
+        assert index.synced == [1, 2, 3, 4]
+
+
+async def test_process_levels_pipeline_error() -> None:
+    index = _PipelineIndex(2)
+    with pytest.raises(ValueError):
+        await index._process_levels(_iter_levels(11, 12, 13, 14), 14)
+    assert ('commit', 12) in index.events
+    assert ('match', 14) not in index.events
+    # NOTE: Match task is cancelled and awaited
+    assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+
+
+async def test_process_levels_batch() -> None:
+    index = _PipelineIndex(None, batch_levels=2, rollback_depth=2)
+    await index._process_levels(_iter_levels(1, 2, 3, 4, 5, 6), 6)
+
+    events = [event for event in index.events if event[0] != 'match']
+    assert events == [
+        ('begin', 0),
+        ('commit', 1),
+        ('commit', 2),
+        ('save', 2),
+        ('end', 0),
+        ('begin', 0),
+        ('commit', 3),
+        ('save', 3),
+        ('end', 0),
+        # NOTE: Levels within rollback depth are committed one by one
+        ('commit', 4),
+        ('commit', 5),
+        ('commit', 6),
+    ]
+
+
+async def test_process_levels_batch_matched() -> None:
+    class _MatchedIndex(_PipelineIndex):
+        def _match_level(self, level_data: Any) -> deque[Any]:
+            return deque(((None, level_data[0]),))
+
+        async def _commit_level(self, level_data: Any, matched_handlers: deque[Any], sync_level: int) -> None:
+            await Index._commit_level(self, level_data, matched_handlers, sync_level)
+
+    async def _fire_handler(**kwargs: Any) -> None:
+        pass
+
+    index = _MatchedIndex(None, batch_levels=3)
+    index._ctx.fire_handler = _fire_handler  # type: ignore[assignment]
+    await index._process_levels(_iter_levels(1, 2, 3, 4, 5), 100)
+
+    # NOTE: Index state is saved once per batch
+    assert index.events == [('begin', 0), ('save', 3), ('end', 0), ('begin', 0), ('save', 5), ('end', 0)]
+
+
+async def test_process_levels_batch_error() -> None:
+    index = _PipelineIndex(2, batch_levels=10)
+    with pytest.raises(ValueError):
+        await index._process_levels(_iter_levels(11, 12, 13, 14), 100)
+
+    assert index.events[-1] == ('commit', 12)
+    assert ('save', 12) not in index.events
+
+
+async def test_process_levels_concurrent() -> None:
+    transactions = TransactionManager(depth=2)
+    # NOTE: The first index is far from the sync level and commits in batches, the second one is within rollback depth
+    syncing = _PipelineIndex(None, batch_levels=100, rollback_depth=2)
+    head = _PipelineIndex(None, batch_levels=100, rollback_depth=20)
+    for index in (syncing, head):
+        index._ctx.transactions = transactions
+
+    async with tortoise_wrapper('sqlite://:memory:'):
+        await asyncio.gather(
+            syncing._process_levels(_iter_levels(*range(1, 11)), 100),
+            head._process_levels(_iter_levels(*range(1, 11)), 10),
+        )
+
+    assert syncing.batched == [True] * 10
+    assert head.batched == [False] * 10
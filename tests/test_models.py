@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import pickle
+from dataclasses import FrozenInstanceError
+from dataclasses import asdict
+from dataclasses import astuple
+from dataclasses import fields
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import orjson as json
+import pytest
 
 from dipdup.indexes.tezos_operations.parser import deserialize_storage
+from dipdup.models.evm import EvmEventData
+from dipdup.models.evm import EvmTransactionData
 from dipdup.models.tezos import TezosOperationData
 from tests.types.asdf.storage import AsdfStorage
 from tests.types.bazaar.storage import BazaarMarketPlaceStorage
@@ -317,3 +326,69 @@ def test_origination_amount() -> None:
     operation = TezosOperationData.from_json(operations_json[0])
 
     assert operation.amount == 31000000
+
+
+def test_evm_event_data_compact() -> None:
+    event_json: dict[str, Any] = {
+        'address': '0x' + 'ab' * 20,
+        'blockHash': '0x' + '01' * 32,
+        'blockNumber': '0x10',
+        'data': '0x' + '00' * 31 + '2a',
+        'logIndex': '0x1',
+        'topics': ['0x' + 'dd' * 32, '0x' + '00' * 12 + 'cd' * 20],
+        'transactionHash': '0x' + '02' * 32,
+        'transactionIndex': '0x3',
+        'removed': False,
+    }
+    event = EvmEventData.from_node_json(dict(event_json), 100)
+
+    assert event.address == event_json['address']
+    assert event.block_hash == event_json['blockHash']
+    assert event.data == event_json['data']
+    assert event.topics == tuple(event_json['topics'])
+    assert event.transaction_hash == event_json['transactionHash']
+    assert (event.level, event.log_index, event.transaction_index, event.timestamp) == (16, 1, 3, 100)
+    assert event.topics is event.topics
+
+    copy = pickle.loads(pickle.dumps(event))
+    assert copy == event
+    assert hash(copy) == hash(event)
+    assert repr(copy) == repr(event)
+    with pytest.raises(FrozenInstanceError):
+        event.level = 17
+
+    assert [field.name for field in fields(event)] == list(asdict(event))
+    assert asdict(event)['topics'] == tuple(event_json['topics'])
+    assert EvmEventData(*astuple(event)) == event
+    moved = replace(event, level=17)
+    assert moved.level == 17
+    assert moved.address == event.address
+    assert moved != event
+
+
+def test_evm_transaction_data_compact() -> None:
+    transaction_json = {
+        'blockHash': '0x' + '01' * 32,
+        'blockNumber': '0x10',
+        'from': '0x' + 'ab' * 20,
+        'gas': '0x5208',
+        'gasPrice': '0x1',
+        'hash': '0x' + '02' * 32,
+        'input': '0xa9059cbb' + '00' * 64,
+        'nonce': '0x0',
+        'r': '0x1a',
+        's': '0x1b',
+        'value': '0x0',
+    }
+    transaction = EvmTransactionData.from_node_json(transaction_json, 100)
+
+    assert transaction.from_ == transaction_json['from']
+    assert transaction.hash == transaction_json['hash']
+    assert transaction.input == transaction_json['input']
+    assert transaction.sighash == '0xa9059cbb'
+    assert transaction.to is None
+    assert transaction.contract_address is None
+    assert transaction.r == '0x1a'
+    assert pickle.loads(pickle.dumps(transaction)) == transaction
+    assert asdict(transaction)['from_'] == transaction_json['from']
+    assert replace(transaction, to='0x' + 'cd' * 20).to == '0x' + 'cd' * 20
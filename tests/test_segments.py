@@ -0,0 +1,102 @@
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from dipdup import __version__
+from dipdup.segments import SEGMENT_SIZE
+from dipdup.segments import SegmentIndex
+from dipdup.segments import SegmentStore
+from dipdup.segments import get_filter_hash
+from dipdup.segments import iter_segments
+
+
+@dataclass(frozen=True)
+class Item:
+    level: int
+
+
+class _Source:
+    def __init__(self, levels: list[int]) -> None:
+        self.levels = levels
+        self.calls: list[tuple[int, int]] = []
+
+    async def iter_range(self, first_level: int, last_level: int) -> AsyncIterator[tuple[Item, ...]]:
+        self.calls.append((first_level, last_level))
+        for level in self.levels:
+            if first_level <= level <= last_level:
+                yield (Item(level),)
+
+
+async def _collect(index: SegmentIndex, source: _Source, first_level: int, last_level: int) -> list[int]:
+    return [
+        batch[0].level
+        async for batch in iter_segments(
+            index=index,
+            iter_range=source.iter_range,
+            first_level=first_level,
+            last_level=last_level,
+            persist_until=last_level,
+        )
+    ]
+
+
+async def test_iter_segments(tmp_path: Path) -> None:
+    levels = [5, SEGMENT_SIZE + 1, SEGMENT_SIZE * 3 + 7, SEGMENT_SIZE * 4 - 1]
+    last_level = SEGMENT_SIZE * 4 + 100
+    source = _Source(levels)
+
+    index = SegmentIndex(tmp_path)
+    assert await _collect(index, source, 0, last_level) == levels
+    assert source.calls == [(0, last_level)]
+    # NOTE: The last segment is incomplete
+    assert len(index) == 4
+    assert len(list(tmp_path.glob('*.seg'))) == 3
+
+    source.calls.clear()
+    index = SegmentIndex(tmp_path)
+    assert await _collect(index, source, 0, last_level) == levels
+    assert source.calls == [(SEGMENT_SIZE * 4, last_level)]
+
+    source.calls.clear()
+    assert await _collect(index, source, SEGMENT_SIZE, SEGMENT_SIZE * 3 + 7) == levels[1:3]
+    assert source.calls == []
+
+
+async def test_iter_segments_partial(tmp_path: Path) -> None:
+    source = _Source([SEGMENT_SIZE + 5, SEGMENT_SIZE * 2 + 5])
+    index = SegmentIndex(tmp_path)
+
+    # NOTE: The first segment is not covered from its first level
+    assert await _collect(index, source, SEGMENT_SIZE + 1, SEGMENT_SIZE * 3 - 1) == source.levels
+    assert index.get(SEGMENT_SIZE) is None
+    assert index.get(SEGMENT_SIZE * 2) is not None
+
+
+async def test_iter_segments_broken(tmp_path: Path) -> None:
+    levels = [5, SEGMENT_SIZE + 1]
+    source = _Source(levels)
+    index = SegmentIndex(tmp_path)
+    assert await _collect(index, source, 0, SEGMENT_SIZE * 2 - 1) == levels
+
+    # NOTE: Segment written by incompatible code is fetched and written again
+    (tmp_path / f'0-{SEGMENT_SIZE - 1}.seg').write_bytes(b'garbage')
+    source.calls.clear()
+    index = SegmentIndex(tmp_path)
+    assert await _collect(index, source, 0, SEGMENT_SIZE * 2 - 1) == levels
+    assert source.calls == [(0, SEGMENT_SIZE - 1)]
+
+    source.calls.clear()
+    index = SegmentIndex(tmp_path)
+    assert await _collect(index, source, 0, SEGMENT_SIZE * 2 - 1) == levels
+    assert source.calls == []
+
+
+def test_segment_store_version(tmp_path: Path) -> None:
+    store = SegmentStore(tmp_path)
+    store.open('datasource', 'filter')
+    assert (tmp_path / __version__ / 'datasource' / 'filter').is_dir()
+
+
+def test_filter_hash() -> None:
+    assert get_filter_hash('a', {'x', 'y', 'z'}) == get_filter_hash('a', {'z', 'y', 'x'})
+    assert get_filter_hash('a', {'x': [1, 2]}) != get_filter_hash('b', {'x': [1, 2]})